@@ -0,0 +1,10 @@
+# backend/apps/comentarios/apps.py
+from django.apps import AppConfig
+
+
+class ComentariosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.comentarios'
+
+    def ready(self):
+        from . import signals  # noqa: F401
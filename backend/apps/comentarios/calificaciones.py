@@ -0,0 +1,136 @@
+# backend/apps/comentarios/calificaciones.py
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+from django.utils import timezone
+
+from .signals import calificaciones_actualizadas
+
+# CalificacionPromedio guarda suma, total y distribución de los comentarios
+# aprobados. Crear, editar, aprobar o borrar un comentario aplica solo la
+# diferencia con un UPDATE ... SET campo = campo + delta en la transacción
+# del comentario; recalcular_calificaciones corrige periódicamente lo que se
+# haya escapado (updates masivos, ediciones concurrentes del mismo comentario).
+TAMANO_LOTE_RECALCULO = 500
+
+
+def _sumar(campo, delta):
+    if delta < 0:
+        # Si el conteo ya se había desviado, no se rompe el guardado del comentario
+        return Greatest(F(campo) + delta, 0)
+    return F(campo) + delta
+
+
+def aplicar_cambio(trabajo_id, anterior, nueva):
+    """
+    Aplica al promedio del trabajo el paso de la calificación `anterior` a
+    `nueva` (None = el comentario no cuenta: no existe o no está aprobado).
+    Con la fila del promedio ya creada es un único UPDATE.
+    """
+    from .models import CalificacionPromedio
+
+    if anterior == nueva:
+        return
+
+    cambios = {'fecha_actualizacion': timezone.now()}
+    delta_suma = delta_total = 0
+    for calificacion, signo in ((anterior, -1), (nueva, 1)):
+        if calificacion is None:
+            continue
+        campo = f'calificaciones_{calificacion}'
+        cambios[campo] = _sumar(campo, signo)
+        delta_suma += signo * calificacion
+        delta_total += signo
+
+    suma = _sumar('suma_calificaciones', delta_suma)
+    total = _sumar('total_comentarios', delta_total)
+    cambios.update(
+        suma_calificaciones=suma,
+        total_comentarios=total,
+        # En el SET todas las expresiones leen los valores previos de la fila
+        promedio_calificacion=Coalesce(
+            Cast(suma, FloatField()) / NullIf(total, 0), 0.0, output_field=FloatField()
+        ),
+    )
+
+    if not CalificacionPromedio.objects.filter(trabajo_id=trabajo_id).update(**cambios):
+        if nueva is None:
+            # Sin fila no hay nada que restar (p. ej. se está borrando el trabajo)
+            return
+        # Primera calificación del trabajo: se calcula entera, ya incluye este comentario
+        recalcular_calificaciones(trabajos=[trabajo_id])
+        return
+    calificaciones_actualizadas.send(sender=CalificacionPromedio, trabajos=[trabajo_id])
+
+
+def _valores(datos):
+    total = datos['total'] if datos else 0
+    suma = datos['suma'] if datos else 0
+    valores = {
+        'total_comentarios': total,
+        'suma_calificaciones': suma,
+        'promedio_calificacion': suma / total if total else 0.0,
+    }
+    for i in range(1, 6):
+        valores[f'calificaciones_{i}'] = datos[f'calificaciones_{i}'] if datos else 0
+    return valores
+
+
+def recalcular_calificaciones(trabajos=None):
+    """
+    Recalcula desde los comentarios los promedios de `trabajos` (ids) o de
+    todos. Va por lotes y bloquea las filas del lote mientras agrega, así un
+    comentario que se guarda a la vez aplica su diferencia después sobre el
+    valor ya corregido. Devuelve cuántos promedios había que corregir.
+    """
+    from .models import CalificacionPromedio, Comentario
+
+    comentarios = Comentario.objects.filter(aprobado=True).order_by()
+    promedios = CalificacionPromedio.objects.order_by()
+    if trabajos is not None:
+        comentarios = comentarios.filter(trabajo_id__in=trabajos)
+        promedios = promedios.filter(trabajo_id__in=trabajos)
+    ids = sorted(
+        set(promedios.values_list('trabajo_id', flat=True))
+        | set(comentarios.values_list('trabajo_id', flat=True).distinct())
+    )
+
+    campos = ['promedio_calificacion', 'total_comentarios', 'suma_calificaciones', *CalificacionPromedio.CAMPOS_DISTRIBUCION]
+    corregidos = []
+    for inicio in range(0, len(ids), TAMANO_LOTE_RECALCULO):
+        lote = ids[inicio:inicio + TAMANO_LOTE_RECALCULO]
+        with transaction.atomic():
+            filas = {
+                p.trabajo_id: p
+                for p in CalificacionPromedio.objects.select_for_update().filter(trabajo_id__in=lote)
+            }
+            agregados = {
+                fila['trabajo_id']: fila
+                for fila in comentarios.filter(trabajo_id__in=lote).values('trabajo_id').annotate(
+                    total=Count('id'),
+                    suma=Sum('calificacion'),
+                    **{f'calificaciones_{i}': Count('id', filter=Q(calificacion=i)) for i in range(1, 6)},
+                )
+            }
+
+            ahora = timezone.now()
+            cambiados, nuevos = [], []
+            for trabajo_id in lote:
+                valores = _valores(agregados.get(trabajo_id))
+                promedio = filas.get(trabajo_id)
+                if promedio is None:
+                    nuevos.append(CalificacionPromedio(trabajo_id=trabajo_id, **valores))
+                elif any(getattr(promedio, campo) != valor for campo, valor in valores.items()):
+                    for campo, valor in valores.items():
+                        setattr(promedio, campo, valor)
+                    promedio.fecha_actualizacion = ahora
+                    cambiados.append(promedio)
+
+            CalificacionPromedio.objects.bulk_update(cambiados, campos + ['fecha_actualizacion'])
+            # Un comentario concurrente puede haber creado la fila: en ese caso ya la calculó él
+            CalificacionPromedio.objects.bulk_create(nuevos, ignore_conflicts=True)
+        corregidos.extend(p.trabajo_id for p in cambiados + nuevos)
+
+    if corregidos:
+        calificaciones_actualizadas.send(sender=CalificacionPromedio, trabajos=corregidos)
+    return len(corregidos)
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:31
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('trabajos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalificacionPromedio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('promedio_calificacion', models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(5.0)], verbose_name='Promedio de Calificación')),
+                ('total_comentarios', models.PositiveIntegerField(default=0, verbose_name='Total de Comentarios')),
+                ('distribucion_calificaciones', models.JSONField(default=dict, verbose_name='Distribución de Calificaciones')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('trabajo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calificacion_promedio', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+            ],
+            options={
+                'verbose_name': 'Calificación Promedio',
+                'verbose_name_plural': 'Calificaciones Promedio',
+                'db_table': 'calificacion_promedio',
+            },
+        ),
+        migrations.CreateModel(
+            name='RetroalimentacionIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recomendacion_util', models.BooleanField(verbose_name='¿La recomendación fue útil?')),
+                ('coincidencia_contenido', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Coincidencia con el Contenido Buscado (1-5)')),
+                ('precision_resumen', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Precisión del Resumen (1-5)')),
+                ('utilidad_objetivos', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Utilidad de los Objetivos (1-5)')),
+                ('comentarios_adicionales', models.TextField(blank=True, verbose_name='Comentarios Adicionales')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retroalimentacion_ia', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retroalimentacion_ia', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Retroalimentación IA',
+                'verbose_name_plural': 'Retroalimentación IA',
+                'db_table': 'retroalimentacion_ia',
+                'ordering': ['-fecha_creacion'],
+                'unique_together': {('trabajo', 'usuario')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteDescarga',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(verbose_name='Dirección IP')),
+                ('user_agent', models.TextField(blank=True, verbose_name='User Agent')),
+                ('fecha_descarga', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Descarga')),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes_descarga', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes_descarga', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Reporte de Descarga',
+                'verbose_name_plural': 'Reportes de Descarga',
+                'db_table': 'reporte_descarga',
+                'ordering': ['-fecha_descarga'],
+                'indexes': [models.Index(fields=['trabajo'], name='reporte_des_trabajo_da3d41_idx'), models.Index(fields=['usuario'], name='reporte_des_usuario_f03971_idx'), models.Index(fields=['fecha_descarga'], name='reporte_des_fecha_d_32bed9_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Comentario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comentario', models.TextField(verbose_name='Comentario')),
+                ('calificacion', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Calificación (1-5)')),
+                ('aprobado', models.BooleanField(default=True, verbose_name='Comentario Aprobado')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comentarios', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comentarios', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Comentario',
+                'verbose_name_plural': 'Comentarios',
+                'db_table': 'comentarios',
+                'ordering': ['-fecha_creacion'],
+                'unique_together': {('trabajo', 'usuario')},
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:32
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def calcular_sumas(apps, schema_editor):
+    # Suma y distribución de partida desde los comentarios aprobados; desde
+    # aquí se mantienen con incrementos
+    Comentario = apps.get_model('comentarios', 'Comentario')
+    CalificacionPromedio = apps.get_model('comentarios', 'CalificacionPromedio')
+    agregados = (
+        Comentario.objects.filter(aprobado=True).order_by().values('trabajo_id').annotate(
+            total=Count('id'),
+            suma=Sum('calificacion'),
+            **{f'calificaciones_{i}': Count('id', filter=Q(calificacion=i)) for i in range(1, 6)},
+        )
+    )
+    for fila in agregados.iterator(chunk_size=500):
+        valores = {f'calificaciones_{i}': fila[f'calificaciones_{i}'] for i in range(1, 6)}
+        CalificacionPromedio.objects.update_or_create(trabajo_id=fila['trabajo_id'], defaults=dict(
+            valores,
+            total_comentarios=fila['total'],
+            suma_calificaciones=fila['suma'],
+            promedio_calificacion=fila['suma'] / fila['total'],
+        ))
+
+
+def restaurar_distribucion(apps, schema_editor):
+    CalificacionPromedio = apps.get_model('comentarios', 'CalificacionPromedio')
+    for promedio in CalificacionPromedio.objects.filter(total_comentarios__gt=0).iterator(chunk_size=500):
+        promedio.distribucion_calificaciones = {
+            str(i): getattr(promedio, f'calificaciones_{i}') for i in range(1, 6)
+        }
+        promedio.save(update_fields=['distribucion_calificaciones'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comentarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='calificaciones_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='calificaciones_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='calificaciones_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='calificaciones_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='calificaciones_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calificacionpromedio',
+            name='suma_calificaciones',
+            field=models.PositiveIntegerField(default=0, verbose_name='Suma de Calificaciones'),
+        ),
+        migrations.RunPython(calcular_sumas, restaurar_distribucion),
+    ]
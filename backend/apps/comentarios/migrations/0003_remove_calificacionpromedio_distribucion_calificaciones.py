@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Aparte de la 0002: PostgreSQL no deja alterar la tabla en la misma
+    # transacción en que se actualizaron sus filas (triggers pendientes)
+    dependencies = [
+        ('comentarios', '0002_calificacion_incremental'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='calificacionpromedio',
+            name='distribucion_calificaciones',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comentarios', '0003_remove_calificacionpromedio_distribucion_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['trabajo', '-fecha_creacion', '-id'], name='comentario_trabajo_fecha_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 
 class Comentario(models.Model):
@@ -37,10 +38,52 @@ class Comentario(models.Model):
         verbose_name_plural = 'Comentarios'
         ordering = ['-fecha_creacion']
         unique_together = ['trabajo', 'usuario']  # Un comentario por usuario por trabajo
+        indexes = [
+            # Paginación por cursor de los comentarios de un trabajo y sus últimos 5
+            models.Index(fields=['trabajo', '-fecha_creacion', '-id'], name='comentario_trabajo_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"Comentario de {self.usuario.username} en {self.trabajo.titulo}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if 'aprobado' in instancia.__dict__ and 'calificacion' in instancia.__dict__:
+            # Lo que ya está sumado en CalificacionPromedio, para aplicar solo la diferencia
+            instancia._calificacion_guardada = instancia.calificacion_contada
+        return instancia
+    
+    @property
+    def calificacion_contada(self):
+        """Calificación con la que cuenta en el promedio del trabajo (None si no está aprobado)"""
+        return self.calificacion if self.aprobado else None
+    
+    @property
+    def calificacion_contada_guardada(self):
+        """`calificacion_contada` según la base de datos, antes de los cambios sin guardar"""
+        if self._state.adding:
+            return None
+        if not hasattr(self, '_calificacion_guardada'):
+            fila = Comentario.objects.filter(pk=self.pk).values('aprobado', 'calificacion').first()
+            self._calificacion_guardada = fila['calificacion'] if fila and fila['aprobado'] else None
+        return self._calificacion_guardada
+    
+    def save(self, *args, **kwargs):
+        from .calificaciones import aplicar_cambio
+        
+        anterior = self.calificacion_contada_guardada
+        nueva = self.calificacion_contada
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'aprobado', 'calificacion'} & set(update_fields):
+            nueva = anterior
+        
+        # El promedio cambia en la misma transacción que el comentario
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            aplicar_cambio(self.trabajo_id, anterior, nueva)
+        self._calificacion_guardada = nueva
+    
     @property
     def estrellas(self):
         """Retorna una cadena de estrellas basada en la calificación"""
@@ -49,7 +92,9 @@ class Comentario(models.Model):
 
 class CalificacionPromedio(models.Model):
     """
-    Cache de calificaciones promedio para optimización
+    Cache de calificaciones promedio para optimización. Se mantiene de forma
+    incremental: cada cambio en un comentario aprobado suma o resta su
+    calificación con un solo UPDATE (ver `calificaciones.aplicar_cambio`).
     """
     trabajo = models.OneToOneField(
         'trabajos.TrabajoInvestigacion',
@@ -64,10 +109,19 @@ class CalificacionPromedio(models.Model):
         verbose_name='Promedio de Calificación'
     )
     total_comentarios = models.PositiveIntegerField(default=0, verbose_name='Total de Comentarios')
-    distribucion_calificaciones = models.JSONField(default=dict, verbose_name='Distribución de Calificaciones')
+    suma_calificaciones = models.PositiveIntegerField(default=0, verbose_name='Suma de Calificaciones')
+    
+    # Distribución: comentarios aprobados con cada número de estrellas
+    calificaciones_1 = models.PositiveIntegerField(default=0)
+    calificaciones_2 = models.PositiveIntegerField(default=0)
+    calificaciones_3 = models.PositiveIntegerField(default=0)
+    calificaciones_4 = models.PositiveIntegerField(default=0)
+    calificaciones_5 = models.PositiveIntegerField(default=0)
     
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
+    CAMPOS_DISTRIBUCION = [f'calificaciones_{i}' for i in range(1, 6)]
+    
     class Meta:
         db_table = 'calificacion_promedio'
         verbose_name = 'Calificación Promedio'
@@ -76,27 +130,18 @@ class CalificacionPromedio(models.Model):
     def __str__(self):
         return f"Promedio de {self.trabajo.titulo}: {self.promedio_calificacion:.2f}"
     
+    @property
+    def distribucion_calificaciones(self):
+        """Comentarios aprobados por número de estrellas ({} si no hay ninguno)"""
+        if not self.total_comentarios:
+            return {}
+        return {str(i): getattr(self, f'calificaciones_{i}') for i in range(1, 6)}
+    
     def actualizar_promedio(self):
-        """Actualiza el promedio basado en los comentarios actuales"""
-        comentarios = self.trabajo.comentarios.filter(aprobado=True)
-        
-        if comentarios.exists():
-            total_calificacion = sum(c.calificacion for c in comentarios)
-            self.total_comentarios = comentarios.count()
-            self.promedio_calificacion = total_calificacion / self.total_comentarios
-            
-            # Calcular distribución
-            distribucion = {}
-            for i in range(1, 6):
-                count = comentarios.filter(calificacion=i).count()
-                distribucion[str(i)] = count
-            self.distribucion_calificaciones = distribucion
-        else:
-            self.promedio_calificacion = 0.0
-            self.total_comentarios = 0
-            self.distribucion_calificaciones = {}
-        
-        self.save()
+        """Recalcula todo desde los comentarios aprobados (corrige desvíos del conteo incremental)"""
+        from .calificaciones import recalcular_calificaciones
+        recalcular_calificaciones(trabajos=[self.trabajo_id])
+        self.refresh_from_db()
 
 
 class ReporteDescarga(models.Model):
@@ -118,7 +163,7 @@ class ReporteDescarga(models.Model):
     
     ip_address = models.GenericIPAddressField(verbose_name='Dirección IP')
     user_agent = models.TextField(blank=True, verbose_name='User Agent')
-    fecha_descarga = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Descarga')
+    fecha_descarga = models.DateTimeField(default=timezone.now, verbose_name='Fecha de Descarga')
     
     class Meta:
         db_table = 'reporte_descarga'
@@ -0,0 +1,48 @@
+# backend/apps/comentarios/resumen.py
+from apps.trabajos.espacios import COMENTARIOS
+from apps.trabajos.versiones import cambiar_versiones
+
+# Fragmento por trabajo con lo que el detalle muestra de los comentarios: el
+# resumen de calificaciones y los últimos TOP_COMENTARIOS aprobados, ya
+# serializados. Con la cache caliente el detalle no consulta comentarios.
+# Va en el espacio COMENTARIOS etiquetado con el sello 'comentarios:<id>',
+# que cambia al escribir un comentario o al cambiar el promedio del trabajo.
+TOP_COMENTARIOS = 5
+
+RESUMEN_VACIO = {'promedio': 0, 'total_comentarios': 0, 'distribucion': {}}
+
+
+def sello_comentarios(trabajo_id):
+    return f"comentarios:{trabajo_id}"
+
+
+def calcular_resumen(trabajo_id):
+    from .models import CalificacionPromedio, Comentario
+    from .serializers import ComentarioListSerializer
+
+    promedio = CalificacionPromedio.objects.filter(trabajo_id=trabajo_id).first()
+    comentarios = (
+        Comentario.objects.filter(trabajo_id=trabajo_id, aprobado=True)
+        .select_related('usuario').order_by('-fecha_creacion', '-id')[:TOP_COMENTARIOS]
+    )
+    return {
+        'calificacion_promedio': {
+            'promedio': promedio.promedio_calificacion,
+            'total_comentarios': promedio.total_comentarios,
+            'distribucion': promedio.distribucion_calificaciones,
+        } if promedio is not None else dict(RESUMEN_VACIO),
+        'comentarios': ComentarioListSerializer(comentarios, many=True).data,
+    }
+
+
+def resumen_comentarios(trabajo_id):
+    """Fragmento cacheado del trabajo, o calculado y guardado si no está (sin cache, se calcula)"""
+    return COMENTARIOS.obtener(
+        ('resumen', trabajo_id), lambda: calcular_resumen(trabajo_id),
+        etiquetas=[sello_comentarios(trabajo_id)],
+    )
+
+
+def invalidar_resumen(trabajo_ids):
+    # Tras el commit, para que una lectura concurrente no vuelva a cachear datos viejos
+    cambiar_versiones(*(sello_comentarios(trabajo_id) for trabajo_id in trabajo_ids))
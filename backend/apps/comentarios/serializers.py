@@ -7,15 +7,15 @@ Usuario = get_user_model()
 
 class ComentarioCreateSerializer(serializers.ModelSerializer):
     """
-    Serializer para crear comentarios
+    Serializer para crear comentarios (el trabajo viene de la URL, en el contexto)
     """
     class Meta:
         model = Comentario
-        fields = ['trabajo', 'comentario', 'calificacion']
+        fields = ['comentario', 'calificacion']
     
     def validate(self, attrs):
         usuario = self.context['request'].user
-        trabajo = attrs['trabajo']
+        trabajo = self.context['trabajo']
         
         # Verificar que el usuario puede comentar (debe estar autenticado)
         if not usuario.is_authenticated:
@@ -32,21 +32,12 @@ class ComentarioCreateSerializer(serializers.ModelSerializer):
         return attrs
     
     def create(self, validated_data):
-        comentario = Comentario.objects.create(
+        # Comentario.save() actualiza el promedio del trabajo en la misma transacción
+        return Comentario.objects.create(
+            trabajo=self.context['trabajo'],
             usuario=self.context['request'].user,
             **validated_data
         )
-        
-        # Actualizar el cache de calificación promedio
-        from apps.comentarios.models import CalificacionPromedio
-        try:
-            promedio = comentario.trabajo.calificacion_promedio
-        except CalificacionPromedio.DoesNotExist:
-            promedio = CalificacionPromedio.objects.create(trabajo=comentario.trabajo)
-        
-        promedio.actualizar_promedio()
-        
-        return comentario
 
 
 class ComentarioListSerializer(serializers.ModelSerializer):
@@ -77,25 +68,14 @@ class ComentarioUpdateSerializer(serializers.ModelSerializer):
         usuario = self.context['request'].user
         
         # Solo el autor del comentario puede editarlo
-        if self.instance.usuario != usuario:
+        if self.instance.usuario_id != usuario.pk:
             raise serializers.ValidationError("Solo puedes editar tus propios comentarios.")
         
         return attrs
     
     def update(self, instance, validated_data):
-        # Actualizar el comentario
-        comentario = super().update(instance, validated_data)
-        
-        # Actualizar el cache de calificación promedio
-        try:
-            promedio = comentario.trabajo.calificacion_promedio
-        except:
-            promedio = None
-        
-        if promedio:
-            promedio.actualizar_promedio()
-        
-        return comentario
+        # Si cambia la calificación, Comentario.save() aplica la diferencia al promedio
+        return super().update(instance, validated_data)
 
 
 class RetroalimentacionIACreateSerializer(serializers.ModelSerializer):
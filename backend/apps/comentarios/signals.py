@@ -0,0 +1,27 @@
+# backend/apps/comentarios/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .resumen import invalidar_resumen
+
+# Se envía tras cambiar los promedios con UPDATE (que no emite post_save),
+# con `trabajos`: lista de ids de los trabajos afectados
+calificaciones_actualizadas = Signal()
+
+
+@receiver(post_delete, sender='comentarios.Comentario')
+def descontar_calificacion(sender, instance, **kwargs):
+    # También llega en los borrados en cascada (de un usuario o de un trabajo)
+    from .calificaciones import aplicar_cambio
+    anterior = instance.__dict__.get('_calificacion_guardada', instance.calificacion_contada)
+    aplicar_cambio(instance.trabajo_id, anterior, None)
+
+
+@receiver([post_save, post_delete], sender='comentarios.Comentario')
+def invalidar_resumen_comentario(sender, instance, **kwargs):
+    invalidar_resumen([instance.trabajo_id])
+
+
+@receiver(calificaciones_actualizadas)
+def invalidar_resumen_calificaciones(sender, trabajos, **kwargs):
+    invalidar_resumen(trabajos)
@@ -1,23 +1,147 @@
 # backend/apps/comentarios/views.py
-from rest_framework import viewsets, permissions
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import mixins, permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
 
+from apps.trabajos.models import TrabajoInvestigacion
+from apps.trabajos.pagination import PaginacionKeyset
+from .models import Comentario, RetroalimentacionIA
+from .resumen import resumen_comentarios
+from .serializers import (
+    ComentarioCreateSerializer, ComentarioListSerializer, ComentarioUpdateSerializer,
+    RetroalimentacionIACreateSerializer, RetroalimentacionIAListSerializer,
+)
 
-class ComentarioViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.AllowAny]
 
-    def list(self, request):
-        return Response([])
+def es_moderador(user):
+    return user.is_authenticated and (
+        user.is_superuser or user.is_staff or getattr(user, 'rol', '') == 'administrador'
+    )
 
-    def retrieve(self, request, pk=None):
-        return Response({})
 
+class ComentarioViewSet(viewsets.ModelViewSet):
+    """
+    Comentarios de un trabajo (/trabajos/{trabajo_pk}/comentarios/), paginados
+    por cursor sobre (fecha_creacion, id) o (calificacion, id). Los no
+    aprobados solo los ven su autor y los administradores.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = PaginacionKeyset
+    filter_backends = []
+    ordering_fields = ['fecha_creacion', 'calificacion']
+    ordering = ['-fecha_creacion']
 
-class RetroalimentacionIAViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.AllowAny]
+    def get_trabajo(self):
+        if not hasattr(self, '_trabajo'):
+            trabajo = get_object_or_404(
+                TrabajoInvestigacion.objects.only('id', 'estado'), pk=self.kwargs['trabajo_pk']
+            )
+            if not trabajo.puede_ser_descargado and not es_moderador(self.request.user):
+                raise NotFound()
+            self._trabajo = trabajo
+        return self._trabajo
 
-    def list(self, request):
-        return Response([])
+    def get_queryset(self):
+        qs = Comentario.objects.filter(trabajo=self.get_trabajo()).select_related('usuario')
+        user = self.request.user
+        if not es_moderador(user):
+            visibles = Q(aprobado=True)
+            if user.is_authenticated:
+                visibles |= Q(usuario=user)
+            qs = qs.filter(visibles)
+        return qs
 
-    def create(self, request):
-        return Response({'status': 'ok'})
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ComentarioCreateSerializer
+        if self.action in ['update', 'partial_update']:
+            return ComentarioUpdateSerializer
+        return ComentarioListSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'create':
+            context['trabajo'] = self.get_trabajo()
+        return context
+
+    def _representacion(self, comentario):
+        return ComentarioListSerializer(comentario, context=self.get_serializer_context()).data
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        comentario = serializer.save()
+        return Response(self._representacion(comentario), status=status.HTTP_201_CREATED)
+
+    def update(self, request, *args, **kwargs):
+        comentario = self.get_object()
+        serializer = self.get_serializer(comentario, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(self._representacion(comentario))
+
+    def perform_destroy(self, instance):
+        user = self.request.user
+        if instance.usuario_id != user.pk and not es_moderador(user):
+            raise PermissionDenied("Solo puedes eliminar tus propios comentarios.")
+        instance.delete()
+
+    @action(detail=True, methods=['post'])
+    def moderar(self, request, trabajo_pk=None, pk=None):
+        """Aprobar u ocultar un comentario: {"aprobado": true|false} (solo administradores)"""
+        if not es_moderador(request.user):
+            raise PermissionDenied("Solo los administradores pueden moderar comentarios.")
+        comentario = self.get_object()
+        try:
+            comentario.aprobado = serializers.BooleanField().to_internal_value(request.data.get('aprobado'))
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({'aprobado': e.detail})
+        comentario.save(update_fields=['aprobado', 'fecha_actualizacion'])
+        return Response(self._representacion(comentario))
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request, trabajo_pk=None):
+        """Calificación promedio y últimos comentarios aprobados (el mismo fragmento cacheado del detalle)"""
+        return Response(resumen_comentarios(self.get_trabajo().pk))
+
+
+class RetroalimentacionIAViewSet(mixins.CreateModelMixin,
+                                 mixins.ListModelMixin,
+                                 mixins.RetrieveModelMixin,
+                                 viewsets.GenericViewSet):
+    """
+    Retroalimentación sobre los resultados de la IA. Cada usuario ve la suya
+    y los administradores toda; paginada por cursor sobre (fecha_creacion, id).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginacionKeyset
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['trabajo', 'recomendacion_util']
+    ordering_fields = ['fecha_creacion']
+    ordering = ['-fecha_creacion']
+
+    def get_queryset(self):
+        qs = RetroalimentacionIA.objects.select_related('usuario', 'trabajo').defer(
+            *(f'trabajo__{columna}' for columna in ('resumen', 'objetivos', 'tags_ia', 'busqueda'))
+        )
+        if not es_moderador(self.request.user):
+            qs = qs.filter(usuario=self.request.user)
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return RetroalimentacionIACreateSerializer
+        return RetroalimentacionIAListSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        retroalimentacion = serializer.save()
+        return Response(
+            RetroalimentacionIAListSerializer(retroalimentacion, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
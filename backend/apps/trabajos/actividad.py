@@ -0,0 +1,138 @@
+# backend/apps/trabajos/actividad.py
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# log_actividades está particionada por rango mensual de `fecha` (UTC).
+# Las particiones se llaman log_actividades_pAAAA_MM; la partición por defecto
+# solo recoge filas fuera de rango y debería quedar vacía.
+TABLA_LOG = 'log_actividades'
+PATRON_PARTICION = re.compile(r'^log_actividades_p(\d{4})_(\d{2})$')
+MESES_ADELANTE = 3
+
+
+def _sumar_meses(año, mes, n):
+    total = año * 12 + (mes - 1) + n
+    return total // 12, total % 12 + 1
+
+
+def _nombre_particion(año, mes):
+    return f"{TABLA_LOG}_p{año:04d}_{mes:02d}"
+
+
+def _limite(año, mes):
+    return datetime(año, mes, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def particiones_log():
+    """[(nombre, año, mes)] de las particiones mensuales existentes"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLA_LOG]
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    particiones = []
+    for nombre in nombres:
+        coincidencia = PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            particiones.append((nombre, int(coincidencia.group(1)), int(coincidencia.group(2))))
+    return sorted(particiones, key=lambda p: (p[1], p[2]))
+
+
+def crear_particiones_log(meses_adelante=MESES_ADELANTE):
+    """Crea las particiones del mes actual y de los `meses_adelante` siguientes"""
+    if connection.vendor != 'postgresql':
+        return []
+    hoy = timezone.now().astimezone(dt_timezone.utc)
+    creadas = []
+    with connection.cursor() as cursor:
+        for n in range(meses_adelante + 1):
+            año, mes = _sumar_meses(hoy.year, hoy.month, n)
+            siguiente = _sumar_meses(año, mes, 1)
+            nombre = _nombre_particion(año, mes)
+            cursor.execute("SELECT to_regclass(%s)", [nombre])
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(
+                f'CREATE TABLE "{nombre}" PARTITION OF {TABLA_LOG} '
+                f"FOR VALUES FROM ('{_limite(año, mes)}') TO ('{_limite(*siguiente)}')"
+            )
+            creadas.append(nombre)
+    if creadas:
+        logger.info(f"Particiones de {TABLA_LOG} creadas: {creadas}")
+    return creadas
+
+
+def eliminar_particiones_log(retencion_meses=None):
+    """
+    Borra las particiones cuyo mes entero quedó fuera del periodo de retención.
+    DETACH + DROP TABLE es O(1): no recorre filas ni genera DELETEs ni vacuum.
+    Los conteos siguen en ResumenActividadDiaria.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    if retencion_meses is None:
+        retencion_meses = settings.LOG_ACTIVIDADES_RETENCION_MESES
+    hoy = timezone.now().astimezone(dt_timezone.utc)
+    corte = _sumar_meses(hoy.year, hoy.month, -retencion_meses)
+
+    eliminadas = []
+    with connection.cursor() as cursor:
+        for nombre, año, mes in particiones_log():
+            if (año, mes) < corte:
+                cursor.execute(f'ALTER TABLE {TABLA_LOG} DETACH PARTITION "{nombre}"')
+                cursor.execute(f'DROP TABLE "{nombre}"')
+                eliminadas.append(nombre)
+    if eliminadas:
+        logger.info(f"Particiones de {TABLA_LOG} eliminadas por retención: {eliminadas}")
+    return eliminadas
+
+
+def acumular_resumen(logs, carreras):
+    """
+    Suma al resumen diario los LogActividades de un lote recién insertado,
+    con un único INSERT ... ON CONFLICT DO UPDATE SET total = total + n.
+    `carreras` es {trabajo_id: carrera_id}. Debe llamarse en la misma
+    transacción que el bulk_create del lote.
+    """
+    from .models import ResumenActividadDiaria
+
+    conteos = Counter(
+        (timezone.localdate(log.fecha), log.accion, log.trabajo_id, carreras.get(log.trabajo_id))
+        for log in logs
+    )
+    if not conteos:
+        return
+
+    tabla = ResumenActividadDiaria._meta.db_table
+    valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(conteos))
+    parametros = [v for clave, total in conteos.items() for v in (*clave, total)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, accion, trabajo_id, carrera_id, total) VALUES {valores} "
+            f"ON CONFLICT (fecha, accion, COALESCE(trabajo_id, 0), COALESCE(carrera_id, 0)) "
+            f"DO UPDATE SET total = {tabla}.total + EXCLUDED.total",
+            parametros
+        )
+
+
+def totales_por_accion(desde, hasta=None, trabajos=None):
+    """{accion: total} entre dos fechas (inclusive), leído del resumen diario"""
+    from .models import ResumenActividadDiaria
+
+    resumen = ResumenActividadDiaria.objects.filter(fecha__gte=desde)
+    if hasta is not None:
+        resumen = resumen.filter(fecha__lte=hasta)
+    if trabajos is not None:
+        resumen = resumen.filter(trabajo__in=trabajos)
+    return dict(resumen.values('accion').annotate(n=Sum('total')).values_list('accion', 'n'))
@@ -8,6 +8,8 @@ class TrabajoInvestigacionAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'tipo_trabajo', 'carrera', 'año')
     search_fields = ('titulo', 'autores', 'resumen', 'subido_por__username')
     readonly_fields = ('tamaño_archivo', 'hash_md5', 'fecha_subida', 'total_descargas')
+    # Evita el COUNT(*) sin filtros en cada página del listado
+    show_full_result_count = False
     
     # Acción para aprobar masivamente
     actions = ['aprobar_trabajos']
@@ -35,6 +37,7 @@ class LogActividadesAdmin(admin.ModelAdmin):
     list_display = ('fecha', 'usuario', 'accion', 'trabajo', 'ip_address')
     list_filter = ('accion', 'fecha')
     search_fields = ('usuario__username', 'descripcion')
+    show_full_result_count = False
     # Logs suelen ser de solo lectura para integridad
     def has_add_permission(self, request): return False
     def has_change_permission(self, request, obj=None): return False
\ No newline at end of file
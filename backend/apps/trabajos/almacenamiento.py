@@ -0,0 +1,156 @@
+# backend/apps/trabajos/almacenamiento.py
+import logging
+import os
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from storages.backends.s3boto3 import S3Boto3Storage
+
+logger = logging.getLogger(__name__)
+
+# Con ALMACENAMIENTO='s3' los PDFs no pasan por Django: el navegador sube a
+# S3 (o MinIO) con un POST firmado y descarga con una URL firmada de corta
+# duración. Las subidas directas quedan en PREFIJO_SUBIDAS hasta que se crea
+# el trabajo; conviene una regla de ciclo de vida del bucket que expire ese
+# prefijo para las subidas abandonadas.
+PREFIJO_SUBIDAS = 'subidas'
+
+
+def usa_s3():
+    return settings.ALMACENAMIENTO == 's3'
+
+
+def cliente_s3():
+    """Cliente boto3 del almacenamiento por defecto (endpoint interno)"""
+    return default_storage.connection.meta.client
+
+
+@lru_cache(maxsize=1)
+def _almacenamiento_publico():
+    return S3Boto3Storage(endpoint_url=settings.AWS_S3_ENDPOINT_PUBLICO)
+
+
+def almacenamiento_firmas():
+    """
+    Almacenamiento con el que se firman las URLs que usa el navegador. Si el
+    endpoint interno no es accesible desde fuera (p. ej. http://minio:9000),
+    se firma con AWS_S3_ENDPOINT_PUBLICO. Firmar no hace peticiones de red.
+    """
+    publico = settings.AWS_S3_ENDPOINT_PUBLICO
+    if publico and publico != settings.AWS_S3_ENDPOINT_URL:
+        return _almacenamiento_publico()
+    return default_storage
+
+
+class AlmacenamientoS3(S3Boto3Storage):
+    """S3Boto3Storage cuyas URLs (archivo_pdf.url) se firman con el endpoint público"""
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        firmas = almacenamiento_firmas()
+        if firmas is not default_storage:
+            return firmas.url(name, parameters=parameters, expire=expire, http_method=http_method)
+        return super().url(name, parameters=parameters, expire=expire, http_method=http_method)
+
+
+def url_descarga_firmada(nombre, disposicion, content_type='application/pdf'):
+    """URL firmada de GET con la cabecera Content-Disposition de la descarga"""
+    return almacenamiento_firmas().url(nombre, parameters={
+        'ResponseContentDisposition': disposicion,
+        'ResponseContentType': content_type,
+    })
+
+
+def _clave_reserva(clave):
+    return f"subida_directa:{clave}"
+
+
+def post_subida_firmado(usuario):
+    """
+    Formulario firmado para que el navegador suba el PDF directamente al
+    bucket. La clave queda reservada para el usuario hasta que expira el
+    formulario; el tamaño y el tipo los impone S3 con las condiciones.
+    """
+    clave = f"{PREFIJO_SUBIDAS}/{usuario.pk}/{uuid.uuid4().hex}.pdf"
+    expira = settings.SUBIDA_DIRECTA_EXPIRA
+    firmas = almacenamiento_firmas()
+    formulario = firmas.connection.meta.client.generate_presigned_post(
+        Bucket=firmas.bucket_name,
+        Key=clave,
+        Fields={'Content-Type': 'application/pdf'},
+        Conditions=[
+            {'Content-Type': 'application/pdf'},
+            ['content-length-range', 1, settings.SUBIDA_TAMANO_MAXIMO],
+        ],
+        ExpiresIn=expira,
+    )
+    # El trabajo puede crearse un poco después de que caduque el formulario
+    cache.set(_clave_reserva(clave), usuario.pk, expira * 2)
+    return {
+        'url': formulario['url'],
+        'campos': formulario['fields'],
+        'clave': clave,
+        'expira_en': expira,
+        'tamano_maximo': settings.SUBIDA_TAMANO_MAXIMO,
+    }
+
+
+def validar_subida_directa(usuario, clave):
+    """
+    Comprueba que la clave se reservó para este usuario y que el objeto ya
+    está en el bucket. Devuelve su tamaño en bytes, o lanza ValueError.
+    """
+    if cache.get(_clave_reserva(clave)) != usuario.pk:
+        raise ValueError("La subida no existe o ha caducado.")
+    try:
+        return default_storage.size(clave)
+    except Exception as e:
+        logger.warning(f"No se encontró la subida directa {clave}: {e}")
+        raise ValueError("El archivo todavía no se ha subido al almacenamiento.")
+
+
+def mover_subida_directa(clave, destino):
+    """
+    Copia dentro del bucket (sin descargar el objeto) la subida directa a su
+    ruta definitiva y borra la reserva. El objeto original lo borra
+    `descartar_subida_directa` una vez confirmada la transacción.
+    """
+    cliente_s3().copy_object(
+        Bucket=default_storage.bucket_name,
+        Key=destino,
+        CopySource={'Bucket': default_storage.bucket_name, 'Key': clave},
+        ContentType='application/pdf',
+        MetadataDirective='REPLACE',
+    )
+    cache.delete(_clave_reserva(clave))
+    return destino
+
+
+def descartar_subida_directa(clave):
+    try:
+        default_storage.delete(clave)
+    except Exception as e:
+        logger.warning(f"No se pudo borrar la subida directa {clave}: {e}")
+
+
+def mover_objeto(origen, destino):
+    """
+    Mueve un archivo dentro del almacenamiento sin pasar su contenido por
+    Django: CopyObject en S3, rename en el sistema de archivos local.
+    """
+    if usa_s3():
+        cliente_s3().copy_object(
+            Bucket=default_storage.bucket_name,
+            Key=destino,
+            CopySource={'Bucket': default_storage.bucket_name, 'Key': origen},
+            ContentType='application/pdf',
+            MetadataDirective='REPLACE',
+        )
+        default_storage.delete(origen)
+    else:
+        ruta_destino = default_storage.path(destino)
+        os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
+        os.replace(default_storage.path(origen), ruta_destino)
+    return destino
@@ -0,0 +1,10 @@
+# backend/apps/trabajos/apps.py
+from django.apps import AppConfig
+
+
+class TrabajosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.trabajos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,144 @@
+# backend/apps/trabajos/archivos.py
+import hashlib
+import logging
+import tempfile
+from collections import namedtuple
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+logger = logging.getLogger(__name__)
+
+# Huella de un PDF. El SHA-256 identifica el contenido: los trabajos con el
+# mismo hash comparten el objeto almacenado (ruta trabajos/contenido/<hash>)
+# y los resultados de la IA. El MD5 se guarda como dato informativo.
+Huella = namedtuple('Huella', ['md5', 'sha256'])
+
+TAMANO_TROZO = 1024 * 1024
+
+
+class HuellaUploadMixin:
+    """
+    Calcula la huella de cada archivo mientras Django lo recibe, trozo a
+    trozo, sin volver a leerlo después. Queda en `archivo.huella`.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Antes de super(): MemoryFileUploadHandler corta la cadena con una excepción
+        self._md5, self._sha256 = hashlib.md5(), hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        restante = super().receive_data_chunk(raw_data, start)
+        if restante is None:
+            # Este handler se quedó el trozo (si lo devuelve, lo recibe el siguiente)
+            self._md5.update(raw_data)
+            self._sha256.update(raw_data)
+        return restante
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        if archivo is not None:
+            archivo.huella = Huella(self._md5.hexdigest(), self._sha256.hexdigest())
+        return archivo
+
+
+class HuellaMemoryFileUploadHandler(HuellaUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HuellaTemporaryFileUploadHandler(HuellaUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def ruta_por_contenido(sha256):
+    return f"trabajos/contenido/{sha256[:2]}/{sha256}.pdf"
+
+
+def calcular_huella(archivo, copia=None):
+    """Huella leyendo el archivo por trozos; si se pasa `copia`, los trozos se escriben en ella"""
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    for trozo in archivo.chunks(TAMANO_TROZO):
+        md5.update(trozo)
+        sha256.update(trozo)
+        if copia is not None:
+            copia.write(trozo)
+    return Huella(md5.hexdigest(), sha256.hexdigest())
+
+
+def contar_paginas(archivo):
+    """Número de páginas del PDF (None si no se puede leer)"""
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        return None
+    try:
+        archivo.seek(0)
+        return len(PdfReader(archivo).pages)
+    except Exception as e:
+        logger.warning(f"No se pudieron contar las páginas del PDF: {e}")
+        return None
+    finally:
+        archivo.seek(0)
+
+
+def buscar_original(sha256, excluir=None):
+    """Trabajo más antiguo con el mismo contenido (consulta por índice sobre hash_sha256)"""
+    from .models import TrabajoInvestigacion
+
+    trabajos = TrabajoInvestigacion.objects.filter(hash_sha256=sha256).exclude(archivo_pdf='')
+    if excluir is not None:
+        trabajos = trabajos.exclude(pk=excluir)
+    return trabajos.defer('busqueda').order_by('id').first()
+
+
+def registrar_archivo(trabajo, archivo):
+    """
+    Completa tamaño, huella y páginas de un archivo recién subido (todavía
+    local, sin guardar en el almacenamiento). Si ya hay un trabajo con el
+    mismo contenido, el trabajo pasa a apuntar a ese objeto y el archivo no
+    se vuelve a guardar; el original queda en `trabajo.duplicado_de`.
+    """
+    huella = getattr(archivo, 'huella', None) or calcular_huella(archivo)
+    trabajo.tamaño_archivo = archivo.size
+    trabajo.hash_md5, trabajo.hash_sha256 = huella
+
+    original = buscar_original(huella.sha256, excluir=trabajo.pk)
+    if original is not None:
+        trabajo.archivo_pdf = original.archivo_pdf.name
+        trabajo.paginas = original.paginas
+        trabajo.duplicado_de = original
+        return
+    trabajo.paginas = contar_paginas(archivo)
+
+
+def completar_huella(trabajo):
+    """
+    Huella de un archivo que no pasó por los upload handlers (subida directa
+    a S3, trabajos anteriores): el objeto se lee por trozos desde el
+    almacenamiento en el worker, nunca en una petición web. Si es un
+    duplicado, el trabajo se enlaza al objeto del original y su copia se
+    borra. Devuelve el original o None.
+    """
+    from .models import TrabajoInvestigacion
+
+    with trabajo.archivo_pdf.open('rb') as origen, \
+            tempfile.SpooledTemporaryFile(max_size=TAMANO_TROZO) as copia:
+        huella = calcular_huella(origen, copia)
+        tamaño = copia.tell()
+        original = buscar_original(huella.sha256, excluir=trabajo.pk)
+        paginas = original.paginas if original is not None else contar_paginas(copia)
+
+    trabajo.tamaño_archivo = tamaño
+    trabajo.hash_md5, trabajo.hash_sha256 = huella
+    trabajo.paginas = paginas
+    campos = ['tamaño_archivo', 'hash_md5', 'hash_sha256', 'paginas']
+
+    copia_propia = trabajo.archivo_pdf.name
+    if original is not None and original.archivo_pdf.name != copia_propia:
+        trabajo.archivo_pdf = original.archivo_pdf.name
+        campos.append('archivo_pdf')
+    trabajo.save(update_fields=campos)
+
+    if 'archivo_pdf' in campos and not TrabajoInvestigacion.objects.filter(archivo_pdf=copia_propia).exists():
+        trabajo.archivo_pdf.storage.delete(copia_propia)
+    return original
@@ -0,0 +1,140 @@
+# backend/apps/trabajos/busqueda.py
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .espacios import BUSQUEDA
+from .filters import buscar_icontains, buscar_texto_completo
+
+logger = logging.getLogger(__name__)
+
+# Resultados de buscar_inteligente cacheados como lista ordenada de ids, por
+# (consulta normalizada, carrera), en el espacio BUSQUEDA. Solo se buscan
+# trabajos aprobados, que ven todos los roles, así que la lista es la misma
+# para cualquier usuario autenticado.
+# Las filas se leen al responder con una consulta por clave primaria, así
+# que un trabajo editado se muestra al día aunque la lista sea de antes.
+#
+# Pasado BUSQUEDA_TTL_SUAVE la lista se sigue sirviendo, pero se encola (una
+# sola vez, con un cerrojo) su recálculo en Celery; el TTL del espacio es el
+# límite duro. Aprobar, rechazar o borrar un trabajo invalida el espacio.
+RESULTADOS_BUSQUEDA = 20
+TTL_CERROJO_REFRESCO = 60
+
+# Contadores (sin caducidad) para la tasa de aciertos que ve monitorización
+CLAVE_CONSULTAS = 'busqueda:estadisticas:consultas'
+CLAVE_ACIERTOS = 'busqueda:estadisticas:aciertos'
+
+
+def normalizar_consulta(texto):
+    """
+    Espacios colapsados y minúsculas, salvo el operador OR de la sintaxis web.
+    Los acentos se conservan: el diccionario 'spanish' los distingue.
+    """
+    return ' '.join(palabra if palabra == 'OR' else palabra.lower() for palabra in (texto or '').split())
+
+
+def calcular_busqueda(consulta, carrera):
+    """Ids ordenados de los resultados: los de la IA o, si no responde, los de texto completo"""
+    from .models import TrabajoInvestigacion
+    from .services import buscar_trabajos_ia
+
+    ids_ia = []
+    for resultado in buscar_trabajos_ia(consulta, top_k=10):
+        try:
+            ids_ia.append(int(resultado.get('trabajo_id')))
+        except (TypeError, ValueError):
+            continue
+
+    trabajos = TrabajoInvestigacion.objects.filter(estado='aprobado')
+    if carrera:
+        trabajos = trabajos.filter(carrera=carrera)
+
+    if ids_ia:
+        # Solo los que existen y puede ver, en el orden de la IA
+        visibles = set(trabajos.filter(pk__in=ids_ia).values_list('pk', flat=True))
+        ids = [pk for pk in dict.fromkeys(ids_ia) if pk in visibles][:RESULTADOS_BUSQUEDA]
+        total, modo = len(ids), 'IA (Semántica)'
+    else:
+        # Fallback: búsqueda de texto completo (índice GIN) ordenada por relevancia
+        if connection.vendor == 'postgresql':
+            trabajos = buscar_texto_completo(trabajos, consulta).order_by('-rango', '-fecha_subida')
+        else:
+            trabajos = buscar_icontains(trabajos, consulta, ['titulo', 'resumen', 'objetivos'])
+        ids = list(trabajos.values_list('pk', flat=True)[:RESULTADOS_BUSQUEDA])
+        # Sin el conteo cacheado: ya se guarda con la lista y debe coincidir con ella
+        total, modo = trabajos.count(), 'Tradicional (Texto)'
+
+    return {'ids': ids, 'total': total, 'modo': modo, 'calculado': time.time()}
+
+
+def _partes(consulta, carrera):
+    return (carrera or '-', hashlib.md5(consulta.encode()).hexdigest())
+
+
+def _programar_refresco(clave, consulta, carrera):
+    from universidad_repositorio.celery import refrescar_busqueda as tarea_refresco
+
+    try:
+        if cache.add(f"{clave}:refrescando", 1, TTL_CERROJO_REFRESCO):
+            tarea_refresco.delay(consulta, carrera)
+    except Exception as e:
+        # Sin Celery se sigue sirviendo la lista hasta el TTL duro
+        logger.warning(f"No se pudo encolar el refresco de la búsqueda: {e}")
+
+
+def resultados_busqueda(consulta, carrera):
+    """
+    Devuelve (datos, estado): datos de calcular_busqueda y estado 'acierto',
+    'obsoleto' (servido de la cache, recálculo encolado) o 'fallo'.
+    """
+    try:
+        clave = BUSQUEDA.clave(*_partes(consulta, carrera))
+        datos = cache.get(clave)
+    except Exception as e:
+        logger.warning(f"Cache no disponible para búsqueda: {e}")
+        return calcular_busqueda(consulta, carrera), 'fallo'
+
+    if datos is None:
+        datos = calcular_busqueda(consulta, carrera)
+        try:
+            cache.set(clave, datos, BUSQUEDA.ttl)
+        except Exception:
+            pass
+        return datos, 'fallo'
+
+    if time.time() - datos['calculado'] > settings.BUSQUEDA_TTL_SUAVE:
+        _programar_refresco(clave, consulta, carrera)
+        return datos, 'obsoleto'
+    return datos, 'acierto'
+
+
+def refrescar_busqueda(consulta, carrera):
+    """Recalcula y guarda la búsqueda en la versión actual del espacio (desde Celery)"""
+    clave = BUSQUEDA.clave(*_partes(consulta, carrera))
+    try:
+        cache.set(clave, calcular_busqueda(consulta, carrera), BUSQUEDA.ttl)
+    finally:
+        cache.delete(f"{clave}:refrescando")
+
+
+def registrar_consulta(acierto):
+    """Cuenta la consulta y devuelve la tasa de aciertos acumulada (None si la cache falla)"""
+    try:
+        claves = [CLAVE_CONSULTAS, CLAVE_ACIERTOS] if acierto else [CLAVE_CONSULTAS]
+        for clave in claves:
+            try:
+                cache.incr(clave)
+            except ValueError:
+                cache.add(clave, 0, None)
+                cache.incr(clave)
+        valores = cache.get_many([CLAVE_CONSULTAS, CLAVE_ACIERTOS])
+    except Exception as e:
+        logger.warning(f"No se pudo registrar la consulta de búsqueda: {e}")
+        return None
+    consultas = valores.get(CLAVE_CONSULTAS) or 0
+    return round((valores.get(CLAVE_ACIERTOS) or 0) / consultas, 4) if consultas else None
@@ -0,0 +1,190 @@
+# backend/apps/trabajos/contadores.py
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, F, PositiveIntegerField, When
+
+from .versiones import incrementar_versiones, sello_trabajo
+
+logger = logging.getLogger(__name__)
+
+# Contador -> columna de TrabajoInvestigacion. Cada contador es un hash de Redis
+# {trabajo_id: incremento pendiente}; el volcado lo renombra a la clave
+# ':volcando' antes de leerlo, así que los HINCRBY que lleguen mientras tanto
+# van a un hash nuevo y no se pierden.
+CONTADORES = {
+    'descargas': 'total_descargas',
+    'vistas': 'total_vistas',
+}
+TAMANO_LOTE_VOLCADO = 500
+# El cerrojo caduca solo si el proceso muere sin liberarlo
+TTL_CERROJO_VOLCADO = 5 * 60
+# Tokens de volcado que se conservan para reconocer un hash ya aplicado
+RETENCION_TOKENS_VOLCADO = timedelta(days=1)
+
+_cliente = None
+
+
+def cliente_redis():
+    global _cliente
+    if _cliente is None:
+        _cliente = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+    return _cliente
+
+
+def _clave(contador):
+    return f"contadores:{contador}"
+
+
+def _clave_volcando(contador):
+    return f"contadores:{contador}:volcando"
+
+
+def _clave_token(contador):
+    return f"contadores:{contador}:volcando:token"
+
+
+@contextmanager
+def ejecucion_unica(nombre, ttl):
+    """
+    Cerrojo de Redis (SET NX EX con un token propio) para que una tarea
+    periódica no se solape consigo misma. Produce el cerrojo, o None si lo
+    tiene otra ejecución; las tareas largas lo renuevan con reacquire().
+    """
+    cerrojo = cliente_redis().lock(f"cerrojo:{nombre}", timeout=ttl, blocking=False)
+    if not cerrojo.acquire():
+        yield None
+        return
+    try:
+        yield cerrojo
+    finally:
+        try:
+            cerrojo.release()
+        except redis.exceptions.LockError:
+            logger.warning(f"El cerrojo de {nombre} caducó antes de terminar")
+
+
+def incrementar(contador, trabajo_id):
+    """
+    Suma 1 al contador en Redis (O(1), sin tocar la fila del trabajo).
+    Si Redis no responde, se hace un UPDATE atómico con F() como respaldo.
+    """
+    try:
+        cliente_redis().hincrby(_clave(contador), trabajo_id, 1)
+    except redis.RedisError as e:
+        logger.warning(f"Redis no disponible para contador {contador}: {e}")
+        from .models import TrabajoInvestigacion
+        campo = CONTADORES[contador]
+        TrabajoInvestigacion.objects.filter(pk=trabajo_id).update(**{campo: F(campo) + 1})
+
+
+def incrementos_pendientes(trabajo_ids):
+    """{contador: {trabajo_id: incremento aún no volcado}} en un solo viaje a Redis"""
+    trabajo_ids = [str(i) for i in trabajo_ids]
+    pendientes = {contador: {} for contador in CONTADORES}
+    if not trabajo_ids:
+        return pendientes
+
+    try:
+        pipe = cliente_redis().pipeline(transaction=False)
+        for contador in CONTADORES:
+            pipe.hmget(_clave(contador), trabajo_ids)
+            pipe.hmget(_clave_volcando(contador), trabajo_ids)
+        respuestas = iter(pipe.execute())
+    except redis.RedisError as e:
+        logger.warning(f"Redis no disponible para leer contadores: {e}")
+        return pendientes
+
+    for contador in CONTADORES:
+        nuevos, volcando = next(respuestas), next(respuestas)
+        for trabajo_id, a, b in zip(trabajo_ids, nuevos, volcando):
+            total = int(a or 0) + int(b or 0)
+            if total:
+                pendientes[contador][int(trabajo_id)] = total
+    return pendientes
+
+
+def sumar_pendientes(datos):
+    """
+    Suma lo pendiente en Redis a trabajos ya serializados (dicts con 'id'),
+    para mostrar cifras al día. No toca las instancias: un save() posterior
+    no debe escribir en la base de datos incrementos que aún se van a volcar.
+    """
+    datos = [d for d in datos if d.get('id') is not None]
+    pendientes = incrementos_pendientes([d['id'] for d in datos])
+    for contador, campo in CONTADORES.items():
+        deltas = pendientes[contador]
+        for d in datos:
+            if d['id'] in deltas and campo in d:
+                d[campo] = (d[campo] or 0) + deltas[d['id']]
+    return datos
+
+
+def volcar_contadores():
+    """
+    Pasa los incrementos acumulados en Redis a PostgreSQL con un UPDATE por
+    lote (CASE id WHEN ... THEN col + n), sin leer las filas. Si el volcado
+    anterior falló, su hash ':volcando' se reintenta antes de tomar uno nuevo.
+
+    Solo corre una ejecución a la vez, y cada hash lleva un token que se
+    registra en la misma transacción que los UPDATE: si el proceso cae entre
+    el commit y el borrado del hash, el reintento no vuelve a sumarlo.
+    """
+    with ejecucion_unica('volcar_contadores', TTL_CERROJO_VOLCADO) as cerrojo:
+        if cerrojo is None:
+            logger.info("Volcado de contadores en curso en otra ejecución; se omite")
+            return {}
+        return _volcar_contadores()
+
+
+def _volcar_contadores():
+    from .models import TrabajoInvestigacion, VolcadoContadores
+
+    cliente = cliente_redis()
+    volcados = {}
+    for contador, campo in CONTADORES.items():
+        clave_volcando = _clave_volcando(contador)
+        if not cliente.exists(clave_volcando):
+            try:
+                cliente.rename(_clave(contador), clave_volcando)
+            except redis.ResponseError:
+                # No hay incrementos nuevos
+                volcados[contador] = 0
+                continue
+
+        # NX: un hash reintentado conserva el token con el que pudo aplicarse
+        cliente.set(_clave_token(contador), uuid.uuid4().hex, nx=True)
+        token = cliente.get(_clave_token(contador)).decode()
+
+        deltas = [(int(k), int(v)) for k, v in cliente.hgetall(clave_volcando).items() if int(v)]
+        with transaction.atomic():
+            _, pendiente = VolcadoContadores.objects.get_or_create(token=token)
+            if pendiente:
+                for inicio in range(0, len(deltas), TAMANO_LOTE_VOLCADO):
+                    lote = deltas[inicio:inicio + TAMANO_LOTE_VOLCADO]
+                    TrabajoInvestigacion.objects.filter(pk__in=[pk for pk, _ in lote]).update(**{
+                        campo: Case(
+                            *[When(pk=pk, then=F(campo) + delta) for pk, delta in lote],
+                            default=F(campo),
+                            output_field=PositiveIntegerField(),
+                        )
+                    })
+            else:
+                logger.warning(f"Hash de {contador} ya volcado (token {token}); se descarta sin sumarlo")
+        cliente.delete(clave_volcando, _clave_token(contador))
+        if not pendiente:
+            volcados[contador] = 0
+            continue
+        if deltas:
+            # Las cifras volcadas cambian el catálogo y el detalle de esos trabajos
+            incrementar_versiones(['trabajos', *(sello_trabajo(pk) for pk, _ in deltas)])
+        volcados[contador] = sum(delta for _, delta in deltas)
+
+    VolcadoContadores.objects.filter(fecha__lt=timezone.now() - RETENCION_TOKENS_VOLCADO).delete()
+    return volcados
@@ -0,0 +1,50 @@
+# backend/apps/trabajos/descargas.py
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.http import content_disposition_header
+
+from .almacenamiento import url_descarga_firmada, usa_s3
+
+RANGO_DESDE_INICIO = re.compile(r'^\s*bytes\s*=\s*0\s*-')
+
+
+def es_descarga_nueva(request):
+    """
+    Un visor de PDF pide el archivo por trozos (Range). Solo la primera
+    petición (sin Range o desde el byte 0) cuenta como descarga.
+    """
+    rango = request.META.get('HTTP_RANGE')
+    return not rango or bool(RANGO_DESDE_INICIO.match(rango))
+
+
+def respuesta_archivo(archivo, content_type='application/pdf'):
+    """
+    Respuesta de descarga para un FieldFile ya autorizado. En modo 'nginx'
+    la respuesta va vacía con X-Accel-Redirect y nginx envía el archivo
+    (Range, ETag, Last-Modified y peticiones condicionales incluidas), así
+    que el worker de Django queda libre en cuanto responde. Con almacenamiento
+    S3 se redirige a una URL firmada de corta duración y el navegador descarga
+    directamente del bucket.
+    """
+    nombre_archivo = os.path.basename(archivo.name)
+    disposicion = content_disposition_header(True, nombre_archivo)
+
+    if usa_s3():
+        response = HttpResponseRedirect(url_descarga_firmada(archivo.name, disposicion, content_type))
+        # La URL firmada caduca: que no la guarde ninguna cache intermedia
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    if settings.DESCARGAS_MODO == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.DESCARGAS_NGINX_PREFIJO + quote(archivo.name)
+        response['Content-Disposition'] = disposicion
+        return response
+
+    response = FileResponse(archivo.open('rb'), content_type=content_type)
+    response['Content-Disposition'] = disposicion
+    return response
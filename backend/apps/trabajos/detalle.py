@@ -0,0 +1,96 @@
+# backend/apps/trabajos/detalle.py
+import logging
+import time
+
+from django.core.cache import cache
+
+from .contadores import sumar_pendientes
+from .espacios import DETALLE
+from .versiones import sello_trabajo
+
+logger = logging.getLogger(__name__)
+
+# Detalle serializado de cada trabajo en el espacio DETALLE, etiquetado con
+# los sellos de versiones.py de los que depende el cuerpo: el del trabajo
+# (sus guardados, comentarios y calificación), 'carreras' y 'usuarios'. Una
+# escritura no borra nada: la clave siguiente es otra y la vieja caduca sola.
+# Lo que depende de quién pide (puede_descargar) y los contadores pendientes
+# en Redis se aplican encima en cada petición.
+#
+# Si muchas peticiones fallan a la vez (un trabajo popular recién editado),
+# solo una reconstruye: toma un cerrojo con cache.add y las demás esperan su
+# resultado hasta ESPERA_MAXIMA segundos antes de calcularlo por su cuenta.
+TTL_CERROJO = 10
+ESPERA_MAXIMA = 2.0
+INTERVALO_ESPERA = 0.05
+
+
+def sellos_detalle(trabajo_id):
+    return [sello_trabajo(trabajo_id), 'carreras', 'usuarios']
+
+
+def _clave(trabajo_id):
+    return DETALLE.clave(trabajo_id, etiquetas=sellos_detalle(trabajo_id))
+
+
+def _esperar(clave):
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        datos = cache.get(clave)
+        if datos is not None:
+            return datos
+    return None
+
+
+def detalle_cacheado(trabajo_id, construir):
+    """Detalle cacheado de la versión actual, o `construir()` (una sola vez a la vez) y guardado"""
+    try:
+        clave = _clave(trabajo_id)
+        datos = cache.get(clave)
+        if datos is not None:
+            return datos
+        cerrojo = f"{clave}:reconstruyendo"
+        propio = cache.add(cerrojo, 1, TTL_CERROJO)
+        if not propio:
+            datos = _esperar(clave)
+            if datos is not None:
+                return datos
+    except Exception as e:
+        logger.warning(f"Cache no disponible para el detalle del trabajo {trabajo_id}: {e}")
+        return construir()
+
+    try:
+        datos = construir()
+        try:
+            cache.set(clave, datos, DETALLE.ttl)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el detalle del trabajo {trabajo_id}: {e}")
+    finally:
+        if propio:
+            try:
+                cache.delete(cerrojo)
+            except Exception:
+                pass
+    return datos
+
+
+def serializar_detalle(trabajo_id):
+    """Detalle completo para la cache, sin nada que dependa de quién lo pide (None si no existe)"""
+    from .models import TrabajoInvestigacion
+    from .serializers import TrabajoInvestigacionDetailSerializer
+
+    trabajo = TrabajoInvestigacion.objects.select_related(
+        'carrera', 'subido_por', 'aprobado_por'
+    ).defer('busqueda').filter(pk=trabajo_id).first()
+    if trabajo is None:
+        return None
+    return dict(TrabajoInvestigacionDetailSerializer(trabajo, context={'para_cache': True}).data)
+
+
+def superponer_usuario(datos, trabajo, request):
+    """Copia del detalle cacheado con los campos que dependen de la petición"""
+    datos = dict(datos)
+    datos['puede_descargar'] = request.user.is_authenticated and trabajo.puede_ser_descargado
+    sumar_pendientes([datos])
+    return datos
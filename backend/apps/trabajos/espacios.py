@@ -0,0 +1,78 @@
+# backend/apps/trabajos/espacios.py
+import logging
+
+from django.core.cache import cache
+
+from .versiones import cambiar_versiones, incrementar_versiones, leer_versiones
+
+logger = logging.getLogger(__name__)
+
+# Espacios de cache: cada funcionalidad guarda sus claves bajo su propio
+# prefijo y su propia versión, con la forma
+#
+#   <espacio>:<versión del espacio>.<versiones de las etiquetas>:<partes>
+#
+# La versión del espacio y las etiquetas son sellos de versiones.py. Invalidar
+# un espacio (o una etiqueta, p. ej. 'trabajo:5' o 'carreras') incrementa su
+# sello: las claves que dependían de él dejan de leerse y caducan solas por
+# TTL, sin tocar las de las demás funcionalidades. Por eso ninguna tarea
+# necesita vaciar la cache entera (cache.clear() también se llevaría los
+# sellos, los contadores pendientes y las reservas de subidas).
+
+
+class EspacioCache:
+    """Claves de una funcionalidad, invalidables en bloque o por etiquetas"""
+
+    def __init__(self, nombre, ttl):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.sello = f"espacio:{nombre}"
+
+    def clave(self, *partes, etiquetas=()):
+        sellos = [self.sello, *etiquetas]
+        versiones = leer_versiones(sellos)
+        huella = '.'.join(str(versiones[sello][0]) for sello in sellos)
+        return f"{self.nombre}:{huella}:" + ':'.join(str(parte) for parte in partes)
+
+    def obtener(self, partes, calcular, etiquetas=(), ttl=None):
+        """
+        Valor cacheado de `partes` para las versiones actuales, o `calcular()`
+        y guardado. Si la cache falla, calcula sin guardar.
+        """
+        try:
+            clave = self.clave(*partes, etiquetas=etiquetas)
+            datos = cache.get(clave)
+        except Exception as e:
+            logger.warning(f"Cache no disponible para {self.nombre}: {e}")
+            return calcular()
+
+        if datos is None:
+            datos = calcular()
+            try:
+                cache.set(clave, datos, self.ttl if ttl is None else ttl)
+            except Exception:
+                pass
+        return datos
+
+    def invalidar(self):
+        """Deja de leer todas las claves del espacio tras el commit en curso"""
+        cambiar_versiones(self.sello)
+
+
+# Espacios de la aplicación y el TTL de sus claves (segundos)
+ESTADISTICAS = EspacioCache('estadisticas', 10 * 60)
+DETALLE = EspacioCache('detalle', 60 * 60)
+COMENTARIOS = EspacioCache('comentarios', 60 * 60)
+CONTEO = EspacioCache('conteo', 60)
+SUGERENCIAS = EspacioCache('sugerencias', 60)
+BUSQUEDA = EspacioCache('busqueda', 24 * 60 * 60)
+
+ESPACIOS = {e.nombre: e for e in (ESTADISTICAS, DETALLE, COMENTARIOS, CONTEO, SUGERENCIAS, BUSQUEDA)}
+
+
+def invalidar_espacios(*nombres):
+    """Invalida ya (sin esperar a un commit) los espacios dados, p. ej. tras un despliegue"""
+    desconocidos = [nombre for nombre in nombres if nombre not in ESPACIOS]
+    if desconocidos:
+        raise KeyError(f"Espacios de cache desconocidos: {', '.join(desconocidos)}")
+    incrementar_versiones([ESPACIOS[nombre].sello for nombre in nombres])
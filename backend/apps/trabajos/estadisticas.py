@@ -0,0 +1,113 @@
+# backend/apps/trabajos/estadisticas.py
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .actividad import totales_por_accion
+from .espacios import ESTADISTICAS
+from .versiones import incrementar_versiones
+
+logger = logging.getLogger(__name__)
+
+TOP_ESTADISTICAS = 5
+
+
+def _sello(grupo):
+    return f"estadisticas:{grupo}"
+
+
+def invalidar_estadisticas(grupo):
+    """
+    Invalida todas las instantáneas de un grupo ('trabajos', 'usuarios')
+    incrementando su sello: las claves antiguas dejan de leerse y expiran solas.
+    """
+    incrementar_versiones([_sello(grupo)])
+
+
+def estadisticas_cacheadas(grupo, alcance, calcular):
+    """
+    Devuelve la instantánea cacheada de `grupo` para el alcance (rol) dado,
+    o la calcula con `calcular()` y la guarda. Si la cache falla, calcula sin guardar.
+    """
+    return ESTADISTICAS.obtener((grupo, alcance), calcular, etiquetas=[_sello(grupo)])
+
+
+def calcular_estadisticas_trabajos(queryset):
+    """
+    Todos los contadores de trabajos en un solo GROUP BY (carrera, tipo, año,
+    estado): los totales por estado, carrera, tipo y año se suman en Python
+    sobre esas pocas filas en lugar de lanzar un COUNT por cada cifra.
+    """
+    grupos = (
+        queryset.order_by()
+        .values('carrera__nombre', 'tipo_trabajo', 'año', 'estado')
+        .annotate(total=Count('id'), descargas=Sum('total_descargas'))
+    )
+
+    por_estado, por_carrera, por_tipo, por_año = Counter(), Counter(), Counter(), Counter()
+    total_descargas = 0
+    for fila in grupos:
+        por_estado[fila['estado']] += fila['total']
+        por_carrera[fila['carrera__nombre'] or 'Sin carrera'] += fila['total']
+        por_tipo[fila['tipo_trabajo']] += fila['total']
+        por_año[str(fila['año'])] += fila['total']
+        total_descargas += fila['descargas'] or 0
+
+    aprobados = queryset.filter(estado='aprobado').order_by()
+    mas_descargados = aprobados.order_by('-total_descargas', '-id').values(
+        'id', 'titulo', 'total_descargas'
+    )[:TOP_ESTADISTICAS]
+    mejor_calificados = aprobados.filter(
+        calificacion_promedio__total_comentarios__gt=0
+    ).order_by(
+        '-calificacion_promedio__promedio_calificacion', '-calificacion_promedio__total_comentarios'
+    ).values(
+        'id', 'titulo',
+        promedio=F('calificacion_promedio__promedio_calificacion'),
+        total_comentarios=F('calificacion_promedio__total_comentarios'),
+    )[:TOP_ESTADISTICAS]
+
+    return {
+        'total_trabajos': sum(por_estado.values()),
+        'trabajos_aprobados': por_estado['aprobado'],
+        'trabajos_pendientes': por_estado['pendiente'],
+        'trabajos_rechazados': por_estado['rechazado'],
+        'total_descargas': total_descargas,
+        'trabajos_por_carrera': dict(por_carrera),
+        'trabajos_por_tipo': dict(por_tipo),
+        'trabajos_por_año': dict(sorted(por_año.items())),
+        'top_trabajos_mas_descargados': list(mas_descargados),
+        'top_trabajos_mejor_calificados': list(mejor_calificados),
+        # Vistas, descargas, etc. de los últimos 30 días, del resumen diario
+        'actividad_30_dias': totales_por_accion(
+            timezone.localdate() - timedelta(days=30), trabajos=queryset.order_by().values('id')
+        ),
+    }
+
+
+def calcular_estadisticas_usuarios(queryset, desde):
+    """Contadores de usuarios: un aggregate con filtros y un GROUP BY (rol, carrera)"""
+    totales = queryset.aggregate(
+        total_usuarios=Count('id'),
+        usuarios_activos=Count('id', filter=Q(activo=True)),
+        usuarios_inactivos=Count('id', filter=Q(activo=False)),
+        registros_recientes=Count('id', filter=Q(fecha_registro__gte=desde)),
+    )
+
+    por_rol, por_carrera = Counter(), Counter()
+    for fila in queryset.order_by().values('rol', 'carrera').annotate(total=Count('id')):
+        por_rol[fila['rol']] += fila['total']
+        if fila['carrera'] is not None:
+            por_carrera[fila['carrera']] += fila['total']
+
+    return {
+        'total_usuarios': totales['total_usuarios'],
+        'usuarios_activos': totales['usuarios_activos'],
+        'usuarios_inactivos': totales['usuarios_inactivos'],
+        'usuarios_por_rol': dict(por_rol),
+        'usuarios_por_carrera': dict(por_carrera),
+        'registros_recientes': totales['registros_recientes'],
+    }
@@ -0,0 +1,153 @@
+# backend/apps/trabajos/eventos.py
+import ipaddress
+import json
+import logging
+
+import redis
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .actividad import acumular_resumen
+from .contadores import cliente_redis, ejecucion_unica
+
+logger = logging.getLogger(__name__)
+
+# Cola de eventos de auditoría. Las vistas solo hacen un RPUSH; Celery la
+# vacía por lotes con bulk_create y acumula el resumen diario en la misma
+# transacción. Las descargas generan además su ReporteDescarga.
+CLAVE_EVENTOS = 'eventos:actividad'
+CLAVE_PROCESANDO = 'eventos:actividad:procesando'
+TAMANO_LOTE_EVENTOS = 5000
+LONGITUD_MAXIMA_USER_AGENT = 500
+# Se renueva en cada lote; caduca solo si el proceso muere sin liberarlo
+TTL_CERROJO_EVENTOS = 2 * 60
+
+
+def ip_cliente(request):
+    """IP del cliente, o None si la cabecera no trae una IP válida"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = x_forwarded_for.split(',')[0].strip() if x_forwarded_for else request.META.get('REMOTE_ADDR')
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+
+def registrar_evento(request, accion, trabajo, descripcion=''):
+    """
+    Encola un evento de auditoría sin escribir en la base de datos. Los
+    eventos de usuarios anónimos se descartan (LogActividades exige usuario).
+    Dentro de una transacción se encola al confirmarla, así una acción
+    revertida no queda registrada y el trabajo ya existe al procesarse.
+    """
+    if not request.user.is_authenticated:
+        return
+
+    evento = {
+        'a': accion,
+        'u': request.user.pk,
+        't': trabajo.pk if trabajo is not None else None,
+        'd': descripcion,
+        'ip': ip_cliente(request),
+        'ua': request.META.get('HTTP_USER_AGENT', '')[:LONGITUD_MAXIMA_USER_AGENT],
+        'f': timezone.now().isoformat(),
+    }
+    transaction.on_commit(lambda: _encolar(evento))
+
+
+def _encolar(evento):
+    try:
+        cliente_redis().rpush(CLAVE_EVENTOS, json.dumps(evento, separators=(',', ':')))
+    except redis.RedisError as e:
+        logger.warning(f"Redis no disponible para eventos, se guarda directamente: {e}")
+        guardar_eventos([evento])
+
+
+def guardar_eventos(eventos):
+    """Inserta un lote de eventos: LogActividades para todos y ReporteDescarga para las descargas"""
+    from django.contrib.auth import get_user_model
+    from apps.comentarios.models import ReporteDescarga
+    from .models import LogActividades, TrabajoInvestigacion
+
+    # Un trabajo o usuario borrado mientras el evento esperaba en la cola
+    # haría fallar todo el lote por la clave foránea
+    usuarios = set(get_user_model().objects.filter(
+        pk__in={e['u'] for e in eventos}
+    ).values_list('pk', flat=True))
+    carreras = dict(TrabajoInvestigacion.objects.filter(
+        pk__in={e['t'] for e in eventos if e['t']}
+    ).values_list('pk', 'carrera_id'))
+
+    logs, reportes = [], []
+    for evento in eventos:
+        if evento['u'] not in usuarios or (evento['t'] and evento['t'] not in carreras):
+            continue
+        fecha = parse_datetime(evento['f']) or timezone.now()
+        logs.append(LogActividades(
+            usuario_id=evento['u'],
+            accion=evento['a'],
+            trabajo_id=evento['t'],
+            descripcion=evento['d'],
+            ip_address=evento['ip'],
+            user_agent=evento['ua'],
+            fecha=fecha,
+        ))
+        if evento['a'] == 'download' and evento['t'] and evento['ip']:
+            reportes.append(ReporteDescarga(
+                trabajo_id=evento['t'],
+                usuario_id=evento['u'],
+                ip_address=evento['ip'],
+                user_agent=evento['ua'],
+                fecha_descarga=fecha,
+            ))
+
+    with transaction.atomic():
+        LogActividades.objects.bulk_create(logs, batch_size=1000)
+        ReporteDescarga.objects.bulk_create(reportes, batch_size=1000)
+        acumular_resumen(logs, carreras)
+    return len(logs)
+
+
+def procesar_eventos(tamano_lote=TAMANO_LOTE_EVENTOS):
+    """
+    Vacía la cola de eventos. La cola se renombra antes de leerla (los
+    eventos nuevos van a una lista nueva) y cada lote se recorta de la lista
+    en proceso solo después de insertarlo, así que un fallo no pierde eventos:
+    la siguiente ejecución retoma la lista en proceso. Solo vacía una
+    ejecución a la vez: dos leerían el mismo lote, lo insertarían dos veces y
+    recortarían eventos sin insertar.
+    """
+    with ejecucion_unica('procesar_eventos', TTL_CERROJO_EVENTOS) as cerrojo:
+        if cerrojo is None:
+            logger.info("Cola de eventos en proceso en otra ejecución; se omite")
+            return 0
+        return _procesar_eventos(cerrojo, tamano_lote)
+
+
+def _procesar_eventos(cerrojo, tamano_lote):
+    cliente = cliente_redis()
+    if not cliente.exists(CLAVE_PROCESANDO):
+        try:
+            cliente.rename(CLAVE_EVENTOS, CLAVE_PROCESANDO)
+        except redis.ResponseError:
+            return 0
+
+    total = 0
+    while True:
+        crudos = cliente.lrange(CLAVE_PROCESANDO, 0, tamano_lote - 1)
+        if not crudos:
+            break
+        eventos = []
+        for crudo in crudos:
+            try:
+                eventos.append(json.loads(crudo))
+            except ValueError:
+                logger.error(f"Evento de actividad inválido descartado: {crudo!r}")
+        total += guardar_eventos(eventos)
+        cliente.ltrim(CLAVE_PROCESANDO, len(crudos), -1)
+        # Mientras se vacía, el cerrojo no debe caducar
+        cerrojo.reacquire()
+
+    cliente.delete(CLAVE_PROCESANDO)
+    return total
@@ -0,0 +1,98 @@
+# backend/apps/trabajos/filters.py
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Func, Q, TextField
+from django.db.models.functions import Greatest, Lower
+from rest_framework import filters
+
+# Campos con índice GIN de trigramas sobre immutable_unaccent(lower(campo)) (migración 0007)
+CAMPOS_SUGERENCIA = ('titulo', 'autores', 'tutores')
+
+
+def buscar_texto_completo(queryset, texto):
+    """
+    Filtra por el vector de búsqueda en español (índice GIN) y anota `rango`
+    con ts_rank. Acepta la sintaxis de búsqueda web: "frase exacta", -excluir, OR.
+    """
+    consulta = SearchQuery(texto, config='spanish', search_type='websearch')
+    return queryset.filter(busqueda=consulta).annotate(rango=SearchRank(F('busqueda'), consulta))
+
+
+def visibles_para_encargado(usuario_id):
+    """Trabajos que ve un encargado: los suyos y los de grado y pasantías aprobados o pendientes"""
+    return (
+        Q(subido_por_id=usuario_id) |
+        Q(tipo_trabajo='especial_grado', estado__in=['aprobado', 'pendiente']) |
+        Q(tipo_trabajo='practicas_profesionales', estado__in=['aprobado', 'pendiente'])
+    )
+
+
+def buscar_icontains(queryset, texto, campos):
+    """Búsqueda por subcadena para bases de datos sin búsqueda de texto completo"""
+    condicion = Q()
+    for campo in campos:
+        condicion |= Q(**{f"{campo}__icontains": texto})
+    return queryset.filter(condicion)
+
+
+class BusquedaTextoCompletoFilter(filters.SearchFilter):
+    """
+    Reemplaza el SearchFilter (ILIKE '%q%' por columna) por la búsqueda de
+    texto completo de PostgreSQL, ordenada por relevancia salvo que la
+    petición pida otro orden con `ordering`. Debe ir después de OrderingFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        texto = request.query_params.get(self.search_param, '').strip()
+        if not texto:
+            return queryset
+        if connection.vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = buscar_texto_completo(queryset, texto)
+        if request.query_params.get('ordering'):
+            return queryset
+        return queryset.order_by('-rango', '-fecha_subida', '-id')
+
+
+class InmutableUnaccent(Func):
+    """Envoltorio IMMUTABLE de unaccent() que usan los índices de trigramas"""
+    function = 'immutable_unaccent'
+    output_field = TextField()
+
+
+def normalizar_sugerencia(texto):
+    """Minúsculas y sin acentos, igual que la expresión indexada"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).lower().split())
+
+
+def sugerir_trabajos(queryset, texto, limite):
+    """
+    Trabajos cuyo título, autores o tutores contienen una palabra parecida a
+    `texto` (similitud de palabra por trigramas, tolerante a erratas y acentos),
+    ordenados por la mejor similitud. Devuelve diccionarios con las columnas
+    mínimas para el desplegable del buscador.
+    """
+    columnas = ('id', 'titulo', 'autores', 'tutores')
+    if connection.vendor != 'postgresql':
+        return list(buscar_icontains(queryset, texto, CAMPOS_SUGERENCIA).values(*columnas)[:limite])
+
+    texto = normalizar_sugerencia(texto)
+    normalizados = {f"{campo}_norm": InmutableUnaccent(Lower(campo)) for campo in CAMPOS_SUGERENCIA}
+    condicion = Q()
+    for alias in normalizados:
+        # `columna %> texto` usa el índice de trigramas de la columna
+        condicion |= Q(**{f"{alias}__trigram_word_similar": texto})
+
+    puntuacion = Greatest(*[TrigramWordSimilarity(texto, alias) for alias in normalizados])
+    filas = (
+        queryset.alias(**normalizados)
+        .filter(condicion)
+        .annotate(puntuacion=puntuacion)
+        .order_by('-puntuacion', '-id')
+        .values(*columnas, 'puntuacion')[:limite]
+    )
+    return [dict(fila, puntuacion=round(fila['puntuacion'], 3)) for fila in filas]
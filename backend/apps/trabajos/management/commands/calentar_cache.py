@@ -0,0 +1,62 @@
+# backend/apps/trabajos/management/commands/calentar_cache.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from apps.trabajos.detalle import detalle_cacheado, serializar_detalle
+from apps.trabajos.espacios import ESPACIOS, invalidar_espacios
+from apps.trabajos.estadisticas import calcular_estadisticas_usuarios, estadisticas_cacheadas
+from apps.trabajos.models import TrabajoInvestigacion
+from apps.trabajos.versiones import leer_versiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Rellena las claves más pedidas de la cache tras un despliegue: sellos de "
+        "versión, detalle (con su resumen de comentarios) de los trabajos más "
+        "vistos y estadísticas de usuarios. Con --invalidar descarta antes los "
+        "espacios cuyo formato haya cambiado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trabajos', type=int, default=50,
+            help='Cuántos trabajos aprobados (los más vistos y descargados) precalentar.',
+        )
+        parser.add_argument(
+            '--invalidar', nargs='+', default=[], metavar='ESPACIO',
+            help=f"Espacios a invalidar antes de calentar: {', '.join(ESPACIOS)}.",
+        )
+
+    def handle(self, *args, **options):
+        if options['invalidar']:
+            try:
+                invalidar_espacios(*options['invalidar'])
+            except KeyError as e:
+                raise CommandError(e.args[0])
+            self.stdout.write(f"Espacios invalidados: {', '.join(options['invalidar'])}")
+
+        # Sellos: sin ellos la primera petición de cada clave los crea
+        leer_versiones(['trabajos', 'carreras', 'usuarios', *(e.sello for e in ESPACIOS.values())])
+
+        populares = (
+            TrabajoInvestigacion.objects.filter(estado='aprobado')
+            .order_by((F('total_vistas') + F('total_descargas')).desc(), '-id')
+            .values_list('pk', flat=True)[:max(options['trabajos'], 0)]
+        )
+        calentados = 0
+        for pk in populares:
+            if detalle_cacheado(pk, lambda: serializar_detalle(pk)) is not None:
+                calentados += 1
+
+        # Los mismos 30 días que muestra UsuarioViewSet.estadisticas
+        desde = timezone.now() - timedelta(days=30)
+        estadisticas_cacheadas(
+            'usuarios', 'todos',
+            lambda: calcular_estadisticas_usuarios(get_user_model().objects.all(), desde)
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Cache calentada: {calentados} detalles de trabajos."))
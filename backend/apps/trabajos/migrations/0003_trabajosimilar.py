@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0002_trabajoinvestigacion_estudiante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntuacion', models.FloatField(verbose_name='Puntuación de Similitud')),
+                ('posicion', models.PositiveSmallIntegerField(verbose_name='Posición')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Fecha de Cálculo')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_de', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo Similar')),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similares', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+            ],
+            options={
+                'verbose_name': 'Trabajo Similar',
+                'verbose_name_plural': 'Trabajos Similares',
+                'db_table': 'trabajos_similares',
+                'ordering': ['trabajo', 'posicion'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trabajosimilar',
+            constraint=models.UniqueConstraint(fields=('trabajo', 'posicion'), name='trabajo_similar_posicion_unica'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copiar_contenido(apps, schema_editor):
+    TrabajoInvestigacion = apps.get_model('trabajos', 'TrabajoInvestigacion')
+    TrabajoContenido = apps.get_model('trabajos', 'TrabajoContenido')
+    pendientes = (
+        TrabajoInvestigacion.objects
+        .exclude(contenido_extraido='', embedding_vector__isnull=True)
+        .values_list('id', 'contenido_extraido', 'embedding_vector')
+        .iterator(chunk_size=500)
+    )
+    lote = []
+    for trabajo_id, contenido, embedding in pendientes:
+        lote.append(TrabajoContenido(trabajo_id=trabajo_id, contenido_extraido=contenido, embedding_vector=embedding))
+        if len(lote) >= 500:
+            TrabajoContenido.objects.bulk_create(lote)
+            lote = []
+    TrabajoContenido.objects.bulk_create(lote)
+
+
+def restaurar_contenido(apps, schema_editor):
+    TrabajoInvestigacion = apps.get_model('trabajos', 'TrabajoInvestigacion')
+    TrabajoContenido = apps.get_model('trabajos', 'TrabajoContenido')
+    for contenido in TrabajoContenido.objects.iterator(chunk_size=500):
+        TrabajoInvestigacion.objects.filter(id=contenido.trabajo_id).update(
+            contenido_extraido=contenido.contenido_extraido,
+            embedding_vector=contenido.embedding_vector
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0003_trabajosimilar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoContenido',
+            fields=[
+                ('trabajo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contenido', serialize=False, to='trabajos.trabajoinvestigacion', verbose_name='Trabajo')),
+                ('contenido_extraido', models.TextField(blank=True, verbose_name='Contenido Extraído')),
+                ('embedding_vector', models.JSONField(blank=True, null=True, verbose_name='Vector de Embedding')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contenido de Trabajo',
+                'verbose_name_plural': 'Contenidos de Trabajos',
+                'db_table': 'trabajos_contenido',
+            },
+        ),
+        migrations.RunPython(copiar_contenido, restaurar_contenido),
+        migrations.RemoveField(
+            model_name='trabajoinvestigacion',
+            name='contenido_extraido',
+        ),
+        migrations.RemoveField(
+            model_name='trabajoinvestigacion',
+            name='embedding_vector',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0004_trabajocontenido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logactividades',
+            index=models.Index(fields=['-fecha', '-id'], name='log_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajoinvestigacion',
+            index=models.Index(fields=['estado', '-fecha_subida', '-id'], name='trabajo_estado_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# El vector se calcula en la base de datos para que cualquier escritura
+# (save, update, admin, SQL directo) lo mantenga al día. El contenido
+# extraído vive en trabajos_contenido, así que sus cambios también recalculan.
+# El contenido se trunca porque un tsvector no puede superar 1 MB.
+SQL_TRIGGERS = """
+CREATE OR REPLACE FUNCTION trabajos_busqueda_trigger() RETURNS trigger AS $$
+DECLARE
+    texto text;
+BEGIN
+    SELECT left(contenido_extraido, 300000) INTO texto
+    FROM trabajos_contenido WHERE trabajo_id = NEW.id;
+
+    NEW.busqueda :=
+        setweight(to_tsvector('spanish', coalesce(NEW.titulo, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.autores, '') || ' ' || coalesce(NEW.tutores, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.resumen, '') || ' ' || coalesce(NEW.objetivos, '')), 'C') ||
+        setweight(to_tsvector('spanish', coalesce(texto, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trabajos_busqueda_actualizar
+BEFORE INSERT OR UPDATE OF titulo, autores, tutores, resumen, objetivos, busqueda
+ON trabajos_investigacion
+FOR EACH ROW EXECUTE FUNCTION trabajos_busqueda_trigger();
+
+CREATE OR REPLACE FUNCTION trabajos_contenido_busqueda_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE trabajos_investigacion SET busqueda = NULL WHERE id = OLD.trabajo_id;
+    ELSE
+        UPDATE trabajos_investigacion SET busqueda = NULL WHERE id = NEW.trabajo_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trabajos_contenido_busqueda
+AFTER INSERT OR DELETE OR UPDATE OF contenido_extraido
+ON trabajos_contenido
+FOR EACH ROW EXECUTE FUNCTION trabajos_contenido_busqueda_trigger();
+
+-- Calcular el vector de los trabajos existentes
+UPDATE trabajos_investigacion SET busqueda = NULL;
+"""
+
+SQL_TRIGGERS_REVERSE = """
+DROP TRIGGER IF EXISTS trabajos_contenido_busqueda ON trabajos_contenido;
+DROP FUNCTION IF EXISTS trabajos_contenido_busqueda_trigger();
+DROP TRIGGER IF EXISTS trabajos_busqueda_actualizar ON trabajos_investigacion;
+DROP FUNCTION IF EXISTS trabajos_busqueda_trigger();
+"""
+
+
+# Los disparadores son plpgsql: en otros motores (p. ej. SQLite en pruebas) el
+# vector queda sin calcular y la búsqueda usa el fallback con icontains.
+def crear_disparadores(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_TRIGGERS, params=None)
+
+
+def borrar_disparadores(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_TRIGGERS_REVERSE, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0005_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoinvestigacion',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vector de Búsqueda'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajoinvestigacion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='trabajo_busqueda_gin'),
+        ),
+        migrations.RunPython(crear_disparadores, borrar_disparadores),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:40
+
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+
+# unaccent() es STABLE (depende del diccionario configurado), así que no puede
+# usarse en un índice. El envoltorio fija el diccionario y se declara IMMUTABLE.
+SQL_INDICES = """
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+CREATE INDEX IF NOT EXISTS trabajo_titulo_trgm
+    ON trabajos_investigacion USING gin (immutable_unaccent(lower(titulo)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS trabajo_autores_trgm
+    ON trabajos_investigacion USING gin (immutable_unaccent(lower(autores)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS trabajo_tutores_trgm
+    ON trabajos_investigacion USING gin (immutable_unaccent(lower(tutores)) gin_trgm_ops);
+"""
+
+SQL_INDICES_REVERSE = """
+DROP INDEX IF EXISTS trabajo_tutores_trgm;
+DROP INDEX IF EXISTS trabajo_autores_trgm;
+DROP INDEX IF EXISTS trabajo_titulo_trgm;
+DROP FUNCTION IF EXISTS immutable_unaccent(text);
+"""
+
+
+# Las extensiones solo existen en PostgreSQL; en otros motores las
+# sugerencias usan el fallback con icontains (filters.sugerir_trabajos).
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_INDICES, params=None)
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_INDICES_REVERSE, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0006_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
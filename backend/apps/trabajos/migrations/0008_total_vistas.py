@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0007_sugerencias_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoinvestigacion',
+            name='total_vistas',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total Vistas'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0008_total_vistas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logactividades',
+            name='accion',
+            field=models.CharField(choices=[('upload', 'Subida de archivo'), ('download', 'Descarga de archivo'), ('view', 'Visualización'), ('approve', 'Aprobación'), ('reject', 'Rechazo'), ('delete', 'Eliminación'), ('login', 'Inicio de sesión'), ('search', 'Búsqueda'), ('comment', 'Comentario'), ('rate', 'Calificación')], max_length=20, verbose_name='Acción'),
+        ),
+        migrations.AlterField(
+            model_name='logactividades',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+
+
+# Convierte log_actividades en una tabla particionada por mes de `fecha`:
+# se renombra la tabla, se crea la nueva (misma estructura, PK (id, fecha)
+# porque la clave de partición debe formar parte de la PK), se crean las
+# particiones desde el mes del registro más antiguo hasta 3 meses adelante,
+# se copian las filas y se recrean índices y claves foráneas con sus nombres.
+# El B-tree de `fecha` no se recrea: la operación siguiente lo cambia por BRIN.
+SQL_PARTICIONAR = """
+DO $$
+DECLARE
+    indices text[];
+    foraneas text[];
+    definicion text;
+    secuencia text;
+    es_identity boolean;
+    mes date;
+    fin date;
+BEGIN
+    SELECT coalesce(array_agg(indexdef), '{}') INTO indices
+    FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename = 'log_actividades'
+      AND indexname <> 'log_activid_fecha_f9c570_idx'
+      AND indexname NOT IN (
+          SELECT conname FROM pg_constraint
+          WHERE conrelid = 'log_actividades'::regclass AND contype = 'p'
+      );
+    SELECT coalesce(array_agg(format('ALTER TABLE log_actividades ADD CONSTRAINT %I %s',
+                                     conname, pg_get_constraintdef(oid))), '{}')
+    INTO foraneas
+    FROM pg_constraint
+    WHERE conrelid = 'log_actividades'::regclass AND contype = 'f';
+    SELECT attidentity <> '' INTO es_identity
+    FROM pg_attribute WHERE attrelid = 'log_actividades'::regclass AND attname = 'id';
+
+    ALTER TABLE log_actividades RENAME TO log_actividades_antiguo;
+    CREATE TABLE log_actividades (LIKE log_actividades_antiguo INCLUDING DEFAULTS INCLUDING IDENTITY)
+        PARTITION BY RANGE (fecha);
+    ALTER TABLE log_actividades ADD PRIMARY KEY (id, fecha);
+    CREATE TABLE log_actividades_default PARTITION OF log_actividades DEFAULT;
+
+    SELECT date_trunc('month', coalesce(min(fecha), now()) AT TIME ZONE 'UTC')::date
+    INTO mes FROM log_actividades_antiguo;
+    fin := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '4 months')::date;
+    WHILE mes < fin LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF log_actividades FOR VALUES FROM (%L) TO (%L)',
+            'log_actividades_p' || to_char(mes, 'YYYY_MM'),
+            mes::timestamp AT TIME ZONE 'UTC',
+            (mes + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+        mes := (mes + interval '1 month')::date;
+    END LOOP;
+
+    INSERT INTO log_actividades SELECT * FROM log_actividades_antiguo;
+
+    IF es_identity THEN
+        PERFORM setval(pg_get_serial_sequence('log_actividades', 'id'), max(id)) FROM log_actividades;
+    ELSE
+        -- serial: la secuencia pertenece a la columna antigua y se borraría con ella
+        secuencia := pg_get_serial_sequence('log_actividades_antiguo', 'id');
+        IF secuencia IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY log_actividades.id', secuencia);
+        END IF;
+    END IF;
+
+    DROP TABLE log_actividades_antiguo;
+    FOREACH definicion IN ARRAY indices LOOP
+        EXECUTE definicion;
+    END LOOP;
+    FOREACH definicion IN ARRAY foraneas LOOP
+        EXECUTE definicion;
+    END LOOP;
+END
+$$;
+"""
+
+SQL_RESUMEN_INICIAL = """
+INSERT INTO resumen_actividad_diaria (fecha, accion, trabajo_id, carrera_id, total)
+SELECT (l.fecha AT TIME ZONE %s)::date, l.accion, l.trabajo_id, t.carrera_id, count(*)
+FROM log_actividades l
+LEFT JOIN trabajos_investigacion t ON t.id = l.trabajo_id
+GROUP BY 1, 2, 3, 4
+"""
+
+
+def particionar_log(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_PARTICIONAR, params=None)
+
+
+def resumen_inicial(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_RESUMEN_INICIAL, [settings.TIME_ZONE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0009_log_eventos_por_lotes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenActividadDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('accion', models.CharField(choices=[('upload', 'Subida de archivo'), ('download', 'Descarga de archivo'), ('view', 'Visualización'), ('approve', 'Aprobación'), ('reject', 'Rechazo'), ('delete', 'Eliminación'), ('login', 'Inicio de sesión'), ('search', 'Búsqueda'), ('comment', 'Comentario'), ('rate', 'Calificación')], max_length=20, verbose_name='Acción')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Actividad Diaria',
+                'verbose_name_plural': 'Resúmenes de Actividad Diaria',
+                'db_table': 'resumen_actividad_diaria',
+            },
+        ),
+        # Al revertir la tabla queda particionada: el modelo funciona igual sobre ella
+        migrations.RunPython(particionar_log, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='logactividades',
+            name='log_activid_fecha_f9c570_idx',
+        ),
+        migrations.AddIndex(
+            model_name='logactividades',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['fecha'], name='log_fecha_brin'),
+        ),
+        migrations.AddField(
+            model_name='resumenactividaddiaria',
+            name='carrera',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_actividad', to='trabajos.configuracioncarrera', verbose_name='Carrera'),
+        ),
+        migrations.AddField(
+            model_name='resumenactividaddiaria',
+            name='trabajo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_actividad', to='trabajos.trabajoinvestigacion', verbose_name='Trabajo'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenactividaddiaria',
+            index=models.Index(fields=['fecha', 'accion'], name='resumen_fecha_accion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenactividaddiaria',
+            constraint=models.UniqueConstraint(models.F('fecha'), models.F('accion'), django.db.models.functions.comparison.Coalesce('trabajo', 0), django.db.models.functions.comparison.Coalesce('carrera', 0), name='resumen_actividad_unico'),
+        ),
+        migrations.RunPython(resumen_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0010_log_particionado_resumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoinvestigacion',
+            name='hash_sha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Hash SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='trabajoinvestigacion',
+            name='paginas',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajoinvestigacion',
+            index=models.Index(condition=models.Q(('hash_sha256', ''), _negated=True), fields=['hash_sha256'], name='trabajo_hash_sha256_idx'),
+        ),
+    ]
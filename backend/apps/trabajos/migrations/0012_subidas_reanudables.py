@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trabajos', '0011_huella_archivos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaReanudable',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Nombre del Archivo')),
+                ('tamaño_total', models.PositiveBigIntegerField(verbose_name='Tamaño Total (bytes)')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256 Esperado')),
+                ('recibido', models.PositiveBigIntegerField(default=0, verbose_name='Bytes Recibidos')),
+                ('clave', models.CharField(max_length=255, verbose_name='Clave en el Almacenamiento')),
+                ('upload_id', models.CharField(blank=True, max_length=255, verbose_name='ID de Subida Multiparte')),
+                ('partes', models.JSONField(blank=True, default=list, verbose_name='Partes Subidas')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_reanudables', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Subida Reanudable',
+                'verbose_name_plural': 'Subidas Reanudables',
+                'db_table': 'subidas_reanudables',
+                'indexes': [models.Index(fields=['fecha_actualizacion'], name='subida_fecha_act_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajos', '0012_subidas_reanudables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VolcadoContadores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True, verbose_name='Token')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Volcado de Contadores',
+                'verbose_name_plural': 'Volcados de Contadores',
+                'db_table': 'volcados_contadores',
+                'indexes': [models.Index(fields=['fecha'], name='volcado_fecha_idx')],
+            },
+        ),
+    ]
@@ -2,6 +2,9 @@
 import os
 import uuid
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -10,6 +13,11 @@ from django.utils import timezone
 
 def archivo_pdf_upload_path(instance, filename):
     """Genera el path donde se guardará el archivo PDF"""
+    # Con la huella ya calculada, la ruta depende solo del contenido
+    if instance.hash_sha256:
+        from .archivos import ruta_por_contenido
+        return ruta_por_contenido(instance.hash_sha256)
+    
     # SOLUCIÓN: Si fecha_subida es None (porque es un objeto nuevo), usamos la fecha actual
     fecha_obj = instance.fecha_subida or timezone.now()
     fecha_str = fecha_obj.strftime('%Y/%m/%d')
@@ -62,14 +70,16 @@ class TrabajoInvestigacion(models.Model):
         verbose_name='Archivo PDF'
     )
     
-    # Contenido extraído por IA
-    contenido_extraido = models.TextField(blank=True, verbose_name='Contenido Extraído')
+    # Contenido extraído por IA (el texto completo está en TrabajoContenido)
     objetivos = models.TextField(blank=True, verbose_name='Objetivos')
     resumen = models.TextField(blank=True, verbose_name='Resumen')
     
-    # Metadatos del archivo
+    # Metadatos del archivo. Se calculan una sola vez, al recibir el archivo
+    # (ver archivos.py); el SHA-256 detecta los PDFs duplicados
     tamaño_archivo = models.PositiveIntegerField(verbose_name='Tamaño del Archivo (bytes)')
     hash_md5 = models.CharField(max_length=32, verbose_name='Hash MD5', blank=True)
+    hash_sha256 = models.CharField(max_length=64, verbose_name='Hash SHA-256', blank=True)
+    paginas = models.PositiveIntegerField(null=True, blank=True, verbose_name='Páginas')
     
     # Estados y aprobación
     estado = models.CharField(
@@ -82,10 +92,14 @@ class TrabajoInvestigacion(models.Model):
     fecha_aprobacion = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Aprobación')
     
     # IA y recomendaciones
-    embedding_vector = models.JSONField(null=True, blank=True, verbose_name='Vector de Embedding')
     similitud_trabajo = models.FloatField(default=0.0, verbose_name='Puntuación de Similitud')
     tags_ia = models.JSONField(default=list, blank=True, verbose_name='Tags Generados por IA')
     
+    # Vector de búsqueda de texto completo (español) sobre título, autores,
+    # tutores, resumen, objetivos y contenido extraído. Lo mantiene un trigger
+    # de la base de datos (migración 0006), no se asigna desde Django.
+    busqueda = SearchVectorField(null=True, editable=False, verbose_name='Vector de Búsqueda')
+    
     # Usuario que subió el trabajo
     subido_por = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -113,8 +127,9 @@ class TrabajoInvestigacion(models.Model):
         verbose_name='Aprobado por'
     )
     
-    # Contador de descargas
+    # Contadores. Se incrementan en Redis y Celery los vuelca por lotes (ver contadores.py)
     total_descargas = models.PositiveIntegerField(default=0, verbose_name='Total Descargas')
+    total_vistas = models.PositiveIntegerField(default=0, verbose_name='Total Vistas')
     
     class Meta:
         db_table = 'trabajos_investigacion'
@@ -127,14 +142,32 @@ class TrabajoInvestigacion(models.Model):
             models.Index(fields=['estado']),
             models.Index(fields=['año']),
             models.Index(fields=['subido_por']),
+            # Paginación por cursor del catálogo: WHERE estado = ... ORDER BY fecha_subida DESC, id DESC
+            models.Index(fields=['estado', '-fecha_subida', '-id'], name='trabajo_estado_fecha_id_idx'),
+            GinIndex(fields=['busqueda'], name='trabajo_busqueda_gin'),
+            models.Index(
+                fields=['hash_sha256'], name='trabajo_hash_sha256_idx',
+                condition=~models.Q(hash_sha256='')
+            ),
         ]
     
     def __str__(self):
         return f"{self.titulo} ({self.año})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if 'estado' in instancia.__dict__:
+            # Para saber al guardar si el trabajo entra o sale de los aprobados
+            instancia._estado_guardado = instancia.estado
+        return instancia
+    
     def save(self, *args, **kwargs):
-        if self.archivo_pdf:
-            self.tamaño_archivo = self.archivo_pdf.size
+        # Solo un archivo recién asignado (aún sin guardar en el almacenamiento):
+        # sus metadatos se leen del archivo subido, sin consultar al almacenamiento
+        if self.archivo_pdf and not self.archivo_pdf._committed:
+            from .archivos import registrar_archivo
+            registrar_archivo(self, self.archivo_pdf.file)
         super().save(*args, **kwargs)
     
     @property
@@ -150,9 +183,9 @@ class TrabajoInvestigacion(models.Model):
         return self.estado == 'aprobado'
     
     def incrementar_descargas(self):
-        """Incrementa el contador de descargas"""
-        self.total_descargas += 1
-        self.save(update_fields=['total_descargas'])
+        """Cuenta una descarga (en Redis; se vuelca a la base de datos por lotes)"""
+        from .contadores import incrementar
+        incrementar('descargas', self.pk)
     
     def marcar_como_aprobado(self, usuario_aprobador):
         """Marca el trabajo como aprobado"""
@@ -160,14 +193,73 @@ class TrabajoInvestigacion(models.Model):
         self.estado = 'aprobado'
         self.aprobado_por = usuario_aprobador
         self.fecha_aprobacion = timezone.now()
-        self.save()
+        # Sin los contadores: una copia vieja pisaría lo volcado desde Redis
+        self.save(update_fields=['estado', 'aprobado_por', 'fecha_aprobacion'])
     
     def marcar_como_rechazado(self, motivo=''):
         """Marca el trabajo como rechazado"""
         self.estado = 'rechazado'
         if motivo:
             self.resumen = f"{self.resumen}\n\nMotivo de rechazo: {motivo}"
-        self.save()
+        self.save(update_fields=['estado', 'resumen'])
+
+
+class TrabajoContenido(models.Model):
+    """
+    Texto completo y vector de embedding de un trabajo. Están fuera de la tabla
+    principal para que los listados no los lean; solo los usan el detalle y la IA.
+    """
+    trabajo = models.OneToOneField(
+        TrabajoInvestigacion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contenido',
+        verbose_name='Trabajo'
+    )
+    contenido_extraido = models.TextField(blank=True, verbose_name='Contenido Extraído')
+    embedding_vector = models.JSONField(null=True, blank=True, verbose_name='Vector de Embedding')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'trabajos_contenido'
+        verbose_name = 'Contenido de Trabajo'
+        verbose_name_plural = 'Contenidos de Trabajos'
+    
+    def __str__(self):
+        return f"Contenido de {self.trabajo_id}"
+
+
+class TrabajoSimilar(models.Model):
+    """
+    Vecinos más cercanos de un trabajo, precalculados por el servicio de IA
+    """
+    trabajo = models.ForeignKey(
+        TrabajoInvestigacion,
+        on_delete=models.CASCADE,
+        related_name='similares',
+        verbose_name='Trabajo'
+    )
+    similar = models.ForeignKey(
+        TrabajoInvestigacion,
+        on_delete=models.CASCADE,
+        related_name='similar_de',
+        verbose_name='Trabajo Similar'
+    )
+    puntuacion = models.FloatField(verbose_name='Puntuación de Similitud')
+    posicion = models.PositiveSmallIntegerField(verbose_name='Posición')
+    fecha_calculo = models.DateTimeField(auto_now=True, verbose_name='Fecha de Cálculo')
+    
+    class Meta:
+        db_table = 'trabajos_similares'
+        verbose_name = 'Trabajo Similar'
+        verbose_name_plural = 'Trabajos Similares'
+        ordering = ['trabajo', 'posicion']
+        constraints = [
+            models.UniqueConstraint(fields=['trabajo', 'posicion'], name='trabajo_similar_posicion_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trabajo_id} -> {self.similar_id} ({self.puntuacion:.3f})"
 
 
 class ConfiguracionCarrera(models.Model):
@@ -233,6 +325,7 @@ class LogActividades(models.Model):
     ACCION_CHOICES = [
         ('upload', 'Subida de archivo'),
         ('download', 'Descarga de archivo'),
+        ('view', 'Visualización'),
         ('approve', 'Aprobación'),
         ('reject', 'Rechazo'),
         ('delete', 'Eliminación'),
@@ -262,7 +355,8 @@ class LogActividades(models.Model):
     descripcion = models.TextField(verbose_name='Descripción')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    fecha = models.DateTimeField(auto_now_add=True)
+    # default en lugar de auto_now_add: los eventos encolados conservan su hora al insertarse por lotes
+    fecha = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'log_actividades'
@@ -272,8 +366,117 @@ class LogActividades(models.Model):
         indexes = [
             models.Index(fields=['usuario']),
             models.Index(fields=['accion']),
-            models.Index(fields=['fecha']),
+            # La tabla está particionada por mes sobre `fecha` (migración 0010) y las
+            # filas llegan en orden de fecha: BRIN ocupa unas páginas frente a un B-tree
+            BrinIndex(fields=['fecha'], name='log_fecha_brin'),
+            models.Index(fields=['-fecha', '-id'], name='log_fecha_id_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.get_accion_display()} - {self.fecha}"
+
+
+class ResumenActividadDiaria(models.Model):
+    """
+    Conteo diario de actividades por acción, trabajo y carrera. Se acumula al
+    insertar cada lote de LogActividades y es lo que leen las estadísticas,
+    así que sobrevive al borrado de las particiones antiguas del log.
+    """
+    fecha = models.DateField(verbose_name='Fecha')
+    accion = models.CharField(
+        max_length=20,
+        choices=LogActividades.ACCION_CHOICES,
+        verbose_name='Acción'
+    )
+    trabajo = models.ForeignKey(
+        TrabajoInvestigacion,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='resumenes_actividad',
+        verbose_name='Trabajo'
+    )
+    carrera = models.ForeignKey(
+        ConfiguracionCarrera,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='resumenes_actividad',
+        verbose_name='Carrera'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name='Total')
+    
+    class Meta:
+        db_table = 'resumen_actividad_diaria'
+        verbose_name = 'Resumen de Actividad Diaria'
+        verbose_name_plural = 'Resúmenes de Actividad Diaria'
+        constraints = [
+            # COALESCE para que las filas sin trabajo/carrera también sean únicas (ON CONFLICT)
+            models.UniqueConstraint(
+                'fecha', 'accion', Coalesce('trabajo', 0), Coalesce('carrera', 0),
+                name='resumen_actividad_unico'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fecha', 'accion'], name='resumen_fecha_accion_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.accion}: {self.total}"
+
+
+class VolcadoContadores(models.Model):
+    """
+    Volcados de contadores ya aplicados. El token identifica el hash de Redis
+    volcado y se guarda en la misma transacción que los UPDATE: si el hash no
+    llegó a borrarse de Redis, el siguiente volcado lo reconoce y no lo suma dos veces.
+    """
+    token = models.CharField(max_length=32, unique=True, verbose_name='Token')
+    fecha = models.DateTimeField(default=timezone.now, verbose_name='Fecha')
+    
+    class Meta:
+        db_table = 'volcados_contadores'
+        verbose_name = 'Volcado de Contadores'
+        verbose_name_plural = 'Volcados de Contadores'
+        indexes = [
+            models.Index(fields=['fecha'], name='volcado_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} ({self.fecha})"
+
+
+class SubidaReanudable(models.Model):
+    """
+    Subida de un PDF por fragmentos (iniciar → PUT de fragmentos → finalizar).
+    Los fragmentos se escriben en orden directamente en el almacenamiento;
+    `recibido` es el desplazamiento desde el que el cliente continúa tras un corte.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='subidas_reanudables',
+        verbose_name='Usuario'
+    )
+    nombre_archivo = models.CharField(max_length=255, verbose_name='Nombre del Archivo')
+    tamaño_total = models.PositiveBigIntegerField(verbose_name='Tamaño Total (bytes)')
+    sha256 = models.CharField(max_length=64, verbose_name='SHA-256 Esperado')
+    recibido = models.PositiveBigIntegerField(default=0, verbose_name='Bytes Recibidos')
+    # Objeto temporal en el almacenamiento y, con S3, la subida multiparte
+    clave = models.CharField(max_length=255, verbose_name='Clave en el Almacenamiento')
+    upload_id = models.CharField(max_length=255, blank=True, verbose_name='ID de Subida Multiparte')
+    partes = models.JSONField(default=list, blank=True, verbose_name='Partes Subidas')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'subidas_reanudables'
+        verbose_name = 'Subida Reanudable'
+        verbose_name_plural = 'Subidas Reanudables'
+        indexes = [
+            models.Index(fields=['fecha_actualizacion'], name='subida_fecha_act_idx'),
         ]
     
     def __str__(self):
-        return f"{self.usuario.username} - {self.get_accion_display()} - {self.fecha}"
\ No newline at end of file
+        return f"{self.nombre_archivo} ({self.recibido}/{self.tamaño_total})"
@@ -0,0 +1,212 @@
+# backend/apps/trabajos/pagination.py
+import base64
+import hashlib
+import json
+import logging
+
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .espacios import CONTEO
+
+logger = logging.getLogger(__name__)
+
+# A partir de este número de filas, el total de una tabla sin filtros se toma
+# de las estadísticas de PostgreSQL (pg_class.reltuples) en lugar de COUNT(*)
+UMBRAL_CONTEO_ESTIMADO = 10000
+
+
+def _conteo_estimado_tabla(tabla):
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [tabla])
+        fila = cursor.fetchone()
+    return fila[0] if fila and fila[0] and fila[0] > 0 else None
+
+
+def contar(queryset, timeout=None):
+    """
+    Total de filas de un queryset sin ejecutar COUNT(*) en cada página:
+    estimado por estadísticas si no tiene filtros y la tabla es grande,
+    y si no, COUNT(*) cacheado en el espacio CONTEO unos segundos por consulta.
+    """
+    if not queryset.query.where:
+        estimado = _conteo_estimado_tabla(queryset.model._meta.db_table)
+        if estimado is not None and estimado >= UMBRAL_CONTEO_ESTIMADO:
+            return estimado
+
+    try:
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        # queryset.none() o un filtro __in vacío
+        return 0
+    huella = hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+    return CONTEO.obtener((huella,), queryset.count, ttl=timeout)
+
+
+class PaginadorConteoCacheado(Paginator):
+    @cached_property
+    def count(self):
+        return contar(self.object_list)
+
+
+class PaginacionClasica(PageNumberPagination):
+    """
+    Paginación por número de página (compatibilidad con el frontend actual),
+    con el total estimado o cacheado en lugar de un COUNT(*) por petición.
+    """
+    django_paginator_class = PaginadorConteoCacheado
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class PaginacionKeyset(BasePagination):
+    """
+    Paginación por cursor sobre (campo de orden, id): cada página filtra a
+    partir de la última fila de la anterior en lugar de usar OFFSET, así que
+    el coste no crece con la profundidad. El orden admite los campos de
+    `ordering_fields` de la vista; por defecto el de `ordering`.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self._page_size(request)
+        self.campo, self.descendente = self._orden(request, view)
+        cursor = self._decodificar_cursor(request)
+        base = queryset
+
+        orden = [f"-{self.campo}", '-id'] if self.descendente else [self.campo, 'id']
+        atras = cursor is not None and cursor.get('d') == 'prev'
+        if atras:
+            orden = [c[1:] if c.startswith('-') else f"-{c}" for c in orden]
+
+        queryset = queryset.order_by(*orden)
+        if cursor is not None:
+            queryset = queryset.filter(self._despues_de(cursor['v'], cursor['id'], self.descendente != atras))
+
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if atras:
+            filas.reverse()
+
+        self.siguiente = self.anterior = None
+        if filas:
+            if hay_mas or atras:
+                self.siguiente = self._posicion(filas[-1], 'next')
+            if (cursor is not None and not atras) or (atras and hay_mas):
+                self.anterior = self._posicion(filas[0], 'prev')
+
+        self.mostrar_total = request.query_params.get('con_total') in ('1', 'true')
+        if self.mostrar_total:
+            self.total = contar(base.order_by())
+        return filas
+
+    def get_paginated_response(self, data):
+        respuesta = {
+            'next': self._url(self.siguiente),
+            'previous': self._url(self.anterior),
+            'results': data,
+        }
+        if self.mostrar_total:
+            respuesta['count'] = self.total
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def _page_size(self, request):
+        try:
+            valor = int(request.query_params[self.page_size_query_param])
+            if valor > 0:
+                return min(valor, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def _orden(self, request, view):
+        permitidos = set(getattr(view, 'ordering_fields', None) or [])
+        por_defecto = getattr(view, 'ordering', None) or ['-id']
+        por_defecto = por_defecto[0] if isinstance(por_defecto, (list, tuple)) else por_defecto
+        pedido = (request.query_params.get('ordering') or '').split(',')[0].strip()
+        campo = pedido if pedido.lstrip('-') in permitidos else por_defecto
+        return campo.lstrip('-'), campo.startswith('-')
+
+    def _despues_de(self, valor, pk, descendente):
+        op = 'lt' if descendente else 'gt'
+        return Q(**{f"{self.campo}__{op}": valor}) | Q(**{self.campo: valor, f"id__{op}": pk})
+
+    def _posicion(self, obj, direccion):
+        valor = getattr(obj, self.campo)
+        return {'v': valor.isoformat() if hasattr(valor, 'isoformat') else valor, 'id': obj.pk, 'd': direccion}
+
+    def _decodificar_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(codificado.encode()).decode())
+            int(cursor['id'])
+            cursor['v']
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError):
+            raise NotFound('Cursor inválido.')
+        return cursor
+
+    def _url(self, posicion):
+        if posicion is None:
+            return None
+        url = self.request.build_absolute_uri()
+        codificado = base64.urlsafe_b64encode(json.dumps(posicion).encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, codificado)
+
+
+def pide_cursor(request):
+    return (
+        request.query_params.get('paginacion') == 'cursor'
+        or PaginacionKeyset.cursor_query_param in request.query_params
+    )
+
+
+class PaginacionSeleccionableMixin:
+    """
+    Usa paginación por cursor si la petición la pide (`?paginacion=cursor` o
+    `?cursor=`) y la paginación clásica por página en caso contrario.
+    """
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = PaginacionKeyset() if pide_cursor(self.request) else PaginacionClasica()
+        return self._paginator
+
+    def paginar_si_se_pide(self, queryset, serializer_class):
+        """
+        Para acciones que históricamente devuelven la lista completa: solo
+        pagina si la petición trae `page` o cursor.
+        """
+        context = {'request': self.request}
+        if pide_cursor(self.request) or 'page' in self.request.query_params:
+            pagina = self.paginate_queryset(queryset)
+            serializer = serializer_class(pagina, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer_class(queryset, many=True, context=context).data)
@@ -2,8 +2,19 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from apps.trabajos.models import TrabajoInvestigacion, ConfiguracionCarrera
-from apps.comentarios.models import Comentario, CalificacionPromedio
+import re
+from django.conf import settings
+from apps.trabajos.models import (
+    TrabajoInvestigacion, ConfiguracionCarrera, LogActividades, SubidaReanudable,
+    archivo_pdf_upload_path
+)
+from apps.trabajos.almacenamiento import (
+    descartar_subida_directa, mover_subida_directa, usa_s3, validar_subida_directa
+)
+from apps.comentarios.models import CalificacionPromedio
+from apps.comentarios.resumen import resumen_comentarios
+from apps.trabajos.contadores import sumar_pendientes
+from apps.trabajos.subidas import deshacer_finalizacion, finalizar_subida
 
 Usuario = get_user_model()
 
@@ -17,17 +28,40 @@ class TrabajoInvestigacionCreateSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
+    # Con almacenamiento S3 el PDF se sube antes directamente al bucket
+    # (acción subida_directa) y aquí solo se envía su clave
+    archivo_clave = serializers.CharField(write_only=True, required=False)
+
     class Meta:
         model = TrabajoInvestigacion
         fields = [
             'titulo', 'autores', 'tutores', 'carrera', 'tipo_trabajo',
-            'año', 'archivo_pdf', 'estudiante'
+            'año', 'archivo_pdf', 'archivo_clave', 'estudiante'
         ]
+        extra_kwargs = {'archivo_pdf': {'required': False}}
     
     def validate(self, attrs):
         usuario = self.context['request'].user
         tipo_trabajo = attrs.get('tipo_trabajo')
         
+        # El archivo llega por una sola vía: multipart, subida directa a S3 o
+        # subida reanudable (la vista de finalizar la pasa en el contexto)
+        clave = attrs.get('archivo_clave')
+        vias = [bool(clave), bool(attrs.get('archivo_pdf')), 'subida' in self.context]
+        if sum(vias) != 1:
+            raise serializers.ValidationError(
+                "Envía el archivo PDF, la clave de una subida directa o finaliza una subida reanudable (solo una vía)."
+            )
+        if clave:
+            if not usa_s3():
+                raise serializers.ValidationError(
+                    {'archivo_clave': "La subida directa requiere almacenamiento S3."}
+                )
+            try:
+                attrs['tamaño_archivo'] = validar_subida_directa(usuario, clave)
+            except ValueError as e:
+                raise serializers.ValidationError({'archivo_clave': str(e)})
+        
         # Verificar permisos según el tipo de trabajo
         if tipo_trabajo == 'especial_grado':
             if not usuario.puede_subir_especial_grado:
@@ -40,15 +74,52 @@ class TrabajoInvestigacionCreateSerializer(serializers.ModelSerializer):
                     "No tienes permisos para subir prácticas profesionales."
                 )
         
+        # Solo se comprueba: finalizarla es irreversible y se hace en create()
+        subida = self.context.get('subida')
+        if subida is not None and subida.recibido != subida.tamaño_total:
+            raise serializers.ValidationError(
+                {'subida': f"Faltan datos: recibidos {subida.recibido} de {subida.tamaño_total} bytes."}
+            )
+        
         return attrs
     
     def create(self, validated_data):
+        clave = validated_data.pop('archivo_clave', None)
+        subida = self.context.get('subida')
+        if subida is None:
+            return self._crear(validated_data, clave, None)
+        
+        # Subida reanudable: comprueba el hash y deja el archivo en su sitio
+        # (la subida deja de existir). Si después no se crea el trabajo, se
+        # borra lo que se movió para no dejar el PDF huérfano.
+        campos = original = None
+        try:
+            with transaction.atomic():
+                try:
+                    campos, original = finalizar_subida(subida)
+                except ValueError as e:
+                    raise serializers.ValidationError({'subida': str(e)})
+                validated_data.update(campos)
+                return self._crear(validated_data, None, original)
+        except Exception:
+            deshacer_finalizacion(subida, campos, original)
+            raise
+    
+    def _crear(self, validated_data, clave, original):
         with transaction.atomic():
             # Crear el trabajo
-            trabajo = TrabajoInvestigacion.objects.create(
+            trabajo = TrabajoInvestigacion(
                 subido_por=self.context['request'].user,
                 **validated_data
             )
+            if clave:
+                # Copia dentro del bucket: el PDF no pasa por Django
+                trabajo.archivo_pdf.name = mover_subida_directa(
+                    clave, archivo_pdf_upload_path(trabajo, clave)
+                )
+                transaction.on_commit(lambda: descartar_subida_directa(clave))
+            trabajo.duplicado_de = original
+            trabajo.save()
             
             # Aquí se activaría el procesamiento de IA en background
             # (esto se haría via Celery)
@@ -56,6 +127,50 @@ class TrabajoInvestigacionCreateSerializer(serializers.ModelSerializer):
             return trabajo
 
 
+class SubidaReanudableSerializer(serializers.ModelSerializer):
+    """
+    Inicio y estado de una subida reanudable
+    """
+    tamaño_fragmento = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubidaReanudable
+        fields = [
+            'id', 'nombre_archivo', 'tamaño_total', 'sha256', 'recibido',
+            'tamaño_fragmento', 'fecha_creacion', 'fecha_actualizacion'
+        ]
+        read_only_fields = ['id', 'recibido', 'fecha_creacion', 'fecha_actualizacion']
+
+    def get_tamaño_fragmento(self, obj):
+        return settings.SUBIDA_FRAGMENTO_TAMANO
+
+    def validate_nombre_archivo(self, value):
+        if not value.lower().endswith('.pdf'):
+            raise serializers.ValidationError("Solo se permiten archivos PDF.")
+        return value
+
+    def validate_tamaño_total(self, value):
+        if not 0 < value <= settings.SUBIDA_REANUDABLE_TAMANO_MAXIMO:
+            raise serializers.ValidationError(
+                f"El archivo debe tener entre 1 y {settings.SUBIDA_REANUDABLE_TAMANO_MAXIMO} bytes."
+            )
+        return value
+
+    def validate_sha256(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("El SHA-256 debe tener 64 caracteres hexadecimales.")
+        return value.lower()
+
+
+class ContadoresListSerializer(serializers.ListSerializer):
+    """Suma a toda la página los contadores pendientes en Redis con una sola consulta"""
+
+    def to_representation(self, data):
+        datos = super().to_representation(data)
+        sumar_pendientes(datos)
+        return datos
+
+
 class TrabajoInvestigacionListSerializer(serializers.ModelSerializer):
     """
     Serializer para listar trabajos de investigación
@@ -71,9 +186,10 @@ class TrabajoInvestigacionListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'titulo', 'autores', 'año', 'carrera', 'carrera_nombre',
             'tipo_trabajo', 'tipo_trabajo_display', 'fecha_subida',
-            'subido_por_nombre', 'estado', 'total_descargas',
+            'subido_por_nombre', 'estado', 'total_descargas', 'total_vistas',
             'puede_descargar', 'calificacion_promedio', 'archivo_pdf', 'resumen'
         ]
+        list_serializer_class = ContadoresListSerializer
     
     def get_puede_descargar(self, obj):
         request = self.context.get('request')
@@ -110,10 +226,19 @@ class TrabajoInvestigacionDetailSerializer(serializers.ModelSerializer):
             'id', 'titulo', 'autores', 'tutores', 'año', 'carrera', 'carrera_nombre',
             'tipo_trabajo', 'tipo_trabajo_display', 'resumen', 'objetivos',
             'tags_ia', 'fecha_subida', 'fecha_aprobacion', 'estado',
-            'subido_por_nombre', 'aprobado_por_nombre', 'total_descargas',
+            'subido_por_nombre', 'aprobado_por_nombre', 'total_descargas', 'total_vistas',
             'puede_descargar', 'calificacion_promedio', 'comentarios'
         ]
     
+    def to_representation(self, instance):
+        # Promedio y últimos comentarios salen del fragmento cacheado del trabajo
+        self._resumen = resumen_comentarios(instance.pk)
+        datos = super().to_representation(instance)
+        if not self.context.get('para_cache'):
+            # En la copia cacheada los pendientes se suman al leerla (detalle.superponer_usuario)
+            sumar_pendientes([datos])
+        return datos
+    
     def get_puede_descargar(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
@@ -121,24 +246,10 @@ class TrabajoInvestigacionDetailSerializer(serializers.ModelSerializer):
         return False
     
     def get_calificacion_promedio(self, obj):
-        try:
-            promedio = obj.calificacion_promedio
-            return {
-                'promedio': promedio.promedio_calificacion,
-                'total_comentarios': promedio.total_comentarios,
-                'distribucion': promedio.distribucion_calificaciones
-            }
-        except CalificacionPromedio.DoesNotExist:
-            return {
-                'promedio': 0,
-                'total_comentarios': 0,
-                'distribucion': {}
-            }
+        return self._resumen['calificacion_promedio']
     
     def get_comentarios(self, obj):
-        comentarios = obj.comentarios.filter(aprobado=True)[:5]  # Solo los últimos 5
-        from apps.comentarios.serializers import ComentarioListSerializer
-        return ComentarioListSerializer(comentarios, many=True, context=self.context).data
+        return self._resumen['comentarios']
 
 
 class TrabajoInvestigacionUpdateSerializer(serializers.ModelSerializer):
@@ -216,7 +327,7 @@ class TrabajoInvestigacionAprobacionSerializer(serializers.Serializer):
                 trabajo.estado = 'requiere_correcciones'
                 if motivo:
                     trabajo.resumen = f"{trabajo.resumen}\n\nCorrecciones requeridas: {motivo}"
-                trabajo.save()
+                trabajo.save(update_fields=['estado', 'resumen'])
         
         return trabajo
 
@@ -241,6 +352,22 @@ class ConfiguracionCarreraSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class LogActividadesSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el log de actividades
+    """
+    usuario_username = serializers.CharField(source='usuario.username', read_only=True)
+    trabajo_titulo = serializers.CharField(source='trabajo.titulo', read_only=True, default=None)
+    accion_display = serializers.CharField(source='get_accion_display', read_only=True)
+    
+    class Meta:
+        model = LogActividades
+        fields = [
+            'id', 'fecha', 'accion', 'accion_display', 'usuario', 'usuario_username',
+            'trabajo', 'trabajo_titulo', 'descripcion', 'ip_address'
+        ]
+
+
 class EstadisticasTrabajosSerializer(serializers.Serializer):
     """
     Serializer para estadísticas de trabajos
@@ -254,4 +381,5 @@ class EstadisticasTrabajosSerializer(serializers.Serializer):
     trabajos_por_tipo = serializers.DictField()
     trabajos_por_año = serializers.DictField()
     top_trabajos_mas_descargados = serializers.ListField()
-    top_trabajos_mejor_calificados = serializers.ListField()
\ No newline at end of file
+    top_trabajos_mejor_calificados = serializers.ListField()
+    actividad_30_dias = serializers.DictField()
\ No newline at end of file
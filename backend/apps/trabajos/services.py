@@ -2,11 +2,51 @@
 import os
 import requests
 import logging
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-def enviar_pdf_a_ia(trabajo_id, pdf_file):
-    url = "http://ai-service:8000/process_pdf"
+
+class ArchivoNoCompartidoError(Exception):
+    """El servicio de IA no ve el archivo en el volumen compartido"""
+
+
+def metadatos_para_ia(trabajo):
+    return {
+        'titulo': trabajo.titulo,
+        'autores': trabajo.autores,
+        'tutores': trabajo.tutores,
+    }
+
+
+def enviar_ruta_a_ia(trabajo, timeout=30):
+    """
+    Pide a la IA que procese el PDF leyendo la ruta relativa del almacenamiento
+    (volumen de medios compartido, o clave del objeto si el almacenamiento es
+    S3) en lugar de recibir el archivo.
+    Lanza excepción si la IA no acepta la tarea, para que Celery reintente.
+    """
+    url = f"{settings.AI_SERVICE_URL}/process_path"
+    payload = {
+        'trabajo_id': str(trabajo.id),
+        'path': trabajo.archivo_pdf.name,
+        'storage': settings.ALMACENAMIENTO,
+    }
+    payload.update({k: v for k, v in metadatos_para_ia(trabajo).items() if v})
+
+    logger.info(f"Enviando ruta a IA: trabajo_id={trabajo.id}, path={trabajo.archivo_pdf.name}")
+    response = requests.post(url, json=payload, timeout=timeout)
+    if response.status_code == 404:
+        raise ArchivoNoCompartidoError(response.text)
+    response.raise_for_status()
+    return response.json()
+
+def enviar_pdf_a_ia(trabajo_id, pdf_file, metadata=None):
+    """
+    Envía el PDF a la IA. `metadata` (titulo, autores, tutores) se indexa tal
+    cual en la búsqueda léxica del servicio, en lugar de la información extraída.
+    """
+    url = f"{settings.AI_SERVICE_URL}/process_pdf"
     try:
         pdf_file.seek(0)
         # Enviamos el archivo: usar basename para evitar enviar rutas internas
@@ -15,6 +55,7 @@ def enviar_pdf_a_ia(trabajo_id, pdf_file):
         logger.info(f"Enviando PDF a IA: trabajo_id={trabajo_id}, filename={filename_only}")
         # Enviamos el ID como dato de formulario
         data = {'trabajo_id': str(trabajo_id)}
+        data.update({k: v for k, v in (metadata or {}).items() if v})
         
         response = requests.post(url, files=files, data=data, timeout=60)
         
@@ -31,7 +72,7 @@ def buscar_trabajos_ia(query, top_k=5):
     """
     Envía una consulta de texto a la IA y devuelve los IDs de los trabajos encontrados.
     """
-    url = "http://ai-service:8000/search"
+    url = f"{settings.AI_SERVICE_URL}/search"
     payload = {
         "query": query,
         "top_k": top_k
@@ -44,4 +85,111 @@ def buscar_trabajos_ia(query, top_k=5):
         return []
     except Exception as e:
         logger.error(f"Error buscando en IA: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def guardar_contenido_trabajo(trabajo_id, contenido=None, embedding=None):
+    """Guarda en la tabla auxiliar el texto extraído y/o el vector de la IA"""
+    from .models import TrabajoContenido
+
+    valores = {}
+    if contenido:
+        valores['contenido_extraido'] = contenido
+    if embedding is not None:
+        valores['embedding_vector'] = embedding
+    if valores:
+        TrabajoContenido.objects.update_or_create(trabajo_id=trabajo_id, defaults=valores)
+
+
+def guardar_trabajos_similares(trabajo_id, similares):
+    """
+    Reemplaza los vecinos precalculados de un trabajo.
+    `similares` es la lista [[trabajo_id, puntuacion], ...] que devuelve la IA.
+    """
+    from django.db import transaction
+    from .models import TrabajoInvestigacion, TrabajoSimilar
+
+    ids = [int(similar_id) for similar_id, _ in similares]
+    existentes = set(TrabajoInvestigacion.objects.filter(id__in=ids).values_list('id', flat=True))
+    filas = [
+        TrabajoSimilar(trabajo_id=trabajo_id, similar_id=int(similar_id), puntuacion=puntuacion, posicion=posicion)
+        for posicion, (similar_id, puntuacion) in enumerate(
+            (s for s in similares if int(s[0]) in existentes and int(s[0]) != int(trabajo_id))
+        )
+    ]
+    with transaction.atomic():
+        TrabajoSimilar.objects.filter(trabajo_id=trabajo_id).delete()
+        TrabajoSimilar.objects.bulk_create(filas)
+    return len(filas)
+
+
+def copiar_resultados_ia(original, trabajo):
+    """
+    Copia a un trabajo con el mismo PDF los resultados de la IA del original
+    (resumen, objetivos, tags, contenido, embedding y vecinos), en lugar de
+    volver a procesar el archivo. No sobrescribe lo que el trabajo ya tenga.
+    """
+    from .models import TrabajoContenido, TrabajoSimilar
+
+    campos = []
+    for campo in ('resumen', 'objetivos', 'tags_ia'):
+        if getattr(original, campo) and not getattr(trabajo, campo):
+            setattr(trabajo, campo, getattr(original, campo))
+            campos.append(campo)
+    if campos:
+        trabajo.save(update_fields=campos)
+
+    contenido = TrabajoContenido.objects.filter(trabajo_id=original.id).first()
+    if contenido is not None:
+        guardar_contenido_trabajo(trabajo.id, contenido.contenido_extraido, contenido.embedding_vector)
+
+    similares = list(TrabajoSimilar.objects.filter(trabajo_id=original.id).values_list('similar_id', 'puntuacion'))
+    if similares:
+        guardar_trabajos_similares(trabajo.id, similares)
+
+
+def propagar_resultados_ia(trabajo):
+    """Lleva los resultados recién recibidos de la IA a los duplicados del trabajo"""
+    from .models import TrabajoInvestigacion
+
+    if not trabajo.hash_sha256:
+        return 0
+    duplicados = TrabajoInvestigacion.objects.filter(
+        hash_sha256=trabajo.hash_sha256
+    ).exclude(pk=trabajo.pk).defer('busqueda')
+    total = 0
+    for duplicado in duplicados:
+        copiar_resultados_ia(trabajo, duplicado)
+        total += 1
+    return total
+
+
+def sincronizar_trabajos_similares(recalcular=True):
+    """
+    Copia a la base de datos los vecinos precalculados de todos los trabajos.
+    Con `recalcular` la IA los recalcula antes desde el índice vectorial.
+    """
+    from django.db import transaction
+    from .models import TrabajoInvestigacion, TrabajoSimilar
+
+    base_url = settings.AI_SERVICE_URL
+    if recalcular:
+        requests.post(f"{base_url}/recompute_neighbors", timeout=600).raise_for_status()
+    response = requests.post(f"{base_url}/neighbors", json={}, timeout=120)
+    response.raise_for_status()
+    vecinos = response.json().get('neighbors', {})
+
+    existentes = set(TrabajoInvestigacion.objects.values_list('id', flat=True))
+    filas = []
+    for trabajo_id, similares in vecinos.items():
+        if int(trabajo_id) not in existentes:
+            continue
+        validos = [s for s in similares if int(s[0]) in existentes and s[0] != trabajo_id]
+        filas.extend(
+            TrabajoSimilar(trabajo_id=int(trabajo_id), similar_id=int(similar_id), puntuacion=puntuacion, posicion=posicion)
+            for posicion, (similar_id, puntuacion) in enumerate(validos)
+        )
+
+    with transaction.atomic():
+        TrabajoSimilar.objects.all().delete()
+        TrabajoSimilar.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
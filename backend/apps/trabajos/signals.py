@@ -0,0 +1,74 @@
+# backend/apps/trabajos/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.comentarios.models import CalificacionPromedio, Comentario
+from apps.comentarios.signals import calificaciones_actualizadas
+from .espacios import BUSQUEDA, SUGERENCIAS
+from .estadisticas import invalidar_estadisticas
+from .models import ConfiguracionCarrera, TrabajoInvestigacion
+from .versiones import cambiar_versiones, sello_trabajo
+
+
+@receiver([post_save, post_delete], sender=TrabajoInvestigacion)
+@receiver([post_save, post_delete], sender=ConfiguracionCarrera)
+@receiver([post_save, post_delete], sender=CalificacionPromedio)
+@receiver(calificaciones_actualizadas, sender=CalificacionPromedio)
+def invalidar_estadisticas_trabajos(sender, **kwargs):
+    # Tras el commit, para que una lectura concurrente no vuelva a cachear datos viejos
+    transaction.on_commit(lambda: invalidar_estadisticas('trabajos'))
+
+
+@receiver([post_save, post_delete], sender=TrabajoInvestigacion)
+def cambiar_version_trabajo(sender, instance, **kwargs):
+    cambiar_versiones('trabajos', sello_trabajo(instance.pk))
+
+
+@receiver(post_save, sender=TrabajoInvestigacion)
+def invalidar_busqueda_aprobacion(sender, instance, created, update_fields=None, **kwargs):
+    # Búsquedas y sugerencias solo muestran aprobados: cambian al aprobar o
+    # rechazar, no con cada guardado de un trabajo
+    if update_fields is not None and 'estado' not in update_fields:
+        return
+    if created:
+        cambia = instance.estado == 'aprobado'
+    else:
+        # Sin el estado leído de la base de datos no se sabe si cambió: se invalida
+        anterior = instance.__dict__.get('_estado_guardado')
+        cambia = anterior is None or (anterior == 'aprobado') != (instance.estado == 'aprobado')
+    if cambia:
+        BUSQUEDA.invalidar()
+        SUGERENCIAS.invalidar()
+    instance._estado_guardado = instance.estado
+
+
+@receiver(post_delete, sender=TrabajoInvestigacion)
+def invalidar_busqueda_borrado(sender, instance, **kwargs):
+    if instance.__dict__.get('estado', 'aprobado') == 'aprobado':
+        BUSQUEDA.invalidar()
+        SUGERENCIAS.invalidar()
+
+
+@receiver([post_save, post_delete], sender=CalificacionPromedio)
+def cambiar_version_calificacion(sender, instance, **kwargs):
+    cambiar_versiones('trabajos', sello_trabajo(instance.trabajo_id))
+
+
+@receiver(calificaciones_actualizadas, sender=CalificacionPromedio)
+def cambiar_version_calificaciones(sender, trabajos, **kwargs):
+    cambiar_versiones('trabajos', *(sello_trabajo(trabajo_id) for trabajo_id in trabajos))
+
+
+@receiver([post_save, post_delete], sender=Comentario)
+def cambiar_version_comentario(sender, instance, **kwargs):
+    # El detalle incluye los últimos comentarios
+    cambiar_versiones(sello_trabajo(instance.trabajo_id))
+
+
+@receiver([post_save, post_delete], sender=ConfiguracionCarrera)
+@receiver(m2m_changed, sender=ConfiguracionCarrera.encargados_especial_grado.through)
+@receiver(m2m_changed, sender=ConfiguracionCarrera.encargados_pasantias.through)
+def cambiar_version_carreras(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        cambiar_versiones('carreras')
@@ -0,0 +1,208 @@
+# backend/apps/trabajos/subidas.py
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .almacenamiento import PREFIJO_SUBIDAS, cliente_s3, mover_objeto, usa_s3
+from .archivos import buscar_original, calcular_huella, contar_paginas, ruta_por_contenido
+
+logger = logging.getLogger(__name__)
+
+# Subidas reanudables: el cliente envía el PDF en fragmentos de
+# SUBIDA_FRAGMENTO_TAMANO bytes (el último puede ser menor), en orden. En
+# disco cada fragmento se escribe en su desplazamiento del archivo temporal;
+# con S3 cada fragmento es una parte de una subida multiparte (mínimo 5 MiB
+# salvo la última). Se leen del cuerpo de la petición en trozos de
+# TAMANO_LECTURA, así que la memoria no depende del tamaño del PDF.
+TAMANO_LECTURA = 64 * 1024
+
+
+class FragmentoInvalido(Exception):
+    """El fragmento no encaja en la subida; `recibido` indica desde dónde continuar"""
+
+    def __init__(self, mensaje, recibido):
+        super().__init__(mensaje)
+        self.recibido = recibido
+
+
+def iniciar_subida(usuario, nombre_archivo, tamaño_total, sha256):
+    from .models import SubidaReanudable
+
+    clave = f"{PREFIJO_SUBIDAS}/reanudables/{uuid.uuid4().hex}.pdf"
+    subida = SubidaReanudable(
+        usuario=usuario,
+        nombre_archivo=nombre_archivo,
+        tamaño_total=tamaño_total,
+        sha256=sha256.lower(),
+        clave=clave,
+    )
+    if usa_s3():
+        subida.upload_id = cliente_s3().create_multipart_upload(
+            Bucket=default_storage.bucket_name, Key=clave, ContentType='application/pdf'
+        )['UploadId']
+    else:
+        subida.clave = default_storage.save(clave, ContentFile(b''))
+    subida.save()
+    return subida
+
+
+def _leer_exacto(flujo, longitud):
+    """Genera el cuerpo de la petición en trozos hasta `longitud` bytes"""
+    pendiente = longitud
+    while pendiente:
+        trozo = flujo.read(min(TAMANO_LECTURA, pendiente))
+        if not trozo:
+            raise FragmentoInvalido("El fragmento llegó incompleto.", None)
+        pendiente -= len(trozo)
+        yield trozo
+
+
+def recibir_fragmento(subida, inicio, longitud, flujo):
+    """
+    Escribe un fragmento en el almacenamiento. Solo se acepta el fragmento
+    que empieza en `subida.recibido`; reenviar el mismo tras un corte es
+    seguro porque se escribe en el mismo sitio.
+    """
+    from .models import SubidaReanudable
+
+    tamaño = settings.SUBIDA_FRAGMENTO_TAMANO
+    fin = inicio + longitud
+    if inicio != subida.recibido:
+        raise FragmentoInvalido("El fragmento no empieza donde terminó el anterior.", subida.recibido)
+    if longitud <= 0 or fin > subida.tamaño_total or (fin < subida.tamaño_total and longitud != tamaño):
+        raise FragmentoInvalido(
+            f"Cada fragmento debe tener {tamaño} bytes (el último, el resto del archivo).", subida.recibido
+        )
+
+    partes = subida.partes
+    try:
+        if usa_s3():
+            numero = inicio // tamaño + 1
+            # Una parte de S3 se envía entera: la memoria queda acotada por el fragmento
+            respuesta = cliente_s3().upload_part(
+                Bucket=default_storage.bucket_name, Key=subida.clave, UploadId=subida.upload_id,
+                PartNumber=numero, Body=b''.join(_leer_exacto(flujo, longitud)),
+            )
+            partes = [p for p in partes if p['PartNumber'] != numero]
+            partes.append({'PartNumber': numero, 'ETag': respuesta['ETag']})
+        else:
+            with open(default_storage.path(subida.clave), 'r+b') as destino:
+                destino.seek(inicio)
+                for trozo in _leer_exacto(flujo, longitud):
+                    destino.write(trozo)
+                # Restos de un intento anterior cortado a medias
+                destino.truncate()
+    except FragmentoInvalido as e:
+        e.recibido = subida.recibido
+        raise
+
+    # Si otra petición con el mismo fragmento ganó la carrera, no se cuenta dos veces
+    actualizadas = SubidaReanudable.objects.filter(pk=subida.pk, recibido=inicio).update(
+        recibido=fin, partes=partes, fecha_actualizacion=timezone.now()
+    )
+    subida.refresh_from_db(fields=['recibido', 'partes'])
+    if not actualizadas:
+        raise FragmentoInvalido("El fragmento ya se había recibido.", subida.recibido)
+    return subida
+
+
+def finalizar_subida(subida):
+    """
+    Completa la subida, comprueba el SHA-256 leyendo el archivo por trozos y
+    lo deja en su ruta por contenido (o enlazado al original si el PDF ya
+    existía). Devuelve (campos del trabajo, original o None). La subida deja
+    de existir en cualquier caso salvo si está incompleta. Lanza ValueError
+    si falta algún fragmento, si ya se finalizó o si no coincide el hash.
+    """
+    from .models import SubidaReanudable
+
+    if subida.recibido != subida.tamaño_total:
+        raise ValueError(f"Faltan datos: recibidos {subida.recibido} de {subida.tamaño_total} bytes.")
+    # Se reclama borrando la fila: una finalización concurrente ya no la encuentra
+    if not SubidaReanudable.objects.filter(pk=subida.pk).delete()[0]:
+        raise ValueError("La subida ya se finalizó.")
+
+    try:
+        if usa_s3():
+            cliente_s3().complete_multipart_upload(
+                Bucket=default_storage.bucket_name, Key=subida.clave, UploadId=subida.upload_id,
+                MultipartUpload={'Parts': sorted(subida.partes, key=lambda p: p['PartNumber'])},
+            )
+            subida.upload_id = ''
+
+        with default_storage.open(subida.clave, 'rb') as archivo:
+            huella = calcular_huella(archivo)
+            if huella.sha256 != subida.sha256:
+                raise ValueError("El SHA-256 del archivo recibido no coincide con el declarado.")
+            original = buscar_original(huella.sha256)
+            paginas = original.paginas if original is not None else contar_paginas(archivo)
+
+        if original is not None:
+            default_storage.delete(subida.clave)
+            nombre = original.archivo_pdf.name
+        else:
+            nombre = mover_objeto(subida.clave, ruta_por_contenido(huella.sha256))
+    except Exception:
+        _borrar_datos(subida)
+        raise
+
+    campos = {
+        'archivo_pdf': nombre,
+        'tamaño_archivo': subida.tamaño_total,
+        'hash_md5': huella.md5,
+        'hash_sha256': huella.sha256,
+        'paginas': paginas,
+    }
+    return campos, original
+
+
+def deshacer_finalizacion(subida, campos, original):
+    """
+    Limpia tras una finalización cuyo trabajo no llegó a crearse (la
+    transacción se revirtió): borra el PDF movido a su ruta por contenido si
+    no era de otro trabajo, y la fila de la subida, que el rollback restauró
+    aunque sus datos ya no están en el almacenamiento.
+    """
+    from .models import SubidaReanudable
+
+    if campos is not None and original is None:
+        try:
+            default_storage.delete(campos['archivo_pdf'])
+        except Exception as e:
+            logger.warning(f"No se pudo borrar el PDF de la subida reanudable {subida.pk}: {e}")
+    SubidaReanudable.objects.filter(pk=subida.pk).delete()
+
+
+def _borrar_datos(subida):
+    try:
+        if usa_s3() and subida.upload_id:
+            cliente_s3().abort_multipart_upload(
+                Bucket=default_storage.bucket_name, Key=subida.clave, UploadId=subida.upload_id
+            )
+        else:
+            default_storage.delete(subida.clave)
+    except Exception as e:
+        logger.warning(f"No se pudo borrar la subida reanudable {subida.pk}: {e}")
+
+
+def descartar_subida(subida):
+    """Cancela la subida y borra lo recibido del almacenamiento"""
+    _borrar_datos(subida)
+    subida.delete()
+
+
+def limpiar_subidas_abandonadas():
+    """Descarta las subidas sin actividad desde hace más de SUBIDA_REANUDABLE_EXPIRA segundos"""
+    from .models import SubidaReanudable
+
+    limite = timezone.now() - timedelta(seconds=settings.SUBIDA_REANUDABLE_EXPIRA)
+    total = 0
+    for subida in SubidaReanudable.objects.filter(fecha_actualizacion__lt=limite).iterator():
+        descartar_subida(subida)
+        total += 1
+    return total
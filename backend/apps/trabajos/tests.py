@@ -0,0 +1,151 @@
+# backend/apps/trabajos/tests.py
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.comentarios.models import CalificacionPromedio, Comentario
+from .contadores import CONTADORES
+from .models import ConfiguracionCarrera, TrabajoInvestigacion
+from .pagination import contar
+
+Usuario = get_user_model()
+
+URL_TRABAJOS = '/api/v1/trabajos/'
+
+
+class PresupuestoConsultasBase(APITestCase):
+    """
+    Número fijo de consultas por endpoint. Los datos tienen varios trabajos,
+    autores, calificaciones y comentarios: si un serializador vuelve a leer
+    una relación por fila, la cifra sube y la prueba falla.
+
+    Cada prueba parte de la cache vacía, así que mide la respuesta completa.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser(
+            'admin', 'admin@test.com', 'x', cedula='V0', rol='administrador'
+        )
+        cls.usuarios = [
+            Usuario.objects.create_user(f'usuario{i}', f'usuario{i}@test.com', 'x', cedula=f'V{i + 1}')
+            for i in range(5)
+        ]
+        cls.estudiante = cls.usuarios[0]
+        carreras = [
+            ConfiguracionCarrera.objects.create(nombre='Ingeniería de Sistemas', codigo='SIS'),
+            ConfiguracionCarrera.objects.create(nombre='Ingeniería Naval', codigo='NAV'),
+        ]
+
+        cls.trabajos = []
+        for i in range(12):
+            trabajo = TrabajoInvestigacion.objects.create(
+                titulo=f'Trabajo {i} sobre buques', autores=f'Autor {i}', tutores=f'Tutor {i}',
+                carrera=carreras[i % 2], tipo_trabajo='especial_grado', año=2024,
+                estado='pendiente' if i % 4 == 0 else 'aprobado', resumen='Resumen del trabajo',
+                subido_por=cls.usuarios[i % 5], estudiante=cls.estudiante, tamaño_archivo=1024,
+            )
+            if i % 2:
+                CalificacionPromedio.objects.create(trabajo=trabajo, promedio_calificacion=4, total_comentarios=1)
+            cls.trabajos.append(trabajo)
+
+        cls.aprobado = cls.trabajos[1]
+        for usuario in cls.usuarios:
+            Comentario.objects.create(trabajo=cls.aprobado, usuario=usuario, comentario='Muy útil', calificacion=4)
+
+    def setUp(self):
+        cache.clear()
+        # Redis de contadores y eventos: acepta las escrituras y no tiene
+        # incrementos pendientes (listas vacías: zip no produce ninguno)
+        cliente = mock.MagicMock()
+        cliente.pipeline.return_value.execute.return_value = [[] for _ in range(2 * len(CONTADORES))]
+        for modulo in ('apps.trabajos.contadores', 'apps.trabajos.eventos'):
+            parche = mock.patch(f'{modulo}.cliente_redis', return_value=cliente)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.client.force_authenticate(self.admin)
+
+    def obtener(self, url, consultas):
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+
+class PresupuestoConsultasTests(PresupuestoConsultasBase):
+    """Presupuestos de los endpoints de trabajos (en SQLite y en PostgreSQL)"""
+
+    def test_listado(self):
+        datos = self.obtener(URL_TRABAJOS, 2)
+        self.assertEqual(datos['count'], len(self.trabajos))
+
+    def test_detalle(self):
+        datos = self.obtener(f'{URL_TRABAJOS}{self.aprobado.pk}/', 4)
+        self.assertEqual(datos['id'], self.aprobado.pk)
+
+    def test_detalle_cacheado(self):
+        url = f'{URL_TRABAJOS}{self.aprobado.pk}/'
+        self.client.get(url)
+        # Solo get_object, que comprueba que el usuario puede verlo
+        self.obtener(url, 1)
+
+    def test_pendientes(self):
+        datos = self.obtener(f'{URL_TRABAJOS}pendientes/', 1)
+        self.assertEqual(len(datos), 3)
+
+    def test_mis_trabajos(self):
+        self.client.force_authenticate(self.estudiante)
+        datos = self.obtener(f'{URL_TRABAJOS}mis_trabajos/', 1)
+        self.assertEqual(len(datos), len(self.trabajos))
+
+    @mock.patch('apps.trabajos.services.buscar_trabajos_ia')
+    def test_buscar_inteligente_ia(self, buscar_trabajos_ia):
+        aprobados = [t for t in self.trabajos if t.estado == 'aprobado']
+        buscar_trabajos_ia.return_value = [{'trabajo_id': str(t.pk)} for t in aprobados]
+        datos = self.obtener(f'{URL_TRABAJOS}buscar_inteligente/?q=buques', 2)
+        self.assertEqual(datos['modo'], 'IA (Semántica)')
+        self.assertEqual([r['id'] for r in datos['resultados']], [t.pk for t in aprobados])
+
+    @mock.patch('apps.trabajos.services.buscar_trabajos_ia', return_value=[])
+    def test_buscar_inteligente_texto(self, buscar_trabajos_ia):
+        datos = self.obtener(f'{URL_TRABAJOS}buscar_inteligente/?q=buques', 3)
+        self.assertEqual(datos['modo'], 'Tradicional (Texto)')
+        self.assertEqual(datos['total'], 9)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'caminos exclusivos de PostgreSQL')
+class PresupuestoConsultasPostgresTests(PresupuestoConsultasBase):
+    """
+    Presupuestos de los caminos que solo existen en PostgreSQL: búsqueda de
+    texto completo (vector mantenido por disparador e índice GIN) y total
+    estimado por estadísticas. Se ejecutan con TEST_DATABASE=postgresql.
+    """
+
+    def obtener_sql(self, url, consultas):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(contexto), consultas, [q['sql'] for q in contexto.captured_queries])
+        return respuesta.json(), ' '.join(q['sql'] for q in contexto.captured_queries)
+
+    def test_listado_texto_completo(self):
+        datos, sql = self.obtener_sql(f'{URL_TRABAJOS}?search=buques', 2)
+        self.assertIn('@@', sql)
+        self.assertEqual(datos['count'], len(self.trabajos))
+
+    @mock.patch('apps.trabajos.services.buscar_trabajos_ia', return_value=[])
+    def test_buscar_inteligente_texto_completo(self, buscar_trabajos_ia):
+        datos, sql = self.obtener_sql(f'{URL_TRABAJOS}buscar_inteligente/?q=buques', 3)
+        self.assertIn('@@', sql)
+        self.assertEqual(datos['total'], 9)
+
+    def test_conteo_estimado(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE trabajos_investigacion')
+        with mock.patch('apps.trabajos.pagination.UMBRAL_CONTEO_ESTIMADO', 1), self.assertNumQueries(1):
+            total = contar(TrabajoInvestigacion.objects.all())
+        self.assertEqual(total, len(self.trabajos))
@@ -0,0 +1,108 @@
+# backend/apps/trabajos/versiones.py
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# Sellos de versión para las respuestas condicionales (ETag/Last-Modified).
+# Cada sello es un contador en la cache más la fecha de su último cambio;
+# las señales lo incrementan tras el commit de cada escritura. Calcular el
+# ETag solo lee esas claves: ni consulta la base de datos ni serializa. Si la
+# cache pierde un sello, se recrea con la hora actual en milisegundos, así
+# nunca vuelve a tomar un valor ya enviado a los clientes.
+#
+# Sellos: 'trabajos' (catálogo), 'trabajo:<id>' (detalle), 'carreras' y
+# 'usuarios' (nombres que aparecen en los trabajos). Los espacios de cache
+# (espacios.py) usan además 'espacio:<nombre>', 'estadisticas:<grupo>' y
+# 'comentarios:<id>'.
+
+
+def _clave(nombre):
+    return f"version:{nombre}"
+
+
+def _clave_fecha(nombre):
+    return f"version:{nombre}:fecha"
+
+
+def sello_trabajo(trabajo_id):
+    return f"trabajo:{trabajo_id}"
+
+
+def leer_versiones(nombres):
+    """{nombre: (contador, timestamp del último cambio)}; crea los que falten"""
+    claves = [_clave(n) for n in nombres] + [_clave_fecha(n) for n in nombres]
+    valores = cache.get_many(claves)
+    faltan = [c for c in claves if c not in valores]
+    if faltan:
+        ahora = time.time()
+        for clave in faltan:
+            # add: si otro proceso lo acaba de crear, se queda el suyo
+            cache.add(clave, ahora if clave.endswith(':fecha') else int(ahora * 1000), None)
+        valores.update(cache.get_many(faltan))
+    return {n: (valores.get(_clave(n)), valores.get(_clave_fecha(n))) for n in nombres}
+
+
+def incrementar_versiones(nombres):
+    """Cambia ya los sellos; desde el código de escritura, usar cambiar_versiones"""
+    ahora = time.time()
+    try:
+        for nombre in nombres:
+            try:
+                cache.incr(_clave(nombre))
+            except ValueError:
+                cache.add(_clave(nombre), int(ahora * 1000), None)
+        cache.set_many({_clave_fecha(nombre): ahora for nombre in nombres}, None)
+    except Exception as e:
+        logger.warning(f"No se pudieron cambiar las versiones {nombres}: {e}")
+
+
+def cambiar_versiones(*nombres):
+    # Tras el commit, para que nadie asocie la versión nueva a datos viejos
+    transaction.on_commit(lambda: incrementar_versiones(nombres))
+
+
+def validadores(nombres, *variante):
+    """ETag y Last-Modified de una respuesta que depende de los sellos `nombres`"""
+    versiones = leer_versiones(nombres)
+    huella = repr((sorted(versiones.items()), variante))
+    etag = f'"{hashlib.md5(huella.encode()).hexdigest()}"'
+    return etag, int(max(fecha or 0 for _, fecha in versiones.values()))
+
+
+def responder_condicional(request, nombres, generar, variante='', max_age=0):
+    """
+    Responde 304 si el cliente ya tiene la versión actual (If-None-Match o
+    If-Modified-Since); si no, genera la respuesta con `generar()`. Los sellos
+    se leen antes de generar: si algo cambia entretanto, el cuerpo es más
+    nuevo que el ETag y la siguiente petición simplemente no obtiene 304.
+
+    Anónimos: `public, max-age` (nginx puede guardarla; la URL no varía por
+    usuario). Autenticados: `private, no-cache` (el navegador revalida).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return generar()
+    try:
+        etag, last_modified = validadores(nombres, request.get_full_path(), variante)
+    except Exception as e:
+        logger.warning(f"Cache no disponible para validadores HTTP: {e}")
+        return generar()
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=last_modified) or generar()
+    if respuesta.status_code not in (200, 304):
+        return respuesta
+
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(last_modified)
+    if request.user.is_authenticated:
+        patch_cache_control(respuesta, private=True, no_cache=True)
+    else:
+        patch_cache_control(respuesta, public=True, max_age=max_age, must_revalidate=True)
+    patch_vary_headers(respuesta, ['Authorization', 'Cookie'])
+    return respuesta
@@ -1,12 +1,11 @@
 # backend/apps/trabajos/views.py
 from rest_framework import status, viewsets, permissions, filters
-from django.db.models import Q, Sum, Count
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
@@ -14,32 +13,56 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import viewsets, permissions
-import os
-from django.http import FileResponse
-from .services import enviar_pdf_a_ia
+import hashlib
+import re
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from universidad_repositorio.celery import procesar_trabajo_con_ia
+from apps.comentarios.models import CalificacionPromedio
+from .services import (
+    copiar_resultados_ia, guardar_contenido_trabajo, guardar_trabajos_similares,
+    propagar_resultados_ia,
+)
+from .busqueda import normalizar_consulta, registrar_consulta, resultados_busqueda
+from .almacenamiento import post_subida_firmado, usa_s3
+from .contadores import incrementar
+from .descargas import es_descarga_nueva, respuesta_archivo
+from .eventos import registrar_evento
+from .espacios import SUGERENCIAS
+from .detalle import detalle_cacheado, sellos_detalle, serializar_detalle, superponer_usuario
+from .versiones import responder_condicional
+from .subidas import FragmentoInvalido, descartar_subida, iniciar_subida, recibir_fragmento
+from .estadisticas import calcular_estadisticas_trabajos, estadisticas_cacheadas
+from .pagination import PaginacionKeyset, PaginacionSeleccionableMixin
+from .filters import (
+    BusquedaTextoCompletoFilter, normalizar_sugerencia, sugerir_trabajos, visibles_para_encargado,
+)
 
-from .models import TrabajoInvestigacion, ConfiguracionCarrera, LogActividades
+from .models import TrabajoInvestigacion, ConfiguracionCarrera, LogActividades, SubidaReanudable
 from .serializers import (
     TrabajoInvestigacionCreateSerializer, TrabajoInvestigacionListSerializer,
     TrabajoInvestigacionDetailSerializer, TrabajoInvestigacionUpdateSerializer,
     TrabajoInvestigacionAprobacionSerializer, ConfiguracionCarreraSerializer,
-    EstadisticasTrabajosSerializer
+    LogActividadesSerializer, SubidaReanudableSerializer
 )
 
 Usuario = get_user_model()
+RANGO_FRAGMENTO = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
 import logging
 logger = logging.getLogger(__name__)
 
 # Aplicamos csrf_exempt a todo el ViewSet para permitir la subida desde el frontend (puerto 3001)
 # Esto soluciona el error "CSRF Failed: Origin checking failed"
-class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
+class TrabajoInvestigacionViewSet(PaginacionSeleccionableMixin, viewsets.ModelViewSet):
     """
     Vista para gestión de trabajos de investigación
     """
     queryset = TrabajoInvestigacion.objects.all()
     
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # La búsqueda de texto completo va al final para poder ordenar por relevancia
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaTextoCompletoFilter]
     filterset_fields = ['carrera', 'tipo_trabajo', 'año', 'estado']
     search_fields = ['titulo', 'autores', 'tutores', 'resumen', 'objetivos']
     ordering_fields = ['fecha_subida', 'año', 'total_descargas', 'titulo']
@@ -62,7 +85,60 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             return TrabajoInvestigacionAprobacionSerializer
         return TrabajoInvestigacionDetailSerializer
     
+    # Acciones que serializan con TrabajoInvestigacionListSerializer
+    ACCIONES_LISTADO = (
+        'list', 'pendientes', 'buscar_inteligente', 'mis_trabajos', 'recomendados',
+        'aprobar', 'rechazar', 'estadisticas',
+    )
+    
+    # Columnas grandes de la tabla principal que solo se leen si el serializer las usa.
+    # El texto completo y el embedding están en TrabajoContenido.
+    COLUMNAS_DIFERIBLES = ('resumen', 'objetivos', 'tags_ia', 'busqueda')
+    
     def get_queryset(self):
+        return self.optimizar_queryset(self._queryset_por_rol())
+    
+    def _columnas_diferidas(self, serializer_class):
+        """Columnas diferibles que no aparecen entre los campos (o sources) del serializer"""
+        usadas = set(serializer_class.Meta.fields)
+        for field in serializer_class._declared_fields.values():
+            if field.source:
+                usadas.add(field.source.split('.')[0])
+        return [columna for columna in self.COLUMNAS_DIFERIBLES if columna not in usadas]
+    
+    def optimizar_queryset(self, qs):
+        """
+        Carga en la misma consulta (o en un prefetch) las relaciones que usa el
+        serializer de cada acción, para que no haya una consulta por fila.
+        """
+        action = getattr(self, 'action', None)
+        if action in self.ACCIONES_LISTADO:
+            qs = qs.select_related('carrera', 'subido_por', 'calificacion_promedio')
+            if self.request.method == 'GET':
+                # Proyección de columnas: solo lectura, las acciones que guardan cargan la fila completa
+                qs = qs.defer(
+                    *self._columnas_diferidas(TrabajoInvestigacionListSerializer),
+                    'calificacion_promedio__suma_calificaciones',
+                    *(f'calificacion_promedio__{campo}' for campo in CalificacionPromedio.CAMPOS_DISTRIBUCION)
+                )
+            return qs
+        if action == 'retrieve':
+            # Solo lo necesario para permisos y auditoría: el cuerpo sale de la cache de detalle
+            return qs.only('id', 'titulo', 'estado')
+        return qs
+    
+    def _alcance_por_rol(self):
+        """Clave del subconjunto de trabajos que _queryset_por_rol deja ver al usuario"""
+        user = self.request.user
+        if not user.is_authenticated:
+            return 'anonimo'
+        if getattr(user, 'rol', '') == 'estudiante':
+            return 'aprobados'
+        if getattr(user, 'es_encargado_especial_grado', False) or getattr(user, 'es_encargado_pasantias', False):
+            return f"encargado:{user.pk}"
+        return 'todos'
+
+    def _queryset_por_rol(self):
         # Nota: El editor puede marcar error en 'user.rol' porque no detecta
         # el modelo personalizado localmente, pero en Docker funcionará bien.
         user = self.request.user
@@ -81,11 +157,7 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
         es_encargado_pasantias = getattr(user, 'es_encargado_pasantias', False)
 
         if es_encargado_grado or es_encargado_pasantias:
-            return TrabajoInvestigacion.objects.filter(
-                Q(subido_por=user) |
-                Q(tipo_trabajo='especial_grado', estado__in=['aprobado', 'pendiente']) |
-                Q(tipo_trabajo='practicas_profesionales', estado__in=['aprobado', 'pendiente'])
-            )
+            return TrabajoInvestigacion.objects.filter(visibles_para_encargado(user.pk))
         
         # Superusuarios y administradores ven todo
         qs = TrabajoInvestigacion.objects.all()
@@ -101,6 +173,10 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
         """
         # Nota: Este método ahora está exento de CSRF gracias al decorador en la clase
         serializer = self.get_serializer(data=request.data)
+        return self._guardar_trabajo_nuevo(request, serializer)
+    
+    def _guardar_trabajo_nuevo(self, request, serializer):
+        """Valida y crea el trabajo, y lo encola para la IA (subida normal o reanudable)"""
         serializer.is_valid(raise_exception=True)
         
         # Verificar permisos adicionales
@@ -111,33 +187,113 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
         trabajo = serializer.save()
         
         # Registrar actividad
-        LogActividades.objects.create(
-            usuario=request.user,
-            accion='upload',
-            trabajo=trabajo,
-            descripcion=f"Subió el trabajo: {trabajo.titulo}",
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        # Aquí se activaría el procesamiento de IA en background
-        # procesar_trabajo_con_ia.delay(trabajo.id)
-        
-        # --- NUEVA LÓGICA DE IA ---
-        # Enviamos el PDF al servicio de FastAPI si existe el archivo
-        if trabajo.archivo_pdf:
-            try:
-                enviar_pdf_a_ia(trabajo.id, trabajo.archivo_pdf)
-            except Exception as e:
-                # Logeamos el error pero no detenemos la respuesta al usuario
-                print(f"Error al enviar a IA: {e}")
-        # --------------------------
+        registrar_evento(request, 'upload', trabajo, f"Subió el trabajo: {trabajo.titulo}")
+        
+        # Un PDF idéntico a otro ya subido comparte su archivo y sus resultados
+        # de IA; el resto se procesa en background, una vez confirmada la transacción
+        original = getattr(trabajo, 'duplicado_de', None)
+        if original is not None:
+            copiar_resultados_ia(original, trabajo)
+            mensaje = f'Trabajo subido exitosamente. El PDF es idéntico al del trabajo {original.id}: se reutiliza su análisis.'
+        else:
+            mensaje = 'Trabajo subido exitosamente. Será procesado por la IA.'
+            if trabajo.archivo_pdf:
+                transaction.on_commit(lambda: procesar_trabajo_con_ia.delay(trabajo.id))
         
         return Response({
-            'message': 'Trabajo subido exitosamente. Será procesado por la IA.',
+            'message': mensaje,
             'trabajo': TrabajoInvestigacionListSerializer(trabajo, context={'request': request}).data
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    def subida_directa(self, request):
+        """
+        Formulario firmado para subir el PDF directamente al bucket S3. El
+        frontend hace el POST a `url` con `campos` + el archivo y después crea
+        el trabajo enviando `archivo_clave` en lugar de `archivo_pdf`.
+        """
+        if not request.user.is_authenticated:
+            raise PermissionDenied("Debes iniciar sesión para subir trabajos.")
+        if not usa_s3():
+            return Response({
+                'error': 'La subida directa solo está disponible con almacenamiento S3.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(post_subida_firmado(request.user))
+    
+    def _subida_del_usuario(self, request, subida_id):
+        if not request.user.is_authenticated:
+            raise PermissionDenied("Debes iniciar sesión para subir trabajos.")
+        try:
+            return SubidaReanudable.objects.get(pk=subida_id, usuario=request.user)
+        except (SubidaReanudable.DoesNotExist, DjangoValidationError):
+            raise NotFound("La subida no existe o ha caducado.")
+    
+    @action(detail=False, methods=['post'], url_path='subidas')
+    def crear_subida(self, request):
+        """
+        Inicia una subida reanudable: {nombre_archivo, tamaño_total, sha256}.
+        Devuelve el id y el tamaño de fragmento; después se envía cada
+        fragmento con PUT a subidas/<id>/ y Content-Range, y se llama a
+        subidas/<id>/finalizar/ con los datos del trabajo.
+        """
+        if not request.user.is_authenticated:
+            raise PermissionDenied("Debes iniciar sesión para subir trabajos.")
+        serializer = SubidaReanudableSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subida = iniciar_subida(request.user, **serializer.validated_data)
+        return Response(SubidaReanudableSerializer(subida).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get', 'put', 'delete'], url_path=r'subidas/(?P<subida_id>[^/.]+)')
+    def subida(self, request, subida_id=None):
+        """
+        GET: estado de la subida (desde qué byte continuar tras un corte).
+        PUT: un fragmento, con `Content-Range: bytes inicio-fin/total` y el
+        contenido binario en el cuerpo. DELETE: cancela la subida.
+        """
+        subida = self._subida_del_usuario(request, subida_id)
+        if request.method == 'GET':
+            return Response(SubidaReanudableSerializer(subida).data)
+        if request.method == 'DELETE':
+            descartar_subida(subida)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        rango = RANGO_FRAGMENTO.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if not rango or int(rango.group(3)) != subida.tamaño_total:
+            return Response({
+                'error': 'Falta la cabecera Content-Range (bytes inicio-fin/total) o no coincide con la subida.',
+                'recibido': subida.recibido,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        inicio, fin = int(rango.group(1)), int(rango.group(2))
+        longitud = fin - inicio + 1
+        if longitud != int(request.META.get('CONTENT_LENGTH') or 0):
+            return Response({
+                'error': 'Content-Length no coincide con Content-Range.',
+                'recibido': subida.recibido,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # El cuerpo se lee del flujo de la petición (sin parsers de DRF) por trozos
+        try:
+            recibir_fragmento(subida, inicio, longitud, request.stream)
+        except FragmentoInvalido as e:
+            return Response({'error': str(e), 'recibido': e.recibido}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'id': subida.id,
+            'recibido': subida.recibido,
+            'completa': subida.recibido == subida.tamaño_total,
+        })
+    
+    @action(detail=False, methods=['post'], url_path=r'subidas/(?P<subida_id>[^/.]+)/finalizar')
+    def finalizar_subida(self, request, subida_id=None):
+        """
+        Comprueba el SHA-256 del archivo ensamblado y crea el trabajo con los
+        mismos campos que la subida normal (sin archivo_pdf).
+        """
+        subida = self._subida_del_usuario(request, subida_id)
+        serializer = TrabajoInvestigacionCreateSerializer(
+            data=request.data, context={**self.get_serializer_context(), 'subida': subida}
+        )
+        return self._guardar_trabajo_nuevo(request, serializer)
+    
     # --- AÑADE ESTA FUNCIÓN DENTRO DE TrabajoInvestigacionViewSet ---
     def _can_upload_work(self, user, tipo_trabajo):
         """
@@ -158,33 +314,40 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             
         # Si no tiene roles especiales, pero está autenticado (permitir por ahora)
         return user.is_authenticated
-
-    def _get_client_ip(self, request):
-        """Helper para obtener la IP del cliente"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+    
+    def list(self, request, *args, **kwargs):
+        # 304 sin consultar ni serializar si el catálogo no cambió desde la copia del cliente
+        return responder_condicional(
+            request, ['trabajos', 'carreras', 'usuarios'], partial(super().list, request, *args, **kwargs),
+            variante=self._alcance_por_rol(), max_age=settings.RESPUESTAS_API_MAX_AGE,
+        )
     
     def retrieve(self, request, *args, **kwargs):
         """
         Obtener detalle del trabajo
         """
         trabajo = self.get_object()
-        
-        # Registrar actividad de visualización
-        LogActividades.objects.create(
-            usuario=request.user,
-            accion='view',
-            trabajo=trabajo,
-            descripcion=f"Visualizó el trabajo: {trabajo.titulo}",
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        incrementar('vistas', trabajo.pk)
+        
+        # Registrar actividad de visualización (encolada; se inserta por lotes)
+        registrar_evento(request, 'view', trabajo, f"Visualizó el trabajo: {trabajo.titulo}")
+        
+        # Si el cliente ya tiene la versión actual, 304 sin serializar; si no, el
+        # detalle cacheado de esa versión con puede_descargar y contadores al día
+        return responder_condicional(
+            request, sellos_detalle(trabajo.pk),
+            lambda: Response(superponer_usuario(
+                detalle_cacheado(trabajo.pk, lambda: self._serializar_detalle(trabajo.pk)), trabajo, request
+            )),
+            variante=self._alcance_por_rol(),
         )
-        
-        return super().retrieve(request, *args, **kwargs)
+    
+    def _serializar_detalle(self, pk):
+        datos = serializar_detalle(pk)
+        if datos is None:
+            # Borrado entre la comprobación de permisos y la serialización
+            raise NotFound()
+        return datos
     
     @action(detail=True, methods=['get', 'post'])
     def descargar(self, request, pk=None):
@@ -203,53 +366,16 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
                 'error': 'Este trabajo no puede ser descargado.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Importación local para evitar ciclos
-        from apps.comentarios.models import ReporteDescarga
-        ReporteDescarga.objects.create(
-            trabajo=trabajo,
-            usuario=request.user if request.user.is_authenticated else None,
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        LogActividades.objects.create(
-            usuario=request.user if request.user.is_authenticated else None,
-            accion='download',
-            trabajo=trabajo,
-            descripcion=f"Descargó el trabajo: {trabajo.titulo}",
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        # 3. Incrementar contador de descargas
-        try:
-            trabajo.incrementar_descargas()
-        except Exception:
+        # 2. Registrar y contar la descarga (las peticiones Range siguientes del visor no cuentan)
+        if es_descarga_nueva(request):
+            registrar_evento(request, 'download', trabajo, f"Descargó el trabajo: {trabajo.titulo}")
             try:
-                trabajo.total_descargas = (trabajo.total_descargas or 0) + 1
-                trabajo.save(update_fields=['total_descargas'])
+                incrementar('descargas', trabajo.pk)
             except Exception:
                 logger.exception(f"No se pudo incrementar contador de descargas para trabajo {trabajo.id}")
-            
-        # 4. Retornar el archivo físico (Nueva lógica)
-        response = FileResponse(trabajo.archivo_pdf.open('rb'), content_type='application/pdf')
-        nombre_archivo = os.path.basename(trabajo.archivo_pdf.name)
-        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
-        
-        return response # <-- Asegúrate de que no haya nada después de este return
-                
-        # Manejo seguro si no hay archivo (aunque debería haber)
-        # download_url = trabajo.archivo_pdf.url if trabajo.archivo_pdf else ''
-        
-        #return Response({
-        #    'download_url': download_url,
-        #    'trabajo': {
-        #        'titulo': trabajo.titulo,
-        #        'autores': trabajo.autores,
-        #        'año': trabajo.año
-        #    }
-        #}
-        #)
+        
+        # 3. Entregar el archivo (X-Accel-Redirect a nginx o FileResponse según DESCARGAS_MODO)
+        return respuesta_archivo(trabajo.archivo_pdf)
     
     @action(detail=True, methods=['post'])
     def aprobar(self, request, pk=None):
@@ -279,15 +405,7 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             trabajo_aprobado = serializer.save()
             
             # 3. Registro de Actividad (Log)
-            ip_addr = request.META.get('REMOTE_ADDR')
-            LogActividades.objects.create(
-                usuario=user,
-                accion='approve',
-                trabajo=trabajo_aprobado,
-                descripcion=f"Aprobó el trabajo: {trabajo_aprobado.titulo}",
-                ip_address=ip_addr,
-                user_agent=request.META.get('HTTP_USER_AGENT', '')
-            )
+            registrar_evento(request, 'approve', trabajo_aprobado, f"Aprobó el trabajo: {trabajo_aprobado.titulo}")
             
             return Response({
                 'message': 'Trabajo aprobado exitosamente.',
@@ -305,13 +423,7 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
 
         trabajo_id = trabajo.id
         trabajo.delete()
-        LogActividades.objects.create(
-            usuario=user,
-            accion='delete',
-            trabajo=None,
-            descripcion=f"Eliminó el trabajo: {trabajo_id}",
-            ip_address=self._get_client_ip(request)
-        )
+        registrar_evento(request, 'delete', None, f"Eliminó el trabajo: {trabajo_id}")
         return Response({'success': True, 'deleted': trabajo_id})
 
 
@@ -328,12 +440,9 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             trabajo.estado = 'rechazado'
             trabajo.save(update_fields=['estado'])
 
-        LogActividades.objects.create(
-            usuario=request.user,
-            accion='reject',
-            trabajo=trabajo,
-            descripcion=(f"Rechazó el trabajo: {trabajo.titulo}. Motivo: {motivo}" if motivo else f"Rechazó el trabajo: {trabajo.titulo}"),
-            ip_address=self._get_client_ip(request)
+        registrar_evento(
+            request, 'reject', trabajo,
+            f"Rechazó el trabajo: {trabajo.titulo}. Motivo: {motivo}" if motivo else f"Rechazó el trabajo: {trabajo.titulo}"
         )
 
         return Response({
@@ -374,88 +483,77 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # 3. Serializar y retornar
-        serializer = TrabajoInvestigacionListSerializer(
-            pendientes, 
-            many=True, 
-            context={'request': request}
-        )
-        return Response(serializer.data)
+        # 3. Serializar y retornar (paginado solo si se pide ?page= o ?cursor=)
+        return self.paginar_si_se_pide(pendientes, TrabajoInvestigacionListSerializer)
 
     # ... (El resto de tus métodos 'buscar_inteligente', 'recomendados', 'estadisticas' quedan igual)
     # He resumido aquí para enfocar en la solución, pero mantén tus otros métodos abajo.
     
     @action(detail=False, methods=['get'])
     def buscar_inteligente(self, request):
-        import requests
-        
+        """
+        Búsqueda semántica (IA) con fallback de texto completo. La lista de ids
+        sale de la cache de búsquedas (ver busqueda.py) y las filas se cargan
+        por clave primaria; `cache` informa del acierto y la tasa acumulada.
+        """
         query = request.query_params.get('q', '')
-        carrera = request.query_params.get('carrera', '')
+        carrera = request.query_params.get('carrera', '').strip()
         
-        if not query:
+        consulta = normalizar_consulta(query)
+        if not consulta:
             return Response({'error': 'Consulta vacía'}, status=400)
 
-        ids_recomendados = []
-        try:
-            # 1. Llamar al servicio de IA
-            response = requests.post(
-                "http://ai-service:8000/search", 
-                json={"query": query, "top_k": 10},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                resultados_ia = response.json()
-                logger.info(f"IA returned {len(resultados_ia)} results for query='{query}'")
-                # Extraemos los IDs de la respuesta de la IA y convertimos a int
-                try:
-                    ids_recomendados = [int(r.get('trabajo_id')) for r in resultados_ia if r.get('trabajo_id')]
-                except Exception:
-                    ids_recomendados = [int(str(r.get('trabajo_id'))) for r in resultados_ia if r.get('trabajo_id')]
-                logger.info(f"IDs recomendados: {ids_recomendados}")
-                
-        except Exception as e:
-            print(f"Error conectando con IA: {e}")
-            # Si falla, la lista ids_recomendados queda vacía y pasamos al fallback
-
-        # 2. Buscar los objetos en la Base de Datos
-        trabajos = self.get_queryset().filter(estado='aprobado')
-        
-        if ids_recomendados:
-            # Filtramos solo los que trajo la IA
-            trabajos = trabajos.filter(id__in=ids_recomendados)
-            
-            # TRUCO PRO: Ordenar los resultados de Django en el mismo orden que la IA
-            # (Porque filter(id__in=...) a veces desordena los resultados)
-            from django.db.models import Case, When
-            preserved = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids_recomendados)])
-            trabajos = trabajos.order_by(preserved)
-            
-        else:
-            # Fallback: Búsqueda tradicional si la IA no trajo nada o falló
-            trabajos = trabajos.filter(
-                Q(titulo__icontains=query) | 
-                Q(resumen__icontains=query) |
-                Q(objetivos__icontains=query)
-            )
+        if not request.user.is_authenticated:
+            # get_queryset no deja ver nada a los anónimos
+            return Response({'resultados': [], 'total': 0, 'modo': 'Tradicional (Texto)'})
 
-        if carrera:
-            trabajos = trabajos.filter(carrera=carrera)
+        datos, estado_cache = resultados_busqueda(consulta, carrera)
+        tasa = registrar_consulta(estado_cache != 'fallo')
 
-        # Serializamos
-        serializer = TrabajoInvestigacionListSerializer(trabajos[:20], many=True, context={'request': request})
+        # Se vuelve a filtrar por rol y estado: la lista puede ser anterior a un cambio
+        por_id = {
+            trabajo.pk: trabajo
+            for trabajo in self.get_queryset().filter(estado='aprobado', pk__in=datos['ids'])
+        }
+        trabajos = [por_id[pk] for pk in datos['ids'] if pk in por_id]
+        serializer = TrabajoInvestigacionListSerializer(trabajos, many=True, context={'request': request})
         
         return Response({
             'resultados': serializer.data,
-            'total': trabajos.count(),
-            'modo': 'IA (Semántica)' if ids_recomendados else 'Tradicional (Texto)'
+            # Con IA el total son los resultados devueltos; en texto, conteo cacheado
+            'total': len(serializer.data) if datos['modo'] == 'IA (Semántica)' else datos['total'],
+            'modo': datos['modo'],
+            'cache': {'estado': estado_cache, 'tasa_aciertos': tasa},
         })
 
+    @action(detail=False, methods=['get'])
+    def sugerencias(self, request):
+        """
+        Sugerencias para el buscador mientras se escribe: pocas filas, solo
+        columnas ligeras y cacheadas unos segundos por texto normalizado.
+        """
+        texto = request.query_params.get('q', '').strip()
+        normalizado = normalizar_sugerencia(texto)
+        if len(normalizado) < 2:
+            return Response({'q': texto, 'resultados': []})
+
+        try:
+            limite = min(max(int(request.query_params.get('limite', 8)), 1), 20)
+        except ValueError:
+            limite = 8
+
+        resultados = SUGERENCIAS.obtener(
+            (limite, hashlib.md5(normalizado.encode()).hexdigest()),
+            lambda: sugerir_trabajos(TrabajoInvestigacion.objects.filter(estado='aprobado'), texto, limite),
+        )
+
+        return Response({'q': texto, 'resultados': resultados})
+
     @action(detail=False, methods=['get'])
     def mis_trabajos(self, request):
         # Filtra los trabajos donde el campo 'estudiante' sea el usuario que hace la petición
-        trabajos = TrabajoInvestigacion.objects.filter(estudiante=request.user)
-        serializer = self.get_serializer(trabajos, many=True, context={'request': request})
+        trabajos = self.optimizar_queryset(TrabajoInvestigacion.objects.filter(estudiante=request.user))
+        serializer = TrabajoInvestigacionListSerializer(trabajos, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
@@ -471,20 +569,27 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            trabajo_base = TrabajoInvestigacion.objects.get(id=trabajo_id)
-        except TrabajoInvestigacion.DoesNotExist:
+            trabajo_base = TrabajoInvestigacion.objects.only(
+                'id', 'titulo', 'carrera_id', 'tipo_trabajo'
+            ).get(id=trabajo_id)
+        except (TrabajoInvestigacion.DoesNotExist, ValueError):
             return Response({
                 'error': 'Trabajo no encontrado.'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Aquí se usaría el vector embedding para encontrar trabajos similares
-        # Por ahora usamos trabajos de la misma carrera y tipo
-        
-        trabajos_similares = self.get_queryset().filter(
+        # Vecinos precalculados por la IA: consulta indexada por (trabajo, posicion)
+        trabajos_similares = list(self.get_queryset().filter(
             estado='aprobado',
-            carrera=trabajo_base.carrera,
-            tipo_trabajo=trabajo_base.tipo_trabajo
-        ).exclude(id=trabajo_id)[:10]
+            similar_de__trabajo_id=trabajo_base.id
+        ).order_by('similar_de__posicion')[:10])
+        
+        if not trabajos_similares:
+            # Sin vecinos calculados aún: trabajos de la misma carrera y tipo
+            trabajos_similares = self.get_queryset().filter(
+                estado='aprobado',
+                carrera=trabajo_base.carrera_id,
+                tipo_trabajo=trabajo_base.tipo_trabajo
+            ).exclude(id=trabajo_base.id)[:10]
         
         serializer = TrabajoInvestigacionListSerializer(
             trabajos_similares,
@@ -510,22 +615,18 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
         
         # self.get_queryset() ya aplica los filtros de rol que definiste arriba
         queryset = self.get_queryset()
-        
-        total_descargas_data = queryset.aggregate(total=Sum('total_descargas'))
-        total_descargas = total_descargas_data.get('total') or 0
-
-        stats = {
-            'total_trabajos': queryset.count(),
-            'trabajos_aprobados': queryset.filter(estado='aprobado').count(),
-            'trabajos_pendientes': queryset.filter(estado='pendiente').count(),
-            'trabajos_rechazados': queryset.filter(estado='rechazado').count(),
-            'total_descargas': total_descargas,
-            'recientes': TrabajoInvestigacionListSerializer(
-                queryset.order_by('-fecha_subida')[:5], 
-                many=True, 
+
+        def calcular():
+            datos = calcular_estadisticas_trabajos(queryset)
+            datos['recientes'] = TrabajoInvestigacionListSerializer(
+                queryset.order_by('-fecha_subida')[:5],
+                many=True,
                 context={'request': request}
             ).data
-        }
+            return datos
+
+        # Una instantánea por alcance de rol, invalidada por señales al cambiar los datos
+        stats = estadisticas_cacheadas('trabajos', self._alcance_por_rol(), calcular)
         return Response(stats)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
@@ -540,8 +641,13 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
         structured = request.data.get('structured_info') or request.data.get('structured')
         embedding = request.data.get('embedding') or request.data.get('embedding_vector')
         tags = request.data.get('tags') or request.data.get('tags_ia')
+        similares = request.data.get('similares')
+        contenido = request.data.get('contenido_extraido')
 
         updated = False
+        # Solo las columnas que cambia la IA: un save() completo pisaría los
+        # contadores volcados desde Redis mientras se procesaba
+        campos = []
         try:
             if structured and isinstance(structured, dict):
                 resumen = structured.get('resumen')
@@ -551,15 +657,19 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
 
                 if resumen:
                     trabajo.resumen = resumen
+                    campos.append('resumen')
                     updated = True
                 if objetivos:
                     trabajo.objetivos = objetivos
+                    campos.append('objetivos')
                     updated = True
                 if titulo and not trabajo.titulo:
                     trabajo.titulo = titulo
+                    campos.append('titulo')
                     updated = True
                 if autores and not trabajo.autores:
                     trabajo.autores = autores
+                    campos.append('autores')
                     updated = True
 
             if tags is not None:
@@ -575,14 +685,21 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
                     tags_list = []
 
                 trabajo.tags_ia = tags_list
+                campos.append('tags_ia')
                 updated = True
 
-            if embedding is not None:
-                trabajo.embedding_vector = embedding
+            if isinstance(embedding, list) or contenido:
+                guardar_contenido_trabajo(trabajo.id, contenido, embedding if isinstance(embedding, list) else None)
                 updated = True
 
-            if updated:
-                trabajo.save()
+            if campos:
+                trabajo.save(update_fields=campos)
+
+            if similares:
+                guardar_trabajos_similares(trabajo.id, similares)
+
+            # Los trabajos con el mismo PDF no se enviaron a la IA
+            propagar_resultados_ia(trabajo)
 
             return Response({'success': True, 'updated': updated, 'trabajo_id': trabajo.id}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -590,6 +707,26 @@ class TrabajoInvestigacionViewSet(viewsets.ModelViewSet):
             return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class LogActividadesViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta del log de actividades (solo administradores), paginada por
+    cursor sobre (fecha, id)
+    """
+    serializer_class = LogActividadesSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = PaginacionKeyset
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['accion', 'usuario', 'trabajo']
+    ordering_fields = ['fecha']
+    ordering = ['-fecha']
+    
+    def get_queryset(self):
+        return LogActividades.objects.select_related('usuario', 'trabajo').only(
+            'id', 'accion', 'descripcion', 'ip_address', 'fecha',
+            'usuario__id', 'usuario__username', 'trabajo__id', 'trabajo__titulo'
+        )
+
+
 class ConfiguracionCarreraViewSet(viewsets.ModelViewSet):
     """
     Vista para configuración de carreras
@@ -608,6 +745,19 @@ class ConfiguracionCarreraViewSet(viewsets.ModelViewSet):
             
         return ConfiguracionCarrera.objects.filter(activa=True)
     
+    def _condicional(self, request, generar):
+        # Las carreras cambian muy de vez en cuando: casi siempre basta un 304
+        variante = 'todas' if request.user.is_staff or request.user.is_superuser else 'activas'
+        return responder_condicional(
+            request, ['carreras'], generar, variante=variante, max_age=settings.RESPUESTAS_API_MAX_AGE
+        )
+    
+    def list(self, request, *args, **kwargs):
+        return self._condicional(request, partial(super().list, request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self._condicional(request, partial(super().retrieve, request, *args, **kwargs))
+    
     def create(self, request, *args, **kwargs):
         if not request.user.is_staff:
             raise PermissionDenied("Solo los administradores pueden crear configuraciones de carrera.")
@@ -642,8 +792,12 @@ def aplicar_ia_callback(request, pk):
     structured = request.data.get('structured_info') or request.data.get('structured')
     embedding = request.data.get('embedding') or request.data.get('embedding_vector')
     tags = request.data.get('tags') or request.data.get('tags_ia')
+    similares = request.data.get('similares')
+    contenido = request.data.get('contenido_extraido')
 
     updated = False
+    # Solo las columnas que cambia la IA (ver aplicar_ia)
+    campos = []
     try:
         if structured and isinstance(structured, dict):
             resumen = structured.get('resumen')
@@ -653,15 +807,19 @@ def aplicar_ia_callback(request, pk):
 
             if resumen:
                 trabajo.resumen = resumen
+                campos.append('resumen')
                 updated = True
             if objetivos:
                 trabajo.objetivos = objetivos
+                campos.append('objetivos')
                 updated = True
             if titulo and not trabajo.titulo:
                 trabajo.titulo = titulo
+                campos.append('titulo')
                 updated = True
             if autores and not trabajo.autores:
                 trabajo.autores = autores
+                campos.append('autores')
                 updated = True
 
         if tags is not None:
@@ -676,14 +834,20 @@ def aplicar_ia_callback(request, pk):
                 tags_list = []
 
             trabajo.tags_ia = tags_list
+            campos.append('tags_ia')
             updated = True
 
-        if embedding is not None:
-            trabajo.embedding_vector = embedding
+        if isinstance(embedding, list) or contenido:
+            guardar_contenido_trabajo(trabajo.id, contenido, embedding if isinstance(embedding, list) else None)
             updated = True
 
-        if updated:
-            trabajo.save()
+        if campos:
+            trabajo.save(update_fields=campos)
+
+        if similares:
+            guardar_trabajos_similares(trabajo.id, similares)
+
+        propagar_resultados_ia(trabajo)
 
         return Response({'success': True, 'updated': updated, 'trabajo_id': trabajo.id}, status=status.HTTP_200_OK)
     except Exception as e:
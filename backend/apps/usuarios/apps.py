@@ -0,0 +1,10 @@
+# backend/apps/usuarios/apps.py
+from django.apps import AppConfig
+
+
+class UsuariosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.usuarios'
+
+    def ready(self):
+        from . import signals  # noqa: F401
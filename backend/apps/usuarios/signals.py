@@ -0,0 +1,26 @@
+# backend/apps/usuarios/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.trabajos.estadisticas import invalidar_estadisticas
+from apps.trabajos.versiones import cambiar_versiones
+from .models import Usuario
+
+# Escrituras que no cambian ninguna cifra de las estadísticas (p. ej. el login)
+CAMPOS_SIN_ESTADISTICAS = {'last_login', 'ultima_conexion'}
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_estadisticas_usuarios(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= CAMPOS_SIN_ESTADISTICAS:
+        return
+    transaction.on_commit(lambda: invalidar_estadisticas('usuarios'))
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def cambiar_version_usuarios(sender, update_fields=None, **kwargs):
+    # Los nombres de autor, tutor y comentarista aparecen en trabajos y comentarios
+    if update_fields and set(update_fields) <= CAMPOS_SIN_ESTADISTICAS:
+        return
+    cambiar_versiones('usuarios')
@@ -10,6 +10,7 @@ from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from apps.trabajos.estadisticas import calcular_estadisticas_usuarios, estadisticas_cacheadas
 from .models import Usuario
 from .serializers import (
     UsuarioRegistroSerializer, UsuarioLoginSerializer, UsuarioPerfilSerializer,
@@ -203,26 +204,11 @@ class UsuarioViewSet(viewsets.ModelViewSet):
                 'error': 'No tienes permisos para ver estadísticas.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        from django.db.models import Count
-        
-        stats = {
-            'total_usuarios': Usuario.objects.count(),
-            'usuarios_activos': Usuario.objects.filter(activo=True).count(),
-            'usuarios_inactivos': Usuario.objects.filter(activo=False).count(),
-            'usuarios_por_rol': dict(
-                Usuario.objects.values('rol').annotate(
-                    count=Count('id')
-                ).values_list('rol', 'count')
-            ),
-            'usuarios_por_carrera': dict(
-                Usuario.objects.exclude(carrera__isnull=True).values('carrera').annotate(
-                    count=Count('id')
-                ).values_list('carrera', 'count')
-            ),
-            'registros_recientes': Usuario.objects.filter(
-                fecha_registro__gte=timezone.now() - timedelta(days=30)
-            ).count()
-        }
+        desde = timezone.now() - timedelta(days=30)
+        stats = estadisticas_cacheadas(
+            'usuarios', 'todos',
+            lambda: calcular_estadisticas_usuarios(Usuario.objects.all(), desde)
+        )
         
         return Response(stats)
     
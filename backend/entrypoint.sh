@@ -6,6 +6,8 @@ if [ -f "./manage.py" ]; then
 echo "manage.py encontrado: ejecutando migrate y collectstatic"
 python manage.py migrate --noinput || true
 python manage.py collectstatic --noinput --clear || true
+# Precalentar la cache (detalles más vistos, estadísticas); no bloquea el arranque
+python manage.py calentar_cache || true
 else
 echo "manage.py no encontrado: se omiten migrate y collectstatic"
 fi
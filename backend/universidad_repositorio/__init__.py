@@ -1 +1,6 @@
 # Package initializer for universidad_repositorio
+
+# Cargar la app de Celery al iniciar Django para que `.delay()` use su configuración
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
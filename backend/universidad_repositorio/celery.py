@@ -23,62 +23,102 @@ def debug_task(self):
 
 
 # Configuración de tareas de IA
-@app.task
-def procesar_trabajo_con_ia(trabajo_id, pdf_path):
+@app.task(bind=True, max_retries=5, default_retry_delay=30, acks_late=True)
+def procesar_trabajo_con_ia(self, trabajo_id):
     """
-    Procesar trabajo con IA en background
+    Procesar trabajo con IA en background. Se pasa al servicio de IA la ruta
+    del PDF en el volumen de medios compartido, no el contenido del archivo.
     """
-    from ai_processor import get_ai_service
+    import requests
+    from apps.trabajos.models import TrabajoInvestigacion
+    from apps.trabajos.archivos import completar_huella
+    from apps.trabajos.services import (
+        ArchivoNoCompartidoError, copiar_resultados_ia, enviar_pdf_a_ia, enviar_ruta_a_ia,
+        metadatos_para_ia
+    )
     
     try:
-        service = get_ai_service()
-        result = service.process_pdf_and_extract(pdf_path, str(trabajo_id))
-        
-        # Aquí actualizarías la base de datos con los resultados
-        # Esta es una tarea simplificada
-        
+        trabajo = TrabajoInvestigacion.objects.get(id=trabajo_id)
+    except TrabajoInvestigacion.DoesNotExist:
+        return {'success': False, 'error': f'Trabajo {trabajo_id} no existe'}
+    
+    if not trabajo.archivo_pdf:
+        return {'success': False, 'error': 'El trabajo no tiene archivo PDF'}
+    
+    # Subidas directas a S3: la huella se calcula aquí. Un PDF repetido no se
+    # vuelve a procesar, se reutilizan los resultados del original
+    if not trabajo.hash_sha256:
+        original = completar_huella(trabajo)
+        if original is not None:
+            copiar_resultados_ia(original, trabajo)
+            return {'success': True, 'duplicado_de': original.id}
+    
+    try:
+        return enviar_ruta_a_ia(trabajo)
+    except ArchivoNoCompartidoError:
+        # La IA no monta el volumen de medios: se envía el archivo
+        with trabajo.archivo_pdf.open('rb') as pdf_file:
+            result = enviar_pdf_a_ia(trabajo.id, pdf_file, metadatos_para_ia(trabajo))
+        if result is None:
+            raise self.retry(countdown=self.default_retry_delay * 2 ** self.request.retries)
         return result
-        
-    except Exception as e:
-        # Registrar error
-        print(f"Error procesando trabajo {trabajo_id}: {e}")
-        return {'success': False, 'error': str(e)}
+    except requests.RequestException as e:
+        print(f"Error enviando trabajo {trabajo_id} a la IA: {e}")
+        raise self.retry(exc=e, countdown=self.default_retry_delay * 2 ** self.request.retries)
 
 
 @app.task
 def actualizar_embeddings_todos_trabajos():
     """
-    Actualizar embeddings de todos los trabajos (tarea de mantenimiento)
+    Reprocesar con la IA los trabajos aprobados que aún no tienen contenido
+    indexado (tarea de mantenimiento)
     """
     from apps.trabajos.models import TrabajoInvestigacion
     
     try:
-        trabajos = TrabajoInvestigacion.objects.filter(estado='aprobado')
-        service = get_ai_service()
+        trabajos = TrabajoInvestigacion.objects.filter(
+            estado='aprobado', contenido__isnull=True
+        ).exclude(archivo_pdf='').values_list('id', flat=True)
         
         results = []
-        for trabajo in trabajos:
-            if trabajo.archivo_pdf and trabajo.contenido_extraido:
-                embedding = service.generate_embedding(trabajo.contenido_extraido)
-                if embedding is not None:
-                    trabajo.embedding_vector = embedding.tolist()
-                    trabajo.save()
-                    results.append(trabajo.id)
+        for trabajo_id in trabajos.iterator():
+            procesar_trabajo_con_ia.delay(trabajo_id)
+            results.append(trabajo_id)
         
-        return f"Actualizados {len(results)} embeddings"
+        return f"Encolados {len(results)} trabajos para generar embeddings"
         
     except Exception as e:
         print(f"Error actualizando embeddings: {e}")
         return f"Error: {str(e)}"
 
 
+@app.task
+def sincronizar_trabajos_similares():
+    """
+    Recalcular en la IA los vecinos más cercanos de cada trabajo y copiarlos
+    a la base de datos para que `recomendados` sea una consulta indexada
+    """
+    from apps.trabajos.services import sincronizar_trabajos_similares as sincronizar
+    
+    try:
+        total = sincronizar(recalcular=True)
+        return f"Sincronizados {total} vecinos"
+        
+    except Exception as e:
+        print(f"Error sincronizando trabajos similares: {e}")
+        return f"Error: {str(e)}"
+
+
 @app.task
 def generar_estadisticas_semanales():
     """
     Generar estadísticas semanales del sistema
     """
     from datetime import datetime, timedelta
-    from apps.trabajos.models import TrabajoInvestigacion, LogActividades
+    from django.core.cache import cache
+    from django.utils import timezone
+    from apps.trabajos.models import TrabajoInvestigacion
+    from apps.trabajos.actividad import totales_por_accion
     
     try:
         fecha_inicio = datetime.now() - timedelta(days=7)
@@ -92,28 +132,20 @@ def generar_estadisticas_semanales():
             fecha_aprobacion__gte=fecha_inicio
         ).count()
         
-        # Estadísticas de descargas
-        descargas_semana = LogActividades.objects.filter(
-            accion='download',
-            fecha__gte=fecha_inicio
-        ).count()
-        
-        # Búsquedas realizadas
-        busquedas_semana = LogActividades.objects.filter(
-            accion='search',
-            fecha__gte=fecha_inicio
-        ).count()
+        # Descargas, búsquedas y vistas: del resumen diario, no del log completo
+        actividad = totales_por_accion(timezone.localdate() - timedelta(days=7))
         
         estadisticas = {
             'periodo': f"{fecha_inicio.strftime('%Y-%m-%d')} - {datetime.now().strftime('%Y-%m-%d')}",
             'trabajos_nuevos': trabajos_nuevos,
             'trabajos_aprobados': trabajos_aprobados,
-            'descargas_totales': descargas_semana,
-            'busquedas_totales': busquedas_semana
+            'descargas_totales': actividad.get('download', 0),
+            'busquedas_totales': actividad.get('search', 0),
+            'vistas_totales': actividad.get('view', 0),
         }
         
-        # Aquí podrías guardar estas estadísticas en la base de datos
-        # o enviarlas por email a los administradores
+        # Último informe disponible para el panel hasta que se genere el siguiente
+        cache.set('estadisticas:semanales', estadisticas, 8 * 24 * 60 * 60)
         
         return estadisticas
         
@@ -125,29 +157,34 @@ def generar_estadisticas_semanales():
 @app.task
 def limpiar_archivos_temporales():
     """
-    Limpiar archivos temporales y cache antiguos
+    Limpiar archivos temporales caducados (sin cambios desde hace más de
+    ARCHIVOS_TEMPORALES_EXPIRA segundos). La cache no se vacía: cada espacio
+    se invalida por versión al cambiar sus datos y sus claves expiran por TTL.
     """
+    import time
     import tempfile
     import shutil
     from pathlib import Path
+    from django.conf import settings
     
     try:
-        # Limpiar directorio temporal
+        # Solo lo caducado: un archivo reciente puede estar usándose ahora mismo
+        limite = time.time() - settings.ARCHIVOS_TEMPORALES_EXPIRA
         temp_dir = Path(tempfile.gettempdir())
-        temp_files = list(temp_dir.glob('universidad_repositorio_*'))
         
         cleaned = 0
-        for temp_file in temp_files:
-            if temp_file.is_file():
-                temp_file.unlink()
+        for temp_file in temp_dir.glob('universidad_repositorio_*'):
+            try:
+                if temp_file.stat().st_mtime >= limite:
+                    continue
+                if temp_file.is_dir():
+                    shutil.rmtree(temp_file)
+                else:
+                    temp_file.unlink()
                 cleaned += 1
-            elif temp_file.is_dir():
-                shutil.rmtree(temp_file)
-                cleaned += 1
-        
-        # Limpiar cache de Django
-        from django.core.cache import cache
-        cache.clear()
+            except FileNotFoundError:
+                # Lo borró su dueño mientras se recorría el directorio
+                pass
         
         return f"Limpieza completada. {cleaned} elementos removidos."
         
@@ -197,6 +234,64 @@ def verificar_salud_sistema():
         return f"Error en verificación: {str(e)}"
 
 
+@app.task
+def volcar_contadores():
+    """Volcar a PostgreSQL los contadores de descargas y vistas acumulados en Redis"""
+    from apps.trabajos.contadores import volcar_contadores as volcar
+    volcados = volcar()
+    if any(volcados.values()):
+        print(f"Contadores volcados: {volcados}")
+    return volcados
+
+
+@app.task
+def procesar_eventos_actividad():
+    """Insertar por lotes los eventos de auditoría (vistas y descargas) encolados en Redis"""
+    from apps.trabajos.eventos import procesar_eventos
+    total = procesar_eventos()
+    if total:
+        print(f"Eventos de actividad guardados: {total}")
+    return total
+
+
+@app.task
+def mantener_particiones_log():
+    """Crear las particiones mensuales próximas del log y borrar las que superan la retención"""
+    from apps.trabajos.actividad import crear_particiones_log, eliminar_particiones_log
+    return {
+        'creadas': crear_particiones_log(),
+        'eliminadas': eliminar_particiones_log(),
+    }
+
+
+
+@app.task
+def limpiar_subidas_reanudables():
+    """Descartar las subidas reanudables abandonadas y lo que recibieron del almacenamiento"""
+    from apps.trabajos.subidas import limpiar_subidas_abandonadas
+    total = limpiar_subidas_abandonadas()
+    if total:
+        print(f"Subidas reanudables descartadas: {total}")
+    return total
+
+
+@app.task
+def recalcular_calificaciones():
+    """Recalcular desde los comentarios los promedios que se mantienen con incrementos"""
+    from apps.comentarios.calificaciones import recalcular_calificaciones as recalcular
+    corregidos = recalcular()
+    if corregidos:
+        print(f"Promedios de calificación corregidos: {corregidos}")
+    return corregidos
+
+
+@app.task
+def refrescar_busqueda(consulta, carrera):
+    """Recalcular una búsqueda cacheada que superó su TTL suave (se sigue sirviendo mientras tanto)"""
+    from apps.trabajos.busqueda import refrescar_busqueda as refrescar
+    refrescar(consulta, carrera)
+
+
 # Tareas periódicas (celery beat)
 app.conf.beat_schedule = {
     'generar-estadisticas-semanales': {
@@ -211,6 +306,30 @@ app.conf.beat_schedule = {
         'task': 'universidad_repositorio.celery.verificar_salud_sistema',
         'schedule': 60 * 60,  # Cada hora
     },
+    'sincronizar-trabajos-similares': {
+        'task': 'universidad_repositorio.celery.sincronizar_trabajos_similares',
+        'schedule': 24 * 60 * 60,  # Cada noche
+    },
+    'volcar-contadores': {
+        'task': 'universidad_repositorio.celery.volcar_contadores',
+        'schedule': 30,  # Cada 30 segundos
+    },
+    'procesar-eventos-actividad': {
+        'task': 'universidad_repositorio.celery.procesar_eventos_actividad',
+        'schedule': 10,  # Cada 10 segundos
+    },
+    'mantener-particiones-log': {
+        'task': 'universidad_repositorio.celery.mantener_particiones_log',
+        'schedule': 24 * 60 * 60,  # Cada 24 horas
+    },
+    'limpiar-subidas-reanudables': {
+        'task': 'universidad_repositorio.celery.limpiar_subidas_reanudables',
+        'schedule': 60 * 60,  # Cada hora
+    },
+    'recalcular-calificaciones': {
+        'task': 'universidad_repositorio.celery.recalcular_calificaciones',
+        'schedule': 24 * 60 * 60,  # Cada noche
+    },
     'actualizar-embeddings': {
         'task': 'universidad_repositorio.celery.actualizar_embeddings_todos_trabajos',
         'schedule': 24 * 7 * 60 * 60,  # Cada semana
@@ -23,6 +23,7 @@ DJANGO_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -92,13 +93,12 @@ DATABASES = {
 }
 
 # Cache Configuration
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/1')
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/1'),
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        }
+        'LOCATION': REDIS_URL,
     }
 }
 
@@ -135,7 +135,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.trabajos.pagination.PaginacionClasica',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -181,21 +181,77 @@ STATICFILES_DIRS = [
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Esta línea asegura que se guarden en tu carpeta /media/
-DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Almacenamiento de archivos: 'local' (FileSystemStorage en MEDIA_ROOT, volumen
+# compartido con Celery, nginx y la IA) o 's3' (AWS S3 o compatible, p. ej. MinIO)
+ALMACENAMIENTO = config('ALMACENAMIENTO', default='local')
+if ALMACENAMIENTO == 's3':
+    DEFAULT_FILE_STORAGE = 'apps.trabajos.almacenamiento.AlmacenamientoS3'
+else:
+    # Esta línea asegura que se guarden en tu carpeta /media/
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# File Storage Configuration
-# DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
-# AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default='')
-# AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default='')
-# AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='universidad-repositorio-files')
-# AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
-# AWS_DEFAULT_ACL = None
-# AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
+# Los mismos handlers de Django, pero calculando la huella (MD5/SHA-256) de
+# cada archivo mientras se recibe, para no volver a leerlo (ver trabajos/archivos.py)
+FILE_UPLOAD_HANDLERS = [
+    'apps.trabajos.archivos.HuellaMemoryFileUploadHandler',
+    'apps.trabajos.archivos.HuellaTemporaryFileUploadHandler',
+]
+
+# 'nginx': la descarga se delega con X-Accel-Redirect a la ubicación interna
+# DESCARGAS_NGINX_PREFIJO (alias de MEDIA_ROOT); 'django': se sirve con FileResponse
+DESCARGAS_MODO = config('DESCARGAS_MODO', default='django')
+DESCARGAS_NGINX_PREFIJO = config('DESCARGAS_NGINX_PREFIJO', default='/protected-media/')
+
+# File Storage Configuration (ALMACENAMIENTO='s3'). Con S3 las descargas
+# redirigen a una URL firmada y las subidas pueden ir directas al bucket con
+# un POST firmado, así que los PDFs no pasan por Django.
+AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default='')
+AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default='')
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='universidad-repositorio-files')
+AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
+# Servicios compatibles (MinIO): endpoint interno y, si el navegador no lo
+# alcanza, el endpoint público con el que se firman las URLs
+AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default='') or None
+AWS_S3_ENDPOINT_PUBLICO = config('AWS_S3_ENDPOINT_PUBLICO', default='') or None
+AWS_S3_ADDRESSING_STYLE = config('AWS_S3_ADDRESSING_STYLE', default='') or None
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+AWS_DEFAULT_ACL = None
+AWS_S3_FILE_OVERWRITE = False
+AWS_QUERYSTRING_AUTH = True
+# Vigencia (segundos) de las URLs firmadas de descarga
+AWS_QUERYSTRING_EXPIRE = config('AWS_QUERYSTRING_EXPIRE', default=300, cast=int)
+AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'private, max-age=86400'}
+# Al leer un objeto, django-storages lo copia a un SpooledTemporaryFile: a
+# partir de este tamaño va a disco en lugar de quedarse en memoria
+AWS_S3_MAX_MEMORY_SIZE = 8 * 1024 * 1024
+
+# Subidas directas al bucket: vigencia del POST firmado y tamaño máximo
+# (el mismo límite que client_max_body_size en nginx)
+SUBIDA_DIRECTA_EXPIRA = config('SUBIDA_DIRECTA_EXPIRA', default=900, cast=int)
+SUBIDA_TAMANO_MAXIMO = config('SUBIDA_TAMANO_MAXIMO', default=50 * 1024 * 1024, cast=int)
+
+# Subidas reanudables por fragmentos: tamaño de cada fragmento (mínimo 5 MiB
+# con S3, son partes de una subida multiparte), límite del archivo completo y
+# segundos sin actividad tras los que se descarta una subida a medias
+SUBIDA_FRAGMENTO_TAMANO = config('SUBIDA_FRAGMENTO_TAMANO', default=8 * 1024 * 1024, cast=int)
+SUBIDA_REANUDABLE_TAMANO_MAXIMO = config('SUBIDA_REANUDABLE_TAMANO_MAXIMO', default=500 * 1024 * 1024, cast=int)
+SUBIDA_REANUDABLE_EXPIRA = config('SUBIDA_REANUDABLE_EXPIRA', default=24 * 60 * 60, cast=int)
+
+# Segundos tras los que una búsqueda cacheada se recalcula en segundo plano
+# (se sigue sirviendo mientras tanto; el límite duro es el TTL del espacio)
+BUSQUEDA_TTL_SUAVE = config('BUSQUEDA_TTL_SUAVE', default=5 * 60, cast=int)
+
+# Antigüedad (segundos sin modificar) a partir de la cual la limpieza diaria
+# borra los archivos temporales universidad_repositorio_* del sistema
+ARCHIVOS_TEMPORALES_EXPIRA = config('ARCHIVOS_TEMPORALES_EXPIRA', default=24 * 60 * 60, cast=int)
+
+# Segundos que nginx o el navegador pueden reutilizar sin revalidar el
+# catálogo y las carreras pedidos sin autenticación (Cache-Control max-age)
+RESPUESTAS_API_MAX_AGE = config('RESPUESTAS_API_MAX_AGE', default=60, cast=int)
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
@@ -227,6 +283,10 @@ CSRF_COOKIE_DOMAIN = None # Esto le permite usar el dominio del host de la petic
 AI_SERVICE_URL = config('AI_SERVICE_URL', default='http://localhost:8000')
 AI_SERVICE_TOKEN = config('AI_SERVICE_TOKEN', default='your-ai-service-token')
 
+# Meses de log_actividades que se conservan (particiones mensuales; los conteos
+# diarios quedan en resumen_actividad_diaria)
+LOG_ACTIVIDADES_RETENCION_MESES = config('LOG_ACTIVIDADES_RETENCION_MESES', default=24, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
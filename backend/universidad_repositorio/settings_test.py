@@ -0,0 +1,53 @@
+# backend/universidad_repositorio/settings_test.py
+# Configuración para las pruebas. Por defecto no necesita PostgreSQL ni Redis:
+#
+#   python manage.py test apps.trabajos.tests --settings=universidad_repositorio.settings_test
+#
+# (las apps no tienen __init__.py, así que el descubrimiento necesita el módulo)
+#
+# Con TEST_DATABASE=postgresql se usa la base de datos de DB_* (Django crea y
+# borra test_<DB_NAME>), que necesita las extensiones pg_trgm y unaccent.
+# Así se ejecutan también las pruebas de los caminos exclusivos de PostgreSQL
+# (texto completo, conteo estimado); en SQLite se omiten y las demás usan los
+# fallbacks portables. El cliente Redis de contadores y eventos se sustituye
+# en las pruebas.
+from decouple import config
+
+from .settings import *
+
+DEBUG = False
+
+if config('TEST_DATABASE', default='sqlite') != 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Las tareas no salen a un broker: .delay() se ejecuta en el proceso
+CELERY_TASK_ALWAYS_EAGER = True
+
+# Sin escribir en logs/django.log
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'level': 'WARNING',
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+}
@@ -10,7 +10,7 @@ from .health_views import health_check
 
 # Importar viewsets
 from apps.usuarios.views import UsuarioRegistroView, UsuarioLoginView, UsuarioViewSet
-from apps.trabajos.views import TrabajoInvestigacionViewSet, ConfiguracionCarreraViewSet
+from apps.trabajos.views import TrabajoInvestigacionViewSet, ConfiguracionCarreraViewSet, LogActividadesViewSet
 from apps.trabajos.views import aplicar_ia_callback
 from apps.comentarios.views import ComentarioViewSet, RetroalimentacionIAViewSet
 
@@ -21,7 +21,8 @@ router = DefaultRouter()
 router.register(r'usuarios', UsuarioViewSet, basename='usuarios')
 router.register(r'trabajos', TrabajoInvestigacionViewSet, basename='trabajos')
 router.register(r'carreras', ConfiguracionCarreraViewSet, basename='carreras')
-router.register(r'comentarios', ComentarioViewSet, basename='comentarios')
+router.register(r'logs', LogActividadesViewSet, basename='logs')
+router.register(r'trabajos/(?P<trabajo_pk>\d+)/comentarios', ComentarioViewSet, basename='trabajo-comentarios')
 router.register(r'retroalimentacion-ia', RetroalimentacionIAViewSet, basename='retroalimentacion-ia')
 
 urlpatterns = [
@@ -4,6 +4,8 @@ import sys
 import json
 import pickle
 import hashlib
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
@@ -20,6 +22,11 @@ import faiss
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 
+from model_manager import ModelManager
+from inference_backends import requested_backend, build_embedder, build_summarizer
+import vector_compression
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,34 +53,62 @@ class AIService:
     """
     
     def __init__(self):
+        # Serializa las escrituras del almacén vectorial (agregar, reconstruir,
+        # recalcular vecinos y guardar): las ingestas en segundo plano corren
+        # en el threadpool y el id de embedding es la posición en vectors.f32
+        self.index_lock = threading.RLock()
         self.setup_models()
         self.setup_vector_store()
         
     def setup_models(self):
-        """Configurar modelos de IA"""
+        """
+        Registrar modelos de IA. No se cargan hasta su primer uso; el gestor
+        los descarga tras un periodo de inactividad o bajo presión de memoria.
+        AI_SERVICE_MODE=search arranca réplicas de búsqueda solo con el embedder.
+        """
+        self.service_mode = os.environ.get('AI_SERVICE_MODE', 'full').lower()
+        self.embedding_model_name = os.environ.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+        self.summarization_model_name = None
+        self.models = ModelManager.from_env()
+        # Backend de inferencia activo por modelo (pytorch, int8 u onnx) y resultado de su verificación
+        self.inference_backends: Dict[str, Dict[str, Any]] = {}
+        self.backend_min_cosine = float(os.environ.get('AI_BACKEND_MIN_COSINE', '0.99'))
+        
+        pin_embedder = os.environ.get('AI_PIN_EMBEDDER', 'true').lower() in ('1', 'true', 'yes')
+        self.models.register('embedder', self._load_embedding_model, pinned=pin_embedder)
+        
+        if self.service_mode != 'search':
+            self.models.register('summarizer', self._load_summarizer)
+        else:
+            logger.info("Search-only mode: summarization model disabled")
+        
+        preload = [m.strip() for m in os.environ.get('AI_PRELOAD_MODELS', '').split(',') if m.strip()]
+        self.models.preload(*[m for m in preload if self.models.is_registered(m)])
+    
+    def _load_embedding_model(self):
+        # Modelo para embeddings (en español)
+        model, report = build_embedder(
+            self.embedding_model_name,
+            requested_backend('embedder'),
+            self.backend_min_cosine
+        )
+        self.inference_backends['embedder'] = report
+        logger.info(f"Sentence transformer model loaded successfully ({report['active']})")
+        return model
+    
+    def _load_summarizer(self):
+        # Modelo para resumen (BART en español o T5)
+        backend = requested_backend('summarizer')
         try:
-            # Modelo para embeddings (en español)
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("Sentence transformer model loaded successfully")
-            
-            # Modelo para resumen (BART en español o T5)
-            try:
-                self.summarizer = pipeline(
-                    "summarization", 
-                    model="facebook/mbart-large-50-many-to-many-mmt"
-                )
-            except:
-                # Fallback a modelo en inglés
-                self.summarizer = pipeline(
-                    "summarization",
-                    model="facebook/bart-large-cnn"
-                )
-            logger.info("Summarization model loaded successfully")
-            
-        except Exception as e:
-            logger.error(f"Error loading AI models: {e}")
-            self.embedding_model = None
-            self.summarizer = None
+            summarizer, report = build_summarizer("facebook/mbart-large-50-many-to-many-mmt", backend)
+            self.summarization_model_name = "facebook/mbart-large-50-many-to-many-mmt"
+        except Exception:
+            # Fallback a modelo en inglés
+            summarizer, report = build_summarizer("facebook/bart-large-cnn", backend)
+            self.summarization_model_name = "facebook/bart-large-cnn"
+        self.inference_backends['summarizer'] = report
+        logger.info(f"Summarization model loaded successfully ({report['active']})")
+        return summarizer
     
     def setup_vector_store(self):
         """Configurar almacenamiento vectorial"""
@@ -82,53 +117,213 @@ class AIService:
             self.vector_store_dir = Path("vector_store")
             self.vector_store_dir.mkdir(exist_ok=True)
             
+            # Modo de almacenamiento: flat, fp16, pca, ivfpq o binary
+            self.compression = vector_compression.compression_settings()
+            self.compression_report: Dict[str, Any] = {}
+            self.embedding_dimension = 384  # Dimensión del modelo all-MiniLM-L6-v2
+            self.compression['dimension'] = self.embedding_dimension
+            self._raw_vectors_cache = None
+            # Tamaño del índice con el que se vuelve a intentar el modo pedido (None: ya activo)
+            self.next_rebuild_at: Optional[int] = None
+            
+            # Vecinos más cercanos precalculados por trabajo
+            self.neighbors_k = int(os.environ.get('AI_NEIGHBORS_K', '10'))
+            self.neighbors: Dict[str, List[List[Any]]] = {}
+            
             # Cargar índices existentes
             self.load_vector_indexes()
             
         except Exception as e:
             logger.error(f"Error setting up vector store: {e}")
     
+    @property
+    def raw_vectors_path(self) -> Path:
+        # Vectores normalizados en fp32, solo anexados; fuente para reconstruir
+        # índices comprimidos y para el reordenamiento exacto del modo binary
+        return self.vector_store_dir / "vectors.f32"
+    
+    def raw_vectors(self) -> np.ndarray:
+        """Vectores originales mapeados desde disco (no residen en memoria)"""
+        path = self.raw_vectors_path
+        if not path.exists() or path.stat().st_size == 0:
+            return np.zeros((0, self.embedding_dimension), dtype=np.float32)
+        
+        rows = path.stat().st_size // (4 * self.embedding_dimension)
+        if self._raw_vectors_cache is None or len(self._raw_vectors_cache) != rows:
+            self._raw_vectors_cache = np.memmap(
+                path, dtype=np.float32, mode='r', shape=(rows, self.embedding_dimension)
+            )
+        return self._raw_vectors_cache
+    
+    def _rerank_vectors(self, ids: np.ndarray) -> np.ndarray:
+        return self.raw_vectors()[np.sort(ids)][np.argsort(np.argsort(ids))]
+    
+    def _append_raw_vectors(self, vectors: np.ndarray):
+        with open(self.raw_vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    
+    def _trim_raw_vectors(self, rows: int):
+        """
+        Descartar las filas de vectors.f32 posteriores al último índice guardado
+        (una caída entre el anexado y save_vector_indexes), para que la fila i
+        siga siendo el id i de FAISS.
+        """
+        path = self.raw_vectors_path
+        row_bytes = 4 * self.embedding_dimension
+        if not path.exists() or path.stat().st_size <= rows * row_bytes:
+            return
+        logger.warning(f"Discarding {path.stat().st_size // row_bytes - rows} unsaved vectors from {path.name}")
+        self._raw_vectors_cache = None
+        with open(path, 'r+b') as f:
+            f.truncate(rows * row_bytes)
+    
     def load_vector_indexes(self):
         """Cargar índices vectoriales existentes"""
         try:
             # Índice FAISS para búsqueda rápida
+            index_prefix = str(self.vector_store_dir / "faiss_index")
             index_path = self.vector_store_dir / "faiss_index.bin"
+            config_path = self.vector_store_dir / "index_config.json"
             metadata_path = self.vector_store_dir / "metadata.json"
             
-            if index_path.exists():
-                self.faiss_index = faiss.read_index(str(index_path))
-                logger.info(f"FAISS index loaded with {self.faiss_index.ntotal} vectors")
-            else:
-                # Crear nuevo índice FAISS
-                dimension = 384  # Dimensión del modelo all-MiniLM-L6-v2
-                self.faiss_index = faiss.IndexFlatIP(dimension)  # Inner Product for cosine similarity
-                logger.info("New FAISS index created")
-            
             # Cargar metadatos
             if metadata_path.exists():
                 with open(metadata_path, 'r', encoding='utf-8') as f:
                     self.index_metadata = json.load(f)
             else:
                 self.index_metadata = {}
+            
+            # trabajo_id -> embedding_id más reciente
+            self.trabajo_embeddings = {
+                str(entry['trabajo_id']): int(entry['embedding_id'])
+                for _, entry in sorted(self.index_metadata.items(), key=lambda item: int(item[0]))
+            }
+            self.load_lexical_index()
+            
+            neighbors_path = self.vector_store_dir / "neighbors.json"
+            if neighbors_path.exists():
+                with open(neighbors_path, 'r', encoding='utf-8') as f:
+                    self.neighbors = json.load(f)
+            
+            stored_config = {}
+            if config_path.exists():
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    stored_config = json.load(f)
+            
+            # Índices previos (solo flat) no tenían copia de los vectores originales
+            if index_path.exists() and not self.raw_vectors_path.exists() and not stored_config:
+                legacy = faiss.read_index(str(index_path))
+                if legacy.ntotal:
+                    self._append_raw_vectors(legacy.reconstruct_n(0, legacy.ntotal))
+                stored_config = {'mode': vector_compression.MODE_FLAT, 'requested_mode': vector_compression.MODE_FLAT}
+            
+            requested = self.compression['mode']
+            if stored_config.get('requested_mode') == requested:
+                self.faiss_index = vector_compression.read_index(
+                    stored_config['mode'], index_prefix, self.compression, self._rerank_vectors
+                )
+                self.active_storage_mode = stored_config['mode']
+                self.compression_report = stored_config.get('report', {})
+                self._trim_raw_vectors(self.faiss_index.ntotal)
+                self._schedule_rebuild(after_attempt=False)
+                logger.info(f"FAISS index loaded with {self.faiss_index.ntotal} vectors ({self.active_storage_mode})")
+            else:
+                # Índice nuevo o cambio de modo: construir desde los vectores originales
+                self.rebuild_vector_index()
                 
         except Exception as e:
             logger.error(f"Error loading vector indexes: {e}")
             self.faiss_index = None
             self.index_metadata = {}
+            self.trabajo_embeddings = {}
+            if not hasattr(self, 'lexical_index'):
+                self.lexical_index = BM25Index()
+    
+    @property
+    def lexical_index_path(self) -> Path:
+        return self.vector_store_dir / "lexical_index.pkl"
+    
+    def load_lexical_index(self):
+        """Cargar el índice BM25 persistido junto al índice FAISS"""
+        try:
+            if self.lexical_index_path.exists():
+                self.lexical_index = BM25Index.load(self.lexical_index_path)
+                logger.info(f"Lexical index loaded with {len(self.lexical_index)} documents")
+                return
+        except Exception as e:
+            logger.error(f"Error loading lexical index, rebuilding from metadata: {e}")
+        
+        # Sin índice persistido: reconstruir con los metadatos (sin el texto extraído)
+        self.lexical_index = BM25Index()
+        for trabajo_id, embedding_id in self.trabajo_embeddings.items():
+            metadata = self.index_metadata[str(embedding_id)]['metadata']
+            self.lexical_index.add_document(trabajo_id, metadata, metadata)
+    
+    def rebuild_vector_index(self) -> Dict[str, Any]:
+        """
+        Reconstruir el índice con el modo de compresión configurado a partir de
+        los vectores originales y calcular memoria por vector y recall@10.
+        """
+        with self.index_lock:
+            vectors = np.asarray(self.raw_vectors())
+            requested = self.compression['mode']
+            index, mode, reason = vector_compression.build_index(
+                requested, vectors, self.compression, self._rerank_vectors
+            )
+            self.faiss_index = index
+            self.active_storage_mode = mode
+            self.compression_report = vector_compression.build_report(index, mode, requested, vectors, reason)
+            logger.info(f"Vector index built: {self.compression_report}")
+            self._schedule_rebuild(after_attempt=True)
+            self.save_vector_indexes()
+            return self.compression_report
+    
+    def _schedule_rebuild(self, after_attempt: bool):
+        """
+        Si el índice activo es un fallback del modo pedido, fijar a partir de
+        cuántos vectores se reintenta: el mínimo de entrenamiento del modo y,
+        si ya se intentó con esos vectores y falló, el doble del tamaño actual.
+        """
+        requested = self.compression['mode']
+        if self.active_storage_mode == requested:
+            self.next_rebuild_at = None
+            return
+        threshold = vector_compression.min_train_vectors(requested, self.compression)
+        ntotal = self.faiss_index.ntotal
+        if after_attempt and ntotal >= threshold:
+            threshold = 2 * max(ntotal, 1)
+        self.next_rebuild_at = threshold
+        logger.info(f"{requested} index will be retried at {threshold} vectors")
+    
+    def _write_json(self, name: str, data: Any, **kwargs):
+        # Archivo temporal y rename: un fallo a medio escribir no deja el JSON truncado
+        path = self.vector_store_dir / name
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **kwargs)
+        tmp_path.replace(path)
     
     def save_vector_indexes(self):
         """Guardar índices vectoriales"""
-        try:
-            if self.faiss_index is not None:
-                faiss.write_index(self.faiss_index, str(self.vector_store_dir / "faiss_index.bin"))
-                
-                with open(self.vector_store_dir / "metadata.json", 'w', encoding='utf-8') as f:
-                    json.dump(self.index_metadata, f, ensure_ascii=False, indent=2)
+        with self.index_lock:
+            try:
+                if self.faiss_index is not None:
+                    vector_compression.write_index(self.faiss_index, str(self.vector_store_dir / "faiss_index"))
+                    
+                    self._write_json("index_config.json", {
+                        'mode': self.active_storage_mode,
+                        'requested_mode': self.compression['mode'],
+                        'report': self.compression_report
+                    }, ensure_ascii=False, indent=2)
+                    self._write_json("metadata.json", self.index_metadata, ensure_ascii=False, indent=2)
+                    self._write_json("neighbors.json", self.neighbors)
                     
-                logger.info("Vector indexes saved successfully")
+                    logger.info("Vector indexes saved successfully")
                 
-        except Exception as e:
-            logger.error(f"Error saving vector indexes: {e}")
+                self.lexical_index.save(self.lexical_index_path)
+                    
+            except Exception as e:
+                logger.error(f"Error saving vector indexes: {e}")
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
@@ -269,13 +464,14 @@ class AIService:
                 info['tipo_trabajo'] = 'practicas_profesionales'
             
             # Generar resumen usando IA
-            if self.summarizer:
+            # Tomar primeros 1000 caracteres para el resumen
+            summary_input = text[:1000]
+            if len(summary_input) > 100 and self.models.is_available('summarizer'):
                 try:
-                    # Tomar primeros 1000 caracteres para el resumen
-                    summary_input = text[:1000]
-                    if len(summary_input) > 100:
-                        summary = self.summarizer(summary_input, max_length=150, min_length=50, do_sample=False)
-                        info['resumen'] = summary[0]['summary_text']
+                    with self.models.use('summarizer') as summarizer:
+                        if summarizer is not None:
+                            summary = summarizer(summary_input, max_length=150, min_length=50, do_sample=False)
+                            info['resumen'] = summary[0]['summary_text']
                 except Exception as e:
                     logger.warning(f"Error generating summary: {e}")
             
@@ -290,7 +486,7 @@ class AIService:
         """
         Generar embedding del texto
         """
-        if not self.embedding_model or not text:
+        if not self.models.is_available('embedder') or not text:
             return None
         
         try:
@@ -301,7 +497,10 @@ class AIService:
                 return None
             
             # Generar embedding
-            embedding = self.embedding_model.encode(clean_text, convert_to_numpy=True)
+            with self.models.use('embedder') as embedding_model:
+                if embedding_model is None:
+                    return None
+                embedding = embedding_model.encode(clean_text, convert_to_numpy=True)
             
             return embedding
             
@@ -311,10 +510,14 @@ class AIService:
     
     def add_to_vector_store(self, trabajo_id: str, text: str, metadata: Dict[str, Any]):
         """
-        Agregar trabajo al almacén vectorial
+        Agregar trabajo al almacén vectorial y al índice léxico
         """
         try:
-            # Generar embedding
+            # El índice léxico no depende del embedder
+            with self.index_lock:
+                self.lexical_index.add_document(trabajo_id, {**metadata, 'contenido': text}, metadata)
+            
+            # Generar embedding (fuera del cerrojo: es la parte costosa)
             embedding = self.generate_embedding(text)
             
             if embedding is None:
@@ -323,19 +526,29 @@ class AIService:
             
             # Normalizar embedding para similitud coseno
             embedding = embedding / np.linalg.norm(embedding)
+            embedding_2d = embedding.reshape(1, -1).astype(np.float32)
             
-            # Agregar al índice FAISS
-            embedding_2d = embedding.reshape(1, -1)
-            self.faiss_index.add(embedding_2d)
-            
-            # Guardar metadatos
-            self.index_metadata[str(len(self.index_metadata))] = {
-                'trabajo_id': trabajo_id,
-                'embedding_id': len(self.index_metadata),
-                'metadata': metadata
-            }
-            
-            logger.info(f"Added trabajo {trabajo_id} to vector store")
+            with self.index_lock:
+                # Guardar el vector original y agregarlo al índice FAISS
+                embedding_id = self.faiss_index.ntotal
+                self._append_raw_vectors(embedding_2d)
+                self.faiss_index.add(embedding_2d)
+                
+                # Guardar metadatos
+                self.index_metadata[str(embedding_id)] = {
+                    'trabajo_id': trabajo_id,
+                    'embedding_id': embedding_id,
+                    'metadata': metadata
+                }
+                self.trabajo_embeddings[str(trabajo_id)] = embedding_id
+                self.update_neighbors(str(trabajo_id))
+                
+                logger.info(f"Added trabajo {trabajo_id} to vector store")
+                
+                # Los modos que requieren entrenamiento se construyen cuando hay
+                # vectores suficientes; tras un fallback se espera a next_rebuild_at
+                if self.next_rebuild_at is not None and self.faiss_index.ntotal >= self.next_rebuild_at:
+                    self.rebuild_vector_index()
             return True
             
         except Exception as e:
@@ -344,60 +557,109 @@ class AIService:
     
     def semantic_search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
         """
-        Búsqueda semántica usando embeddings
+        Búsqueda híbrida: coincidencias exactas por postings, y si no las hay,
+        fusión (Reciprocal Rank Fusion) del ranking BM25 con el ranking denso
         """
         try:
-            if not self.embedding_model or self.faiss_index is None:
+            # Título, autor, tutor o código exacto: se resuelve sin búsqueda densa
+            exact_ids = self.lexical_index.exact_match(query)
+            if exact_ids:
+                return [
+                    self._build_search_result(
+                        trabajo_id, query, lexical_score=1.0, fusion_score=1.0,
+                        reason="Coincidencia exacta con título, autor o tutor"
+                    )
+                    for trabajo_id in exact_ids[:top_k]
+                ]
+            
+            if not self.models.is_available('embedder') or self.faiss_index is None:
                 logger.warning("Vector search not available, using text search")
                 return self.text_search_fallback(query, top_k)
             
-            # Generar embedding de la consulta
-            query_embedding = self.generate_embedding(query)
+            depth = max(top_k * 2, 20)
+            dense = self._dense_search(query, depth)
+            lexical = self.lexical_index.search(query, depth)
             
-            if query_embedding is None:
-                return []
-            
-            # Normalizar embedding
-            query_embedding = query_embedding / np.linalg.norm(query_embedding)
-            query_embedding_2d = query_embedding.reshape(1, -1)
-            
-            # Realizar búsqueda en el índice FAISS
-            similarities, indices = self.faiss_index.search(query_embedding_2d, min(top_k, self.faiss_index.ntotal))
-            
-            # Preparar resultados
-            results = []
-            for similarity, idx in zip(similarities[0], indices[0]):
-                if idx < len(self.index_metadata):
-                    # Buscar metadatos por embedding_id
-                    metadata = None
-                    for key, value in self.index_metadata.items():
-                        if value.get('embedding_id') == idx:
-                            metadata = value
-                            break
-                    
-                    if metadata:
-                        results.append({
-                            'trabajo_id': metadata['trabajo_id'],
-                            'metadata': metadata['metadata'],
-                            'similarity_score': float(similarity),
-                            'reason': self._generate_search_reason(query, metadata['metadata'])
-                        })
+            dense_scores = dict(dense)
+            lexical_scores = dict(lexical)
+            fused = reciprocal_rank_fusion([[t for t, _ in dense], [t for t, _ in lexical]])
             
-            return results
+            return [
+                self._build_search_result(
+                    trabajo_id, query,
+                    similarity_score=dense_scores.get(trabajo_id, 0.0),
+                    lexical_score=lexical_scores.get(trabajo_id),
+                    fusion_score=score
+                )
+                for trabajo_id, score in fused[:top_k]
+            ]
             
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
             return self.text_search_fallback(query, top_k)
     
+    def _dense_search(self, query: str, top_k: int) -> List[Any]:
+        """Ranking denso (trabajo_id, similitud) sin duplicados por trabajo"""
+        # Generar embedding de la consulta
+        query_embedding = self.generate_embedding(query)
+        
+        if query_embedding is None or self.faiss_index.ntotal == 0:
+            return []
+        
+        # Normalizar embedding
+        query_embedding = query_embedding / np.linalg.norm(query_embedding)
+        query_embedding_2d = query_embedding.reshape(1, -1).astype(np.float32)
+        
+        # Realizar búsqueda en el índice FAISS
+        similarities, indices = self.faiss_index.search(query_embedding_2d, min(top_k, self.faiss_index.ntotal))
+        return self._rank_hits(similarities[0], indices[0])
+    
+    def _rank_hits(self, similarities, indices, exclude: Optional[str] = None) -> List[Any]:
+        """Convertir resultados de FAISS en (trabajo_id, similitud) sin duplicados"""
+        ranking = []
+        seen = {exclude} if exclude is not None else set()
+        for similarity, idx in zip(similarities, indices):
+            # Los metadatos están indexados por embedding_id
+            entry = self.index_metadata.get(str(idx)) if idx >= 0 else None
+            if entry is None:
+                continue
+            trabajo_id = str(entry['trabajo_id'])
+            # Ignorar vectores antiguos de trabajos reprocesados
+            if trabajo_id in seen or self.trabajo_embeddings.get(trabajo_id) != int(idx):
+                continue
+            seen.add(trabajo_id)
+            ranking.append((trabajo_id, float(similarity)))
+        return ranking
+    
+    def _trabajo_metadata(self, trabajo_id: str) -> Dict[str, Any]:
+        embedding_id = self.trabajo_embeddings.get(str(trabajo_id))
+        if embedding_id is not None:
+            return self.index_metadata[str(embedding_id)]['metadata']
+        return self.lexical_index.documents.get(str(trabajo_id), {})
+    
+    def _build_search_result(self, trabajo_id: str, query: str, similarity_score: float = 0.0,
+                             lexical_score: Optional[float] = None, fusion_score: Optional[float] = None,
+                             reason: Optional[str] = None) -> Dict[str, Any]:
+        metadata = self._trabajo_metadata(trabajo_id)
+        return {
+            'trabajo_id': trabajo_id,
+            'metadata': metadata,
+            'similarity_score': similarity_score,
+            'lexical_score': lexical_score,
+            'fusion_score': fusion_score,
+            'reason': reason or self._generate_search_reason(query, metadata)
+        }
+    
     def text_search_fallback(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
         """
-        Búsqueda por texto como fallback
+        Búsqueda por texto como fallback (BM25 sobre el índice invertido)
         """
         try:
-            # Aquí se integraría con la base de datos Django
-            # Por ahora, retornar resultado vacío
             logger.info("Using text search fallback")
-            return []
+            return [
+                self._build_search_result(trabajo_id, query, lexical_score=score, fusion_score=score)
+                for trabajo_id, score in self.lexical_index.search(query, top_k)
+            ]
             
         except Exception as e:
             logger.error(f"Error in text search fallback: {e}")
@@ -431,27 +693,113 @@ class AIService:
             logger.error(f"Error generating search reason: {e}")
             return "Relevancia determinada por IA"
     
+    def document_vector(self, trabajo_id: str) -> Optional[np.ndarray]:
+        """Vector almacenado de un trabajo (sin volver a generar el embedding)"""
+        embedding_id = self.trabajo_embeddings.get(str(trabajo_id))
+        if embedding_id is None:
+            return None
+        vectors = self.raw_vectors()
+        if embedding_id >= len(vectors):
+            return None
+        return np.asarray(vectors[embedding_id], dtype=np.float32)
+    
+    def _search_neighbors(self, trabajo_ids: List[str], k: int) -> Dict[str, List[List[Any]]]:
+        """Top-k vecinos de varios trabajos en una sola búsqueda por lotes"""
+        embedding_ids = [self.trabajo_embeddings[t] for t in trabajo_ids]
+        vectors = np.asarray(self.raw_vectors()[np.asarray(embedding_ids)], dtype=np.float32)
+        # Margen para descartar el propio trabajo y vectores antiguos
+        depth = min(k + 1 + (self.faiss_index.ntotal - len(self.trabajo_embeddings)), self.faiss_index.ntotal)
+        similarities, indices = self.faiss_index.search(vectors, depth)
+        return {
+            trabajo_id: [
+                [similar_id, round(score, 6)]
+                for similar_id, score in self._rank_hits(sims, idxs, exclude=trabajo_id)[:k]
+            ]
+            for trabajo_id, sims, idxs in zip(trabajo_ids, similarities, indices)
+        }
+    
+    def update_neighbors(self, trabajo_id: str):
+        """
+        Actualización incremental tras agregar un trabajo: se calculan sus
+        vecinos y se inserta en las listas de esos vecinos si supera al último.
+        """
+        if self.faiss_index is None or trabajo_id not in self.trabajo_embeddings:
+            return
+        if trabajo_id in self.neighbors:
+            # Trabajo reprocesado: sus puntuaciones anteriores ya no son válidas
+            for similar_id, ranking in self.neighbors.items():
+                self.neighbors[similar_id] = [n for n in ranking if n[0] != trabajo_id]
+        
+        own = self._search_neighbors([trabajo_id], self.neighbors_k)[trabajo_id]
+        self.neighbors[trabajo_id] = own
+        
+        for similar_id, score in own:
+            current = [n for n in self.neighbors.get(similar_id, []) if n[0] != trabajo_id]
+            if len(current) < self.neighbors_k or score > current[-1][1]:
+                current.append([trabajo_id, score])
+                current.sort(key=lambda n: n[1], reverse=True)
+            self.neighbors[similar_id] = current[:self.neighbors_k]
+    
+    def recompute_neighbors(self, batch_size: int = 256) -> Dict[str, Any]:
+        """
+        Recalcular los vecinos de todos los trabajos (tarea nocturna). Bajo el
+        cerrojo del índice: las ingestas concurrentes esperan y no se pierden
+        los vecinos que agregarían mientras tanto.
+        """
+        started = time.monotonic()
+        with self.index_lock:
+            neighbors = {}
+            if self.faiss_index is not None and self.faiss_index.ntotal:
+                trabajo_ids = list(self.trabajo_embeddings)
+                for start in range(0, len(trabajo_ids), batch_size):
+                    neighbors.update(self._search_neighbors(trabajo_ids[start:start + batch_size], self.neighbors_k))
+            self.neighbors = neighbors
+            self.save_vector_indexes()
+        return {
+            'trabajos': len(neighbors),
+            'neighbors_k': self.neighbors_k,
+            'duration_s': round(time.monotonic() - started, 3)
+        }
+    
+    def get_neighbors(self, trabajo_ids: Optional[List[str]] = None) -> Dict[str, List[List[Any]]]:
+        if trabajo_ids is None:
+            return self.neighbors
+        return {str(t): self.neighbors.get(str(t), []) for t in trabajo_ids}
+    
     def find_similar_trabajos(self, trabajo_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
-        Encontrar trabajos similares a uno existente
+        Encontrar trabajos similares a uno existente. Usa la lista precalculada
+        y solo busca en el índice si no existe o es más corta que top_k.
         """
         try:
-            if not self.embedding_model or self.faiss_index is None:
-                logger.warning("Vector search not available")
+            trabajo_id = str(trabajo_id)
+            if self.faiss_index is None or trabajo_id not in self.trabajo_embeddings:
+                logger.warning(f"No stored vector for trabajo {trabajo_id}")
                 return []
             
-            # Obtener embedding del trabajo (esto requeriría acceso a la base de datos)
-            # Por simplicidad, retornamos resultado vacío
-            logger.info(f"Finding similar trabajos to {trabajo_id}")
-            return []
+            ranking = self.neighbors.get(trabajo_id)
+            if ranking is None or len(ranking) < min(top_k, len(self.trabajo_embeddings) - 1):
+                ranking = self._search_neighbors([trabajo_id], top_k)[trabajo_id]
+            
+            return [
+                {
+                    'trabajo_id': similar_id,
+                    'metadata': self._trabajo_metadata(similar_id),
+                    'similarity_score': score,
+                    'reason': 'Contenido similar según el índice vectorial'
+                }
+                for similar_id, score in ranking[:top_k]
+            ]
             
         except Exception as e:
             logger.error(f"Error finding similar trabajos: {e}")
             return []
     
-    def process_pdf_and_extract(self, pdf_path: str, trabajo_id: str) -> Dict[str, Any]:
+    def process_pdf_and_extract(self, pdf_path: str, trabajo_id: str,
+                                known_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Procesar PDF y extraer toda la información
+        Procesar PDF y extraer toda la información. Los metadatos conocidos por
+        el backend (título, autores, tutores) tienen prioridad sobre los extraídos.
         """
         try:
             logger.info(f"Processing PDF: {pdf_path} for trabajo {trabajo_id}")
@@ -467,6 +815,9 @@ class AIService:
             
             # Extraer información estructurada
             structured_info = self.extract_structured_info(text, pdf_path)
+            for field, value in (known_metadata or {}).items():
+                if value:
+                    structured_info[field] = value
             
             # Agregar al vector store
             self.add_to_vector_store(trabajo_id, text, structured_info)
@@ -480,7 +831,8 @@ class AIService:
                 'file_hash': file_hash,
                 'content_length': len(text),
                 'structured_info': structured_info,
-                'embedding_generated': True
+                'embedding_generated': True,
+                'similares': self.neighbors.get(str(trabajo_id), [])
             }
             
             logger.info(f"Successfully processed PDF for trabajo {trabajo_id}")
@@ -513,12 +865,33 @@ class AIService:
         """
         Obtener información sobre los modelos cargados
         """
+        manager_info = self.models.get_info()
+        summarizer_name = None
+        if self.models.is_available('summarizer'):
+            summarizer_name = self.summarization_model_name or 'facebook/mbart-large-50-many-to-many-mmt'
+        
         return {
-            'embedding_model': 'all-MiniLM-L6-v2' if self.embedding_model else None,
-            'summarization_model': 'facebook/mbart-large-50-many-to-many-mmt' if self.summarizer else None,
+            'embedding_model': self.embedding_model_name if self.models.is_available('embedder') else None,
+            'summarization_model': summarizer_name,
             'spacy_model': 'es_core_news_sm' if nlp else None,
             'faiss_index_size': self.faiss_index.ntotal if self.faiss_index else 0,
-            'total_metadata_entries': len(self.index_metadata)
+            'total_metadata_entries': len(self.index_metadata),
+            'lexical_index_documents': len(self.lexical_index),
+            'neighbors_k': self.neighbors_k,
+            'neighbors_entries': len(self.neighbors),
+            'vector_storage': self.compression_report,
+            'service_mode': self.service_mode,
+            'models': manager_info['models'],
+            'resident_memory_mb': manager_info['resident_memory_mb'],
+            'memory_budget_mb': manager_info['memory_budget_mb'],
+            'idle_timeout_s': manager_info['idle_timeout_s'],
+            'model_errors': manager_info['errors'],
+            'model_events': manager_info['events'],
+            'inference_backend': {
+                name: (self.inference_backends[name]['active'] if name in self.inference_backends else None)
+                for name in manager_info['models']
+            },
+            'inference_backend_checks': self.inference_backends
         }
 
 # Función para crear instancia global del servicio
@@ -0,0 +1,281 @@
+# services/ai_service/inference_backends.py
+import os
+import json
+import shutil
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_PYTORCH = 'pytorch'
+BACKEND_INT8 = 'int8'
+BACKEND_ONNX = 'onnx'
+SUPPORTED_BACKENDS = (BACKEND_PYTORCH, BACKEND_INT8, BACKEND_ONNX)
+
+# Frases de control para comparar el backend optimizado contra fp32
+PROBE_SENTENCES = [
+    "Diseño de un sistema de gestión de inventario para una empresa naval",
+    "Evaluación del proceso de refinación en una planta petroquímica",
+    "Atención de enfermería a pacientes con diabetes tipo 2",
+    "Plan de desarrollo turístico sostenible para comunidades costeras",
+    "Impacto de las cooperativas en la economía social venezolana",
+    "Aplicación web para el control de asistencia de estudiantes universitarios",
+    "Análisis estructural del casco de un buque patrullero",
+    "Propuesta de mantenimiento preventivo para compresores industriales",
+]
+
+
+def requested_backend(model_role: str = 'embedder') -> str:
+    """
+    Backend configurado para un modelo. AI_INFERENCE_BACKEND aplica a todos y
+    AI_SUMMARIZER_BACKEND / AI_EMBEDDER_BACKEND lo sobreescriben por modelo.
+    """
+    override = os.environ.get(f'AI_{model_role.upper()}_BACKEND')
+    backend = (override or os.environ.get('AI_INFERENCE_BACKEND', BACKEND_PYTORCH)).lower()
+    if backend not in SUPPORTED_BACKENDS:
+        logger.warning(f"Unknown inference backend '{backend}', using {BACKEND_PYTORCH}")
+        return BACKEND_PYTORCH
+    return backend
+
+
+def _hub_id(model_name: str) -> str:
+    return model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+
+
+def export_dir(model_name: str, backend: str) -> Path:
+    """
+    Directorio persistente (volumen ai_models) de la exportación de un modelo
+    para un backend, junto con el resultado de su verificación de equivalencia
+    """
+    root = Path(os.environ.get('AI_EXPORT_DIR', 'models/exports'))
+    return root / f"{model_name.replace('/', '--')}-{backend}"
+
+
+def load_onnx_model(ort_class, hub_id: str, path: Path) -> Tuple[Any, Any, bool]:
+    """
+    Modelo ONNX y tokenizer desde `path`; si no existe la exportación, se
+    exporta una sola vez con save_pretrained. Devuelve (modelo, tokenizer, exportado_ahora).
+    """
+    from transformers import AutoTokenizer
+
+    exported = False
+    if not any(path.glob('*.onnx')):
+        logger.info(f"Exporting {hub_id} to ONNX in {path}")
+        model = ort_class.from_pretrained(hub_id, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(hub_id)
+        # Directorio temporal y rename: otro proceso nunca ve una exportación a medias
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        model.save_pretrained(tmp_path)
+        tokenizer.save_pretrained(tmp_path)
+        # Una exportación anterior incompleta, con su verificación, deja de valer
+        shutil.rmtree(path, ignore_errors=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            tmp_path.rename(path)
+            exported = True
+        except OSError:
+            # Otro proceso terminó antes la misma exportación
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return ort_class.from_pretrained(path), AutoTokenizer.from_pretrained(path), exported
+
+
+def _read_check(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path / 'equivalence.json', 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return stored if isinstance(stored, dict) and {'check', 'encoder'} <= stored.keys() else None
+
+
+def _write_check(path: Path, stored: Dict[str, Any]):
+    path.mkdir(parents=True, exist_ok=True)
+    tmp_path = path / 'equivalence.json.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(stored, f, indent=2)
+    tmp_path.replace(path / 'equivalence.json')
+
+
+def quantize_int8(module):
+    """Cuantización dinámica int8 de las capas lineales (pesos int8, activaciones fp32)"""
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    """
+    Encoder exportado a ONNX y ejecutado con ONNX Runtime. Expone el mismo
+    `encode` que SentenceTransformer (mean pooling + normalización opcional).
+    """
+
+    def __init__(self, model, tokenizer, normalize: bool = True, max_seq_length: int = 256):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.normalize = normalize
+        self.max_seq_length = max_seq_length
+        self.resident_bytes = _onnx_size(self.model)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch, padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors='np'
+            )
+            token_embeddings = self.model(**encoded).last_hidden_state
+            token_embeddings = np.asarray(token_embeddings, dtype=np.float32)
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled)
+
+        embeddings = np.vstack(outputs)
+        return embeddings[0] if single else embeddings
+
+
+def _onnx_size(ort_model) -> int:
+    try:
+        model_dir = Path(getattr(ort_model, 'model_save_dir'))
+        return sum(p.stat().st_size for p in model_dir.glob('*.onnx*'))
+    except Exception:
+        return 0
+
+
+def check_equivalence(reference_encode: Callable, candidate_encode: Callable,
+                      threshold: float, sentences: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Comparar por similitud coseno los vectores del backend candidato con los de fp32"""
+    sentences = sentences or PROBE_SENTENCES
+    reference = np.asarray(reference_encode(sentences), dtype=np.float32)
+    candidate = np.asarray(candidate_encode(sentences), dtype=np.float32)
+
+    reference = reference / np.clip(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12, None)
+    candidate = candidate / np.clip(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12, None)
+    cosines = (reference * candidate).sum(axis=1)
+
+    return {
+        'passed': bool(cosines.min() >= threshold),
+        'min_cosine': round(float(cosines.min()), 5),
+        'mean_cosine': round(float(cosines.mean()), 5),
+        'threshold': threshold,
+        'probes': len(sentences),
+    }
+
+
+def build_embedder(model_name: str, backend: str, threshold: float) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Construir el embedder con el backend pedido. Si el backend optimizado no
+    supera el umbral de coseno frente a fp32, o falla al construirse, se usa fp32.
+
+    La exportación ONNX y el resultado de la verificación se guardan en
+    export_dir: las cargas siguientes (p. ej. tras una descarga por inactividad)
+    leen ambos sin cargar el modelo fp32 de referencia ni repetir la
+    verificación, que solo se vuelve a hacer si se rehace la exportación o
+    cambia el umbral.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    report = {'requested': backend, 'active': BACKEND_PYTORCH, 'check': None, 'error': None}
+    if backend == BACKEND_PYTORCH:
+        return SentenceTransformer(model_name), report
+
+    path = export_dir(model_name, backend)
+    stored = _read_check(path)
+    if stored and stored['check']['threshold'] != threshold:
+        stored = None
+    if stored and not stored['check']['passed']:
+        logger.warning(f"'{backend}' embedder failed its stored equivalence check, using fp32")
+        report['check'] = stored['check']
+        return SentenceTransformer(model_name), report
+
+    reference = None
+    try:
+        if backend == BACKEND_INT8:
+            # La cuantización parte del modelo fp32, que se carga siempre
+            import copy
+            reference = SentenceTransformer(model_name)
+            candidate = quantize_int8(copy.deepcopy(reference))
+            encoder = {}
+        else:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+            model, tokenizer, exported = load_onnx_model(ORTModelForFeatureExtraction, _hub_id(model_name), path)
+            if exported or not stored:
+                stored = None
+                reference = SentenceTransformer(model_name)
+                encoder = {
+                    'normalize': any(type(module).__name__ == 'Normalize' for module in reference),
+                    'max_seq_length': getattr(reference, 'max_seq_length', 256) or 256,
+                }
+            else:
+                encoder = stored['encoder']
+            candidate = OnnxSentenceEncoder(model, tokenizer, **encoder)
+
+        if stored:
+            check = stored['check']
+        else:
+            check = check_equivalence(
+                lambda s: reference.encode(s, convert_to_numpy=True),
+                lambda s: candidate.encode(s, convert_to_numpy=True),
+                threshold
+            )
+            _write_check(path, {'check': check, 'encoder': encoder})
+        report['check'] = check
+    except Exception as e:
+        logger.error(f"Could not build '{backend}' embedder, falling back to fp32: {e}")
+        report['error'] = str(e)
+        return reference or SentenceTransformer(model_name), report
+
+    if not check['passed']:
+        logger.warning(
+            f"'{backend}' embedder failed equivalence check "
+            f"(min cosine {check['min_cosine']} < {threshold}), using fp32"
+        )
+        return reference, report
+
+    logger.info(f"Using '{backend}' embedder (min cosine {check['min_cosine']})")
+    report['active'] = backend
+    del reference
+    return candidate, report
+
+
+def build_summarizer(model_name: str, backend: str) -> Tuple[Any, Dict[str, Any]]:
+    """Construir el pipeline de resumen con el backend pedido (fp32 si falla)"""
+    from transformers import pipeline
+
+    report = {'requested': backend, 'active': BACKEND_PYTORCH, 'check': None, 'error': None}
+
+    if backend == BACKEND_ONNX:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+            model, tokenizer, _ = load_onnx_model(
+                ORTModelForSeq2SeqLM, model_name, export_dir(model_name, backend)
+            )
+            summarizer = pipeline("summarization", model=model, tokenizer=tokenizer)
+            summarizer.resident_bytes = _onnx_size(model)
+            report['active'] = BACKEND_ONNX
+            return summarizer, report
+        except Exception as e:
+            logger.error(f"Could not build ONNX summarizer, falling back to fp32: {e}")
+            report['error'] = str(e)
+
+    summarizer = pipeline("summarization", model=model_name)
+    if backend == BACKEND_INT8:
+        try:
+            summarizer.model = quantize_int8(summarizer.model)
+            report['active'] = BACKEND_INT8
+        except Exception as e:
+            logger.error(f"Could not quantize summarizer, using fp32: {e}")
+            report['error'] = str(e)
+    return summarizer, report
@@ -0,0 +1,183 @@
+# services/ai_service/lexical_index.py
+import math
+import pickle
+import re
+import unicodedata
+import logging
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada campo en la frecuencia de términos (BM25F simplificado)
+FIELD_WEIGHTS = {
+    'titulo': 3.0,
+    'autores': 2.0,
+    'tutores': 2.0,
+    'resumen': 1.5,
+    'contenido': 1.0,
+}
+
+# Campos cuyo valor completo se indexa para coincidencias exactas
+EXACT_FIELDS = ('titulo', 'autores', 'tutores')
+
+STOPWORDS = {
+    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'se', 'del', 'las', 'un', 'por',
+    'con', 'no', 'una', 'su', 'para', 'es', 'al', 'lo', 'como', 'mas', 'o', 'pero',
+    'sus', 'le', 'ha', 'me', 'si', 'sin', 'sobre', 'este', 'ya', 'entre', 'cuando',
+    'todo', 'esta', 'ser', 'son', 'dos', 'tambien', 'fue', 'habia', 'era', 'muy',
+    'hasta', 'desde', 'nos', 'ni', 'e', 'u', 'the', 'of', 'and',
+}
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y con espacios normalizados"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r'\w+', normalize(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_names(value: str) -> List[str]:
+    """Separar una lista de autores o tutores ("A, B y C") en nombres individuales"""
+    parts = re.split(r'[,;\n]|\s+y\s+|\s+&\s+', value or '')
+    return [normalize(p) for p in parts if normalize(p)]
+
+
+class BM25Index:
+    """
+    Índice invertido en memoria con ranking BM25 sobre título, autores,
+    tutores, resumen y texto extraído. Mantiene además un diccionario de
+    valores exactos (título completo, cada autor, cada tutor, id del trabajo)
+    para resolver consultas exactas sin recorrer el índice denso.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.doc_keys: Dict[str, List[str]] = {}
+        self.exact: Dict[str, Set[str]] = defaultdict(set)
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add_document(self, doc_id: str, fields: Dict[str, str], metadata: Optional[Dict[str, Any]] = None):
+        """Indexar (o reindexar) un trabajo"""
+        doc_id = str(doc_id)
+        if doc_id in self.doc_lengths:
+            self.remove_document(doc_id)
+
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(fields.get(field) or ''):
+                weighted[token] += weight
+
+        for term, tf in weighted.items():
+            self.postings[term][doc_id] = tf
+        length = sum(weighted.values())
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = list(weighted)
+        self.total_length += length
+
+        keys = {normalize(doc_id)}
+        for field in EXACT_FIELDS:
+            value = fields.get(field) or ''
+            keys.add(normalize(value))
+            if field != 'titulo':
+                keys.update(split_names(value))
+        keys.discard('')
+        for key in keys:
+            self.exact[key].add(doc_id)
+        self.doc_keys[doc_id] = list(keys)
+
+        self.documents[doc_id] = metadata if metadata is not None else {
+            k: v for k, v in fields.items() if k != 'contenido'
+        }
+
+    def remove_document(self, doc_id: str):
+        doc_id = str(doc_id)
+        for term in self.doc_terms.pop(doc_id, []):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        for key in self.doc_keys.pop(doc_id, []):
+            docs = self.exact.get(key)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self.exact[key]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+        self.documents.pop(doc_id, None)
+
+    def exact_match(self, query: str) -> List[str]:
+        """Trabajos cuyo título, autor, tutor o id coincide exactamente con la consulta"""
+        return sorted(self.exact.get(normalize(query), ()))
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Ranking BM25 recorriendo solo las listas de postings de los términos de la consulta"""
+        n = len(self.doc_lengths)
+        if n == 0:
+            return []
+        avg_length = self.total_length / n or 1.0
+
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def save(self, path: Path):
+        state = {
+            'k1': self.k1, 'b': self.b,
+            'postings': dict(self.postings),
+            'doc_lengths': self.doc_lengths,
+            'doc_terms': self.doc_terms,
+            'doc_keys': self.doc_keys,
+            'exact': dict(self.exact),
+            'documents': self.documents,
+            'total_length': self.total_length,
+        }
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'BM25Index':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls(state['k1'], state['b'])
+        index.postings = defaultdict(dict, state['postings'])
+        index.doc_lengths = state['doc_lengths']
+        index.doc_terms = state['doc_terms']
+        index.doc_keys = state['doc_keys']
+        index.exact = defaultdict(set, state['exact'])
+        index.documents = state['documents']
+        index.total_length = state['total_length']
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fusionar listas ordenadas de ids por Reciprocal Rank Fusion"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
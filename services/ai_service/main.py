@@ -10,7 +10,7 @@ import tempfile
 import logging
 import re
 from pathlib import Path
-from tasks import process_document_task
+from tasks import process_document_task, process_s3_object_task, s3_configured
 # Importar servicio de IA
 from ai_processor import get_ai_service, AIService
 
@@ -35,6 +35,15 @@ app.add_middleware(
 )
 
 # Modelos Pydantic
+class ProcessPathRequest(BaseModel):
+    trabajo_id: str
+    path: str
+    # 'local': ruta en el volumen de medios; 's3': clave del objeto en el bucket
+    storage: Optional[str] = 'local'
+    titulo: Optional[str] = None
+    autores: Optional[str] = None
+    tutores: Optional[str] = None
+
 class SearchRequest(BaseModel):
     query: str
     top_k: Optional[int] = 10
@@ -44,6 +53,8 @@ class SearchResult(BaseModel):
     trabajo_id: str
     metadata: Dict[str, Any]
     similarity_score: float
+    lexical_score: Optional[float] = None
+    fusion_score: Optional[float] = None
     reason: str
 
 class ProcessResponse(BaseModel):
@@ -65,6 +76,25 @@ class ModelInfoResponse(BaseModel):
     spacy_model: Optional[str]
     faiss_index_size: int
     total_metadata_entries: int
+    vector_storage: Dict[str, Any] = {}
+    service_mode: str = 'full'
+    models: Dict[str, Any] = {}
+    resident_memory_mb: float = 0.0
+    memory_budget_mb: float = 0.0
+    idle_timeout_s: float = 0.0
+    model_errors: Dict[str, str] = {}
+    model_events: List[Dict[str, Any]] = []
+    inference_backend: Dict[str, Optional[str]] = {}
+    inference_backend_checks: Dict[str, Any] = {}
+    lexical_index_documents: int = 0
+    neighbors_k: int = 0
+    neighbors_entries: int = 0
+
+class NeighborsRequest(BaseModel):
+    trabajo_ids: Optional[List[str]] = None
+
+# Volumen de medios compartido con el backend (solo lectura)
+MEDIA_ROOT = Path(os.environ.get('AI_MEDIA_ROOT', '/app/media')).resolve()
 
 # Dependencias
 def get_ai_service_dependency() -> AIService:
@@ -81,8 +111,10 @@ async def root():
         "endpoints": {
             "health": "/health",
             "process_pdf": "/process_pdf",
+            "process_path": "/process_path",
             "search": "/search",
             "similar": "/similar",
+            "neighbors": "/neighbors",
             "model_info": "/model_info"
         }
     }
@@ -110,10 +142,15 @@ async def process_pdf(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     trabajo_id: str = Form(...),
+    titulo: Optional[str] = Form(None),
+    autores: Optional[str] = Form(None),
+    tutores: Optional[str] = Form(None),
     service: AIService = Depends(get_ai_service_dependency)
 ):
     """
     Recibe el PDF y lanza la tarea de procesamiento en segundo plano.
+    Título, autores y tutores (si el backend los envía) se indexan tal cual
+    para la búsqueda léxica.
     """
     if not trabajo_id:
         raise HTTPException(status_code=400, detail="trabajo_id is required")
@@ -151,7 +188,8 @@ async def process_pdf(
         from tasks import process_document_task
         
         # Pasamos el path como string para que la tarea lo encuentre
-        background_tasks.add_task(process_document_task, trabajo_id, str(file_path))
+        known_metadata = {'titulo': titulo, 'autores': autores, 'tutores': tutores}
+        background_tasks.add_task(process_document_task, trabajo_id, str(file_path), known_metadata)
         
         # 4. Respondemos de inmediato al usuario
         return ProcessResponse(
@@ -164,6 +202,52 @@ async def process_pdf(
         logger.error(f"Error al recibir PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Error al recibir PDF: {str(e)}")
 
+@app.post("/process_path", response_model=ProcessResponse)
+async def process_path(
+    request: ProcessPathRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Procesa un PDF que ya está en el volumen de medios compartido. El backend
+    envía la ruta relativa del almacenamiento en lugar del archivo. Con
+    almacenamiento S3 la ruta es la clave del objeto y se descarga del bucket.
+    """
+    known_metadata = {'titulo': request.titulo, 'autores': request.autores, 'tutores': request.tutores}
+
+    if request.storage == 's3':
+        key = request.path.lstrip('/')
+        if not key.lower().endswith('.pdf') or '..' in key.split('/'):
+            raise HTTPException(status_code=400, detail="Invalid object key")
+        if not s3_configured():
+            # Sin acceso al bucket el backend reenvía el archivo
+            raise HTTPException(status_code=404, detail="Object storage not configured")
+        background_tasks.add_task(process_s3_object_task, request.trabajo_id, key, known_metadata)
+        return ProcessResponse(
+            success=True,
+            trabajo_id=request.trabajo_id,
+            error="Procesamiento iniciado en segundo plano. El PDF se descargará del almacenamiento."
+        )
+
+    file_path = (MEDIA_ROOT / request.path).resolve()
+    if MEDIA_ROOT not in file_path.parents:
+        raise HTTPException(status_code=400, detail="Invalid path")
+    if file_path.suffix.lower() != '.pdf':
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if not file_path.is_file():
+        # El backend reenvía el archivo si la IA no monta el volumen
+        raise HTTPException(status_code=404, detail="File not found in shared media volume")
+    
+    # El archivo pertenece al backend: no se borra al terminar
+    background_tasks.add_task(
+        process_document_task, request.trabajo_id, str(file_path), known_metadata, False
+    )
+    
+    return ProcessResponse(
+        success=True,
+        trabajo_id=request.trabajo_id,
+        error="Procesamiento iniciado en segundo plano. Los resultados se guardarán en el índice vectorial."
+    )
+
 @app.post("/search", response_model=List[SearchResult])
 async def semantic_search(
     request: SearchRequest,
@@ -183,6 +267,8 @@ async def semantic_search(
                 trabajo_id=result['trabajo_id'],
                 metadata=result['metadata'],
                 similarity_score=result['similarity_score'],
+                lexical_score=result.get('lexical_score'),
+                fusion_score=result.get('fusion_score'),
                 reason=result['reason']
             )
             for result in results
@@ -253,31 +339,60 @@ async def batch_process_trabajos(
         raise HTTPException(status_code=500, detail=f"Batch processing error: {str(e)}")
 
 @app.post("/rebuild_index")
-async def rebuild_vector_index(
+def rebuild_vector_index(
     service: AIService = Depends(get_ai_service_dependency)
 ):
     """
     Reconstruir índice vectorial (requiere autenticación en producción)
+    con el modo de compresión configurado (AI_VECTOR_STORAGE) a partir de los
+    vectores originales. Devuelve memoria por vector y recall@10 frente a flat.
+    Es `def`, como /recompute_neighbors: el entrenamiento y el recall sobre
+    todo el corpus corren en el threadpool sin bloquear el event loop.
     """
     try:
-        # En un entorno real, esto requeriría autenticación y acceso a la base de datos
         logger.info("Rebuilding vector index...")
-        
-        # Esta función requeriría acceso a todos los trabajos de la base de datos
-        # Por simplicidad, retornamos información sobre el estado actual
-        
-        model_info = service.get_model_info()
+        report = service.rebuild_vector_index()
         
         return {
-            "status": "rebuilding",
-            "current_index_size": model_info['faiss_index_size'],
-            "message": "Index rebuild initiated. This would require database access in production."
+            "status": "rebuilt",
+            "current_index_size": report['vectors'],
+            "vector_storage": report
         }
         
     except Exception as e:
         logger.error(f"Error rebuilding index: {e}")
         raise HTTPException(status_code=500, detail=f"Index rebuild error: {str(e)}")
 
+@app.post("/neighbors")
+async def get_neighbors(
+    request: NeighborsRequest,
+    service: AIService = Depends(get_ai_service_dependency)
+):
+    """
+    Vecinos precalculados [[trabajo_id, similitud], ...] de los trabajos pedidos
+    (o de todos si no se indica ninguno)
+    """
+    return {
+        "neighbors_k": service.neighbors_k,
+        "neighbors": service.get_neighbors(request.trabajo_ids)
+    }
+
+@app.post("/recompute_neighbors")
+def recompute_neighbors(
+    service: AIService = Depends(get_ai_service_dependency)
+):
+    """
+    Recalcular los vecinos más cercanos de todos los trabajos. Es `def` y no
+    `async def`: FastAPI la ejecuta en el threadpool y la búsqueda FAISS por
+    lotes sobre todo el corpus no bloquea /search ni /process_path. Las
+    ingestas en segundo plano esperan al cerrojo del índice mientras tanto.
+    """
+    try:
+        return {"status": "recomputed", **service.recompute_neighbors()}
+    except Exception as e:
+        logger.error(f"Error recomputing neighbors: {e}")
+        raise HTTPException(status_code=500, detail=f"Neighbors recompute error: {str(e)}")
+
 # Manejo de excepciones globales
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
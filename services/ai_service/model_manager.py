@@ -0,0 +1,277 @@
+# services/ai_service/model_manager.py
+import gc
+import os
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _tensor_bytes(value: Any) -> int:
+    if hasattr(value, 'numel') and hasattr(value, 'element_size'):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    return 0
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """
+    Estimar la memoria residente de un modelo a partir de su state_dict.
+    Soporta módulos de PyTorch (SentenceTransformer, también cuantizados) y
+    pipelines de transformers.
+    """
+    module = getattr(model, 'model', model)
+    try:
+        return sum(_tensor_bytes(v) for v in module.state_dict().values())
+    except Exception:
+        # Modelos que no exponen tensores (p. ej. sesiones ONNX) reportan su propio tamaño
+        return int(getattr(model, 'resident_bytes', 0) or 0)
+
+
+class _ManagedModel:
+    def __init__(self, name: str, loader: Callable[[], Any], pinned: bool = False):
+        self.name = name
+        self.loader = loader
+        self.pinned = pinned
+        self.instance = None
+        self.refcount = 0
+        self.last_used = 0.0
+        self.size_bytes = 0
+        self.load_count = 0
+        self.error: Optional[str] = None
+        self.failed_at = 0.0
+        self.lock = threading.Lock()
+
+
+class ModelManager:
+    """
+    Gestor de modelos con carga bajo demanda, conteo de referencias y
+    expulsión por inactividad o por presupuesto de memoria. Una carga fallida
+    (p. ej. un error transitorio al descargar del Hub) se reintenta pasados
+    `retry_after` segundos; mientras tanto el modelo no está disponible.
+    """
+
+    def __init__(self, idle_timeout: float = 900, memory_budget_mb: float = 0,
+                 check_interval: float = 60, max_events: int = 50, retry_after: float = 60):
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.check_interval = check_interval
+        self._models: Dict[str, _ManagedModel] = {}
+        self._lock = threading.RLock()
+        self._events = deque(maxlen=max_events)
+        self._reaper = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> 'ModelManager':
+        return cls(
+            idle_timeout=float(os.environ.get('AI_MODEL_IDLE_TIMEOUT', '900')),
+            memory_budget_mb=float(os.environ.get('AI_MODEL_MEMORY_BUDGET_MB', '0')),
+            check_interval=float(os.environ.get('AI_MODEL_CHECK_INTERVAL', '60')),
+            retry_after=float(os.environ.get('AI_MODEL_RETRY_AFTER', '60')),
+        )
+
+    def register(self, name: str, loader: Callable[[], Any], pinned: bool = False):
+        """Registrar un modelo sin cargarlo. Los modelos fijados nunca se expulsan por inactividad."""
+        with self._lock:
+            self._models[name] = _ManagedModel(name, loader, pinned)
+        self._ensure_reaper()
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._models
+
+    def _in_backoff(self, entry: _ManagedModel) -> bool:
+        return entry.error is not None and time.monotonic() - entry.failed_at < self.retry_after
+
+    def is_available(self, name: str) -> bool:
+        """El modelo está registrado y no está esperando para reintentar una carga fallida"""
+        entry = self._models.get(name)
+        return entry is not None and not self._in_backoff(entry)
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._models.get(name)
+        return entry is not None and entry.instance is not None
+
+    @contextmanager
+    def use(self, name: str):
+        """
+        Obtener un modelo mientras dure el bloque `with`. Lo carga si hace falta
+        y lo protege de la expulsión hasta que se libera. Devuelve None si el
+        modelo no está registrado o no se pudo cargar.
+        """
+        entry = self._models.get(name)
+        if entry is None:
+            yield None
+            return
+
+        instance = self._acquire(entry)
+        try:
+            yield instance
+        finally:
+            if instance is not None:
+                self._release(entry)
+
+    def preload(self, *names: str):
+        for name in names:
+            with self.use(name):
+                pass
+
+    def _acquire(self, entry: _ManagedModel):
+        with entry.lock:
+            if entry.instance is None:
+                if self._in_backoff(entry):
+                    return None
+                self._load(entry)
+                if entry.instance is None:
+                    return None
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            instance = entry.instance
+
+        self._enforce_budget(exclude=entry.name)
+        return instance
+
+    def _release(self, entry: _ManagedModel):
+        with entry.lock:
+            entry.refcount = max(0, entry.refcount - 1)
+            entry.last_used = time.monotonic()
+
+    def _load(self, entry: _ManagedModel):
+        started = time.monotonic()
+        try:
+            entry.instance = entry.loader()
+        except Exception as e:
+            logger.error(f"Error loading model '{entry.name}' (retry in {self.retry_after:.0f}s): {e}")
+            self._fail(entry, str(e))
+            return
+
+        if entry.instance is None:
+            self._fail(entry, 'loader returned None')
+            return
+
+        entry.error = None
+        entry.size_bytes = estimate_model_bytes(entry.instance)
+        entry.load_count += 1
+        duration = time.monotonic() - started
+        self._record('load', entry, reason='on_demand', duration_s=round(duration, 3))
+        logger.info(
+            f"Model '{entry.name}' loaded in {duration:.1f}s "
+            f"({entry.size_bytes / 1024 / 1024:.1f} MB)"
+        )
+
+    def _fail(self, entry: _ManagedModel, error: str):
+        entry.instance = None
+        entry.error = error
+        entry.failed_at = time.monotonic()
+        self._record('load_failed', entry, error=error)
+
+    def _unload(self, entry: _ManagedModel, reason: str):
+        # Se llama con entry.lock tomado
+        size = entry.size_bytes
+        entry.instance = None
+        entry.size_bytes = 0
+        gc.collect()
+        self._record('unload', entry, reason=reason, freed_mb=round(size / 1024 / 1024, 1))
+        logger.info(f"Model '{entry.name}' unloaded ({reason})")
+
+    def evict(self, name: str, reason: str = 'manual') -> bool:
+        """Descargar un modelo si no está en uso"""
+        entry = self._models.get(name)
+        if entry is None:
+            return False
+        with entry.lock:
+            if entry.instance is None or entry.refcount > 0:
+                return False
+            self._unload(entry, reason)
+            return True
+
+    def evict_idle(self):
+        """Descargar los modelos que superaron el tiempo máximo de inactividad"""
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        for entry in list(self._models.values()):
+            if entry.pinned or entry.instance is None or entry.refcount > 0:
+                continue
+            if now - entry.last_used >= self.idle_timeout:
+                self.evict(entry.name, reason='idle')
+
+    def _enforce_budget(self, exclude: Optional[str] = None):
+        if self.memory_budget_bytes <= 0:
+            return
+
+        # Expulsar los modelos menos usados recientemente hasta entrar en el presupuesto
+        candidates = sorted(
+            (e for e in self._models.values()
+             if e.instance is not None and e.name != exclude),
+            key=lambda e: e.last_used
+        )
+        for entry in candidates:
+            if self.resident_bytes() <= self.memory_budget_bytes:
+                break
+            self.evict(entry.name, reason='memory_budget')
+
+    def resident_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._models.values() if e.instance is not None)
+
+    def _record(self, event: str, entry: _ManagedModel, **extra):
+        self._events.append({
+            'event': event,
+            'model': entry.name,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            **extra
+        })
+
+    def _ensure_reaper(self):
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name='model-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error evicting idle models: {e}")
+
+    def shutdown(self):
+        self._stop.set()
+
+    def get_info(self) -> Dict[str, Any]:
+        """Estado de cada modelo, memoria residente y eventos recientes de carga/descarga"""
+        now = time.monotonic()
+        models = {}
+        for entry in self._models.values():
+            models[entry.name] = {
+                'loaded': entry.instance is not None,
+                'pinned': entry.pinned,
+                'in_use': entry.refcount,
+                'resident_mb': round(entry.size_bytes / 1024 / 1024, 1),
+                'load_count': entry.load_count,
+                'idle_seconds': round(now - entry.last_used, 1) if entry.last_used else None,
+                'error': entry.error,
+                'retry_in_s': (
+                    round(max(0.0, self.retry_after - (now - entry.failed_at)), 1)
+                    if entry.error is not None else None
+                ),
+            }
+        return {
+            'models': models,
+            'resident_memory_mb': round(self.resident_bytes() / 1024 / 1024, 1),
+            'memory_budget_mb': round(self.memory_budget_bytes / 1024 / 1024, 1),
+            'idle_timeout_s': self.idle_timeout,
+            'retry_after_s': self.retry_after,
+            'errors': {e.name: e.error for e in self._models.values() if e.error is not None},
+            'events': list(self._events),
+        }
+
+    def events(self) -> List[Dict[str, Any]]:
+        return list(self._events)
@@ -2,21 +2,53 @@
 import os
 import logging
 from ai_processor import get_ai_service
+import tempfile
 import requests
 import json
 
 logger = logging.getLogger(__name__)
 
-def process_document_task(trabajo_id: str, pdf_path: str):
+# Almacenamiento S3 (o compatible, p. ej. MinIO) del backend. Las credenciales
+# se leen de AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY como en boto3.
+S3_BUCKET = os.environ.get('AI_S3_BUCKET', '')
+S3_ENDPOINT_URL = os.environ.get('AI_S3_ENDPOINT_URL') or None
+S3_REGION = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
+
+
+def s3_configured() -> bool:
+    return bool(S3_BUCKET)
+
+
+def process_s3_object_task(trabajo_id: str, key: str, known_metadata: dict = None):
+    """
+    Descarga el PDF del bucket a un archivo temporal (por partes, sin cargarlo
+    entero en memoria) y lo procesa; la copia se borra al terminar.
+    """
+    import boto3
+
+    fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            client = boto3.client('s3', endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION)
+            client.download_fileobj(S3_BUCKET, key, destino)
+    except Exception as e:
+        logger.error(f"No se pudo descargar {key} del almacenamiento: {e}")
+        os.remove(pdf_path)
+        return {"success": False, "error": str(e)}
+    return process_document_task(trabajo_id, pdf_path, known_metadata, cleanup=True)
+
+def process_document_task(trabajo_id: str, pdf_path: str, known_metadata: dict = None,
+                          cleanup: bool = True):
     """
     Tarea para procesar un documento en segundo plano.
+    `cleanup` borra el archivo al terminar (solo para copias temporales subidas).
     """
     try:
         logger.info(f"Iniciando tarea de fondo para trabajo_id: {trabajo_id}")
         service = get_ai_service()
         
         # Llamamos a la función pesada que ya definiste en ai_processor.py
-        result = service.process_pdf_and_extract(pdf_path, trabajo_id)
+        result = service.process_pdf_and_extract(pdf_path, trabajo_id, known_metadata)
         
         if result.get('success'):
             logger.info(f"Tarea completada con éxito para {trabajo_id}")
@@ -28,6 +60,7 @@ def process_document_task(trabajo_id: str, pdf_path: str):
                     'structured_info': result.get('structured_info'),
                     'embedding': result.get('embedding_generated'),
                     'file_hash': result.get('file_hash'),
+                    'similares': result.get('similares'),
                 }
                 # Envío en JSON. En desarrollo asumimos endpoint abierto o en red interna.
                 headers = {'Content-Type': 'application/json'}
@@ -45,6 +78,6 @@ def process_document_task(trabajo_id: str, pdf_path: str):
         return {"success": False, "error": str(e)}
     finally:
         # IMPORTANTE: Borrar el archivo temporal para no llenar el disco
-        if os.path.exists(pdf_path):
+        if cleanup and os.path.exists(pdf_path):
             os.remove(pdf_path)
             logger.info(f"Copiado temporal eliminado: {pdf_path}")
\ No newline at end of file
@@ -0,0 +1,199 @@
+# services/ai_service/vector_compression.py
+import os
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+MODE_FLAT = 'flat'
+MODE_FP16 = 'fp16'
+MODE_PCA = 'pca'
+MODE_IVFPQ = 'ivfpq'
+MODE_BINARY = 'binary'
+SUPPORTED_MODES = (MODE_FLAT, MODE_FP16, MODE_PCA, MODE_IVFPQ, MODE_BINARY)
+
+
+def compression_settings() -> Dict[str, Any]:
+    """Parámetros de compresión configurables por entorno"""
+    mode = os.environ.get('AI_VECTOR_STORAGE', MODE_FLAT).lower()
+    if mode not in SUPPORTED_MODES:
+        logger.warning(f"Unknown vector storage mode '{mode}', using {MODE_FLAT}")
+        mode = MODE_FLAT
+    return {
+        'mode': mode,
+        'pca_dim': int(os.environ.get('AI_PCA_DIM', '128')),
+        'pq_m': int(os.environ.get('AI_PQ_M', '48')),
+        'ivf_nprobe': int(os.environ.get('AI_IVF_NPROBE', '16')),
+        'min_train_vectors': int(os.environ.get('AI_VECTOR_MIN_TRAIN', '1000')),
+        'binary_shortlist': int(os.environ.get('AI_BINARY_SHORTLIST', '10')),
+    }
+
+
+class BinaryRerankIndex:
+    """
+    Índice de signos (1 bit por dimensión) usado como prefiltro por distancia
+    de Hamming. La lista corta se reordena con producto interno exacto usando
+    los vectores originales, que se leen de disco (memmap) bajo demanda.
+    """
+
+    def __init__(self, dimension: int, rerank_vectors, shortlist_factor: int = 10,
+                 binary_index=None):
+        self.d = dimension
+        self.index = binary_index or faiss.IndexBinaryFlat(dimension)
+        self.rerank_vectors = rerank_vectors
+        self.shortlist_factor = max(1, shortlist_factor)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    @staticmethod
+    def binarize(vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+    def add(self, vectors: np.ndarray):
+        self.index.add(self.binarize(vectors))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        shortlist = min(self.ntotal, k * self.shortlist_factor)
+        _, candidates = self.index.search(self.binarize(queries), shortlist)
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, cand) in enumerate(zip(queries, candidates)):
+            cand = cand[cand >= 0]
+            if len(cand) == 0:
+                continue
+            exact = np.asarray(self.rerank_vectors(cand), dtype=np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            scores[row, :len(order)] = exact[order]
+            ids[row, :len(order)] = cand[order]
+        return scores, ids
+
+
+def min_train_vectors(mode: str, settings: Dict[str, Any]) -> int:
+    """Vectores necesarios para entrenar el modo (0 si no requiere entrenamiento)"""
+    if mode == MODE_PCA:
+        # PCA no puede producir más componentes que vectores de entrenamiento
+        return max(settings['min_train_vectors'], settings['pca_dim'])
+    if mode == MODE_IVFPQ:
+        return settings['min_train_vectors']
+    return 0
+
+
+def build_index(mode: str, vectors: np.ndarray, settings: Dict[str, Any],
+                rerank_vectors=None) -> Tuple[Any, str, Optional[str]]:
+    """
+    Construir (entrenar y poblar) un índice para el modo pedido.
+    Devuelve (índice, modo_activo, motivo_del_fallback). Los modos que
+    requieren entrenamiento caen a flat si aún no hay vectores suficientes.
+    """
+    n, d = vectors.shape if len(vectors) else (0, settings.get('dimension', 384))
+    reason = None
+
+    min_train = min_train_vectors(mode, settings)
+    if n < min_train:
+        reason = f"insufficient vectors to train {mode} ({n} < {min_train})"
+        mode = MODE_FLAT
+
+    if mode == MODE_FP16:
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    elif mode == MODE_PCA:
+        pca = faiss.PCAMatrix(d, settings['pca_dim'])
+        index = faiss.IndexPreTransform(pca, faiss.IndexFlatIP(settings['pca_dim']))
+    elif mode == MODE_IVFPQ:
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        # Con pocos vectores se usan códigos de menos bits para poder entrenar los subcuantizadores
+        nbits = 8 if n >= 39 * 256 else max(4, int(np.log2(max(n // 39, 16))))
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, settings['pq_m'], nbits, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(settings['ivf_nprobe'], nlist)
+    elif mode == MODE_BINARY:
+        index = BinaryRerankIndex(d, rerank_vectors, settings['binary_shortlist'])
+    else:
+        index = faiss.IndexFlatIP(d)
+
+    if n:
+        if not index.is_trained:
+            try:
+                index.train(vectors)
+            except RuntimeError as e:
+                logger.error(f"Could not train {mode} index, using {MODE_FLAT}: {e}")
+                return build_index(MODE_FLAT, vectors, settings)[0], MODE_FLAT, f"training failed: {e}"
+        index.add(vectors)
+    return index, mode, reason
+
+
+def index_resident_bytes(index) -> int:
+    """Bytes que ocupa el índice serializado (aproximación de su memoria residente)"""
+    if isinstance(index, BinaryRerankIndex):
+        return len(faiss.serialize_index_binary(index.index))
+    return len(faiss.serialize_index(index))
+
+
+def recall_at_k(index, vectors: np.ndarray, k: int = 10, sample: int = 200, seed: int = 0) -> Optional[float]:
+    """
+    Recall@k del índice frente a la búsqueda exacta (producto interno sobre
+    los vectores originales), usando una muestra de los propios vectores como consultas.
+    """
+    n = len(vectors)
+    if n == 0:
+        return None
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, size=min(sample, n), replace=False)]
+
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+    _, approx = index.search(queries, k)
+
+    hits = sum(len(set(e) & set(a[a >= 0])) for e, a in zip(exact, approx))
+    return round(hits / (len(queries) * k), 4)
+
+
+def build_report(index, mode: str, requested_mode: str, vectors: np.ndarray,
+                 reason: Optional[str] = None) -> Dict[str, Any]:
+    """Memoria por vector y recall@10 frente al índice flat, calculados al construir"""
+    n, d = vectors.shape if len(vectors) else (0, 0)
+    resident = index_resident_bytes(index)
+    report = {
+        'mode': mode,
+        'requested_mode': requested_mode,
+        'vectors': n,
+        'dimension': d,
+        'bytes_per_vector': round(resident / n, 1) if n else None,
+        'flat_bytes_per_vector': d * 4,
+        'recall_at_10': recall_at_k(index, vectors, k=10) if n else None,
+        'fallback_reason': reason,
+    }
+    if isinstance(index, BinaryRerankIndex):
+        # Los vectores completos para el reordenamiento se leen de disco, no residen en memoria
+        report['rerank_bytes_per_vector_on_disk'] = d * 4
+    return report
+
+
+def write_index(index, path_prefix: str):
+    # Archivo temporal y rename: una caída a medio escribir conserva el índice anterior
+    if isinstance(index, BinaryRerankIndex):
+        path = f"{path_prefix}_binary.bin"
+        faiss.write_index_binary(index.index, f"{path}.tmp")
+    else:
+        path = f"{path_prefix}.bin"
+        faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def read_index(mode: str, path_prefix: str, settings: Dict[str, Any], rerank_vectors=None):
+    if mode == MODE_BINARY:
+        binary = faiss.read_index_binary(f"{path_prefix}_binary.bin")
+        return BinaryRerankIndex(binary.d, rerank_vectors, settings['binary_shortlist'], binary_index=binary)
+    index = faiss.read_index(f"{path_prefix}.bin")
+    if mode == MODE_IVFPQ:
+        faiss.extract_index_ivf(index).nprobe = settings['ivf_nprobe']
+    return index